@@ -41,6 +41,12 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# In sharded mode every shard needs the schema. Migrate each one with
+#   alembic -x db_url=sqlite:///./shard0.db upgrade head
+db_url = context.get_x_argument(as_dictionary=True).get("db_url")
+if db_url:
+    config.set_main_option("sqlalchemy.url", db_url)
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -0,0 +1,28 @@
+"""Add (owner_id, url) index on content
+
+Revision ID: 3f2a9c1d7b40
+Revises: 184d1419eb5b
+Create Date: 2026-10-19 09:12:44.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2a9c1d7b40'
+down_revision: Union[str, Sequence[str], None] = '184d1419eb5b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_content_owner_id_url', 'content', ['owner_id', 'url'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_content_owner_id_url', table_name='content')
@@ -0,0 +1,32 @@
+"""Add indexes for filtered, keyset-paginated content listing
+
+Revision ID: 5d7e3a9f0c12
+Revises: 8c51e0b2a6d9
+Create Date: 2026-10-19 13:25:10.671532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d7e3a9f0c12'
+down_revision: Union[str, Sequence[str], None] = '8c51e0b2a6d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_content_created_at_id', 'content', ['created_at', 'id'], unique=False)
+    op.create_index('ix_content_owner_id_created_at_id', 'content', ['owner_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_content_tags_tag_id_content_id', 'content_tags', ['tag_id', 'content_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_content_tags_tag_id_content_id', table_name='content_tags')
+    op.drop_index('ix_content_owner_id_created_at_id', table_name='content')
+    op.drop_index('ix_content_created_at_id', table_name='content')
@@ -0,0 +1,40 @@
+"""Add content.unique_url and its unique (owner_id, url_hash, unique_url) index
+
+Revision ID: 6b2f8d4e1a93
+Revises: a7c3e9f1d245
+Create Date: 2026-10-20 10:41:17.302566
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b2f8d4e1a93'
+down_revision: Union[str, Sequence[str], None] = 'a7c3e9f1d245'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Existing items keep a NULL `unique_url`, so they never conflict (a user
+    may already have several items for one URL); the duplicate check still
+    finds them through the (url_hash, owner_id) index.
+    """
+    for table in ('content', 'content_archive'):
+        op.add_column(table, sa.Column('unique_url', sa.Boolean(), nullable=True))
+    op.create_index(
+        'uq_content_owner_id_url_hash_unique_url', 'content', ['owner_id', 'url_hash', 'unique_url'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_content_owner_id_url_hash_unique_url', table_name='content')
+    for table in ('content_archive', 'content'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('unique_url')
@@ -0,0 +1,46 @@
+"""Add tag_co_follows table for tag suggestions
+
+Revision ID: 8c51e0b2a6d9
+Revises: 3f2a9c1d7b40
+Create Date: 2026-10-19 11:02:37.540118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c51e0b2a6d9'
+down_revision: Union[str, Sequence[str], None] = '3f2a9c1d7b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tag_co_follows',
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.Column('other_tag_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['other_tag_id'], ['tags.id'], ),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ),
+    sa.PrimaryKeyConstraint('tag_id', 'other_tag_id')
+    )
+    op.create_index('ix_tag_co_follows_tag_id_count', 'tag_co_follows', ['tag_id', 'count'], unique=False)
+
+    # Fill the table from the follows that already exist.
+    op.execute(
+        "INSERT INTO tag_co_follows (tag_id, other_tag_id, count) "
+        "SELECT mine.tag_id, theirs.tag_id, COUNT(*) "
+        "FROM user_followed_tags AS mine "
+        "JOIN user_followed_tags AS theirs ON theirs.user_id = mine.user_id "
+        "GROUP BY mine.tag_id, theirs.tag_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tag_co_follows_tag_id_count', table_name='tag_co_follows')
+    op.drop_table('tag_co_follows')
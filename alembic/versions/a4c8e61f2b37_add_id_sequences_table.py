@@ -0,0 +1,32 @@
+"""Add id_sequences table for sharded id allocation
+
+Revision ID: a4c8e61f2b37
+Revises: 5d7e3a9f0c12
+Create Date: 2026-10-19 14:08:52.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e61f2b37'
+down_revision: Union[str, Sequence[str], None] = '5d7e3a9f0c12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('id_sequences',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('id_sequences')
@@ -0,0 +1,42 @@
+"""Add link preview columns to content and content_archive
+
+Revision ID: a7c3e9f1d245
+Revises: d4a7e2b8c516
+Create Date: 2026-10-19 23:12:40.518274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9f1d245'
+down_revision: Union[str, Sequence[str], None] = 'd4a7e2b8c516'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREVIEW_COLUMNS = ['preview_title', 'preview_description', 'preview_image_url', 'preview_site_name', 'enriched_at']
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    Existing items keep an empty preview; only new and re-pointed items are
+    enriched.
+    """
+    for table in ('content', 'content_archive'):
+        op.add_column(table, sa.Column('preview_title', sa.String(), nullable=True))
+        op.add_column(table, sa.Column('preview_description', sa.Text(), nullable=True))
+        op.add_column(table, sa.Column('preview_image_url', sa.String(), nullable=True))
+        op.add_column(table, sa.Column('preview_site_name', sa.String(), nullable=True))
+        op.add_column(table, sa.Column('enriched_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('content_archive', 'content'):
+        with op.batch_alter_table(table) as batch_op:
+            for column in reversed(PREVIEW_COLUMNS):
+                batch_op.drop_column(column)
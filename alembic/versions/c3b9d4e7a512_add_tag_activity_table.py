@@ -0,0 +1,41 @@
+"""Add tag_activity table for trending tags
+
+Revision ID: c3b9d4e7a512
+Revises: a4c8e61f2b37
+Create Date: 2026-10-19 15:41:06.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3b9d4e7a512'
+down_revision: Union[str, Sequence[str], None] = 'a4c8e61f2b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    The table starts empty; fill it from existing content with
+    `POST /admin/trending/rebuild` (`crud.rebuild_tag_activity`).
+    """
+    op.create_table('tag_activity',
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.Column('span_hours', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ),
+    sa.PrimaryKeyConstraint('tag_id', 'span_hours', 'bucket_start')
+    )
+    op.create_index('ix_tag_activity_bucket_start', 'tag_activity', ['bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tag_activity_bucket_start', table_name='tag_activity')
+    op.drop_table('tag_activity')
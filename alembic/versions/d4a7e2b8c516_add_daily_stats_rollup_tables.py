@@ -0,0 +1,51 @@
+"""Add daily statistics rollup tables
+
+Revision ID: d4a7e2b8c516
+Revises: b9e4c7d2a610
+Create Date: 2026-10-19 22:31:05.274118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7e2b8c516'
+down_revision: Union[str, Sequence[str], None] = 'b9e4c7d2a610'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    The tables start empty; fill them from the existing content with
+    `python -m app.rollups`.
+    """
+    op.create_table('daily_content_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('daily_curator_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'user_id')
+    )
+    op.create_table('daily_tag_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ),
+    sa.PrimaryKeyConstraint('day', 'tag_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_tag_stats')
+    op.drop_table('daily_curator_stats')
+    op.drop_table('daily_content_stats')
@@ -0,0 +1,43 @@
+"""Add content.url_hash, a fingerprint of the normalized URL
+
+Revision ID: e7f1a2c9d804
+Revises: c3b9d4e7a512
+Create Date: 2026-10-19 18:02:44.519302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f1a2c9d804'
+down_revision: Union[str, Sequence[str], None] = 'c3b9d4e7a512'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    The (url_hash, owner_id) index replaces (owner_id, url): it serves both
+    the per-user duplicate check and the lookup across all users.
+
+    Existing rows are left with a NULL url_hash, so the duplicate check and
+    `GET /content/lookup` don't find them yet. Fill it in afterwards, in
+    short batches while the app is live, with (once upgraded to head):
+
+        python -m app.backfill run content_url_hash
+    """
+    op.add_column('content', sa.Column('url_hash', sa.String(length=32), nullable=True))
+    op.create_index('ix_content_url_hash_owner_id', 'content', ['url_hash', 'owner_id'], unique=False)
+    op.drop_index('ix_content_owner_id_url', table_name='content')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_content_owner_id_url', 'content', ['owner_id', 'url'], unique=False)
+    op.drop_index('ix_content_url_hash_owner_id', table_name='content')
+    with op.batch_alter_table('content') as batch_op:
+        batch_op.drop_column('url_hash')
@@ -0,0 +1,41 @@
+"""Add backfill_checkpoints table for resumable data backfills
+
+Revision ID: f2d8b6a31c95
+Revises: e7f1a2c9d804
+Create Date: 2026-10-19 20:14:37.902215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2d8b6a31c95'
+down_revision: Union[str, Sequence[str], None] = 'e7f1a2c9d804'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    From now on, migrations that add derived columns only change the schema;
+    the data is filled in afterwards with `python -m app.backfill`.
+    """
+    op.create_table('backfill_checkpoints',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('rows_done', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('backfill_checkpoints')
@@ -0,0 +1,323 @@
+# app/backfill.py
+"""
+Chunked, resumable data backfills that run while the application is live.
+
+Alembic migrations change the schema; filling a new derived column (a
+counter, a hash, ...) for every existing row in the same migration would be
+one huge transaction that blocks writers for its whole duration. Instead,
+the migration only adds the column, and a backfill fills it in afterwards:
+
+- Rows are visited in primary-key order, `batch_size` at a time, each batch
+  in its own short transaction (keyset pagination: `WHERE id > :last_id`).
+- The batch and its checkpoint (`backfill_checkpoints`) commit together, so
+  an interrupted backfill resumes after the last committed batch.
+- Throttling leaves room for live traffic: an optional rows-per-second cap,
+  and a pause after every batch proportional to how long the batch took.
+- Progress (rows done, rows/sec, estimated time left) is reported as it
+  goes, and `GET /admin/backfills` shows every backfill's checkpoint.
+
+Run from the project root:
+
+    python -m app.backfill list
+    python -m app.backfill run content_url_hash --batch-size 1000 --pause-ratio 1
+    python -m app.backfill run content_url_hash --restart
+
+In sharded mode, a backfill of a sharded table runs on each data shard in
+turn, with a checkpoint per shard.
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Table, bindparam, case, func, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from . import database, models
+from .urls import url_fingerprint
+
+checkpoints = models.BackfillCheckpoint.__table__
+
+
+class BackfillConflict(RuntimeError):
+    """Raised when another runner moved the same backfill's checkpoint."""
+
+
+class Backfill:
+    """
+    One backfill: which rows to visit, and what to do with each batch of them.
+
+    Args:
+        name: Unique name, also the checkpoint's key.
+        table: The table whose rows are visited, by its integer primary key `id`.
+        columns: The columns `process` needs (the key is always included).
+        process: Called as `process(connection, rows)` inside the batch's
+            transaction; it writes whatever the batch needs.
+        where: An optional filter, e.g. only rows where the new column is NULL.
+        description: One line for `python -m app.backfill list`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        table: Table,
+        columns: List[str],
+        process: Callable[[Connection, list], None],
+        where=None,
+        description: str = "",
+    ):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.process = process
+        self.where = where
+        self.description = description
+
+    def batch_query(self, last_id: int, batch_size: int):
+        key = self.table.c.id
+        query = select(key, *(self.table.c[name] for name in self.columns))
+        query = query.where(key > last_id).order_by(key).limit(batch_size)
+        if self.where is not None:
+            query = query.where(self.where)
+        return query
+
+    def remaining_query(self, last_id: int):
+        query = select(func.count()).select_from(self.table).where(self.table.c.id > last_id)
+        if self.where is not None:
+            query = query.where(self.where)
+        return query
+
+
+class Progress:
+    """A snapshot of a run, passed to the runner's `report` callback."""
+
+    def __init__(self, name: str, rows_done: int, rows_total: int, seconds: float, finished: bool):
+        self.name = name
+        self.rows_done = rows_done
+        self.rows_total = rows_total
+        self.seconds = seconds
+        self.finished = finished
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_done / self.seconds if self.seconds else 0.0
+
+    @property
+    def seconds_left(self) -> Optional[float]:
+        if not self.rows_per_second:
+            return None
+        return max(self.rows_total - self.rows_done, 0) / self.rows_per_second
+
+    def __str__(self) -> str:
+        left = "" if self.finished or self.seconds_left is None else f", ~{self.seconds_left:.0f}s left"
+        state = "done" if self.finished else "running"
+        return (
+            f"{self.name}: {state}, {self.rows_done}/{self.rows_total} rows, "
+            f"{self.rows_per_second:.0f} rows/s{left}"
+        )
+
+
+class BackfillRunner:
+    """
+    Runs a `Backfill` against one database, batch by batch.
+
+    Args:
+        engine: The database to run on.
+        batch_size: Rows per batch (and per transaction).
+        max_rows_per_second: If set, batches are spaced out to stay under it.
+        pause_ratio: After each batch, sleep this many times as long as the
+            batch took (1.0 gives live traffic at least half of the time).
+        report: Called with a `Progress` every `report_every` seconds and at the end.
+        sleep: `time.sleep`, replaceable in tests.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        batch_size: int = 1000,
+        max_rows_per_second: Optional[float] = None,
+        pause_ratio: float = 0.0,
+        report: Callable[[Progress], None] = print,
+        report_every: float = 10.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.max_rows_per_second = max_rows_per_second
+        self.pause_ratio = pause_ratio
+        self.report = report
+        self.report_every = report_every
+        self.sleep = sleep
+
+    def _start(self, backfill: Backfill, restart: bool) -> int:
+        """Creates (or with `restart`, resets) the checkpoint; returns its `last_id`."""
+        now = datetime.now(timezone.utc)
+        with self.engine.begin() as connection:
+            checkpoint = connection.execute(
+                select(checkpoints).where(checkpoints.c.name == backfill.name)
+            ).first()
+            if checkpoint is None:
+                connection.execute(insert(checkpoints).values(
+                    name=backfill.name, last_id=0, rows_done=0, status="running",
+                    started_at=now, updated_at=now,
+                ))
+                return 0
+            if restart:
+                connection.execute(
+                    update(checkpoints).where(checkpoints.c.name == backfill.name).values(
+                        last_id=0, rows_done=0, status="running",
+                        started_at=now, updated_at=now, finished_at=None,
+                    )
+                )
+                return 0
+            return checkpoint.last_id
+
+    def _run_batch(self, backfill: Backfill, last_id: int) -> Tuple[int, int]:
+        """
+        Processes the next batch after `last_id` in one transaction, and
+        moves the checkpoint past it.
+
+        Returns:
+            (rows, last_id): the number of rows processed (0 means the
+            backfill is done) and the new position of the checkpoint.
+        """
+        now = datetime.now(timezone.utc)
+        with self.engine.begin() as connection:
+            rows = connection.execute(backfill.batch_query(last_id, self.batch_size)).all()
+            if not rows:
+                values = {"status": "done", "updated_at": now, "finished_at": now}
+            else:
+                backfill.process(connection, rows)
+                values = {
+                    "status": "running",
+                    "last_id": rows[-1].id,
+                    "rows_done": checkpoints.c.rows_done + len(rows),
+                    "updated_at": now,
+                }
+            # Only move the checkpoint from where this batch started, so two
+            # runners of the same backfill can't both apply a batch.
+            result = connection.execute(
+                update(checkpoints)
+                .where(checkpoints.c.name == backfill.name, checkpoints.c.last_id == last_id)
+                .values(**values)
+            )
+            if result.rowcount != 1:
+                raise BackfillConflict(f"Backfill {backfill.name!r} is being run by someone else")
+        return len(rows), rows[-1].id if rows else last_id
+
+    def run(self, backfill: Backfill, restart: bool = False, max_batches: Optional[int] = None) -> Progress:
+        """
+        Runs (or resumes) `backfill` until every row is processed, or until
+        `max_batches` batches have run. Running a finished backfill again
+        processes only the rows added since.
+
+        Returns:
+            Progress: The rows processed by this run (not earlier ones).
+        """
+        last_id = self._start(backfill, restart)
+        with self.engine.connect() as connection:
+            rows_total = connection.execute(backfill.remaining_query(last_id)).scalar_one()
+
+        started = last_report = time.perf_counter()
+        rows_done = batches = 0
+        finished = False
+        while max_batches is None or batches < max_batches:
+            batch_started = time.perf_counter()
+            rows, last_id = self._run_batch(backfill, last_id)
+            if not rows:
+                finished = True
+                break
+            rows_done += rows
+            batches += 1
+            self._throttle(time.perf_counter() - batch_started, rows)
+            now = time.perf_counter()
+            if now - last_report >= self.report_every:
+                self.report(Progress(backfill.name, rows_done, rows_total, now - started, False))
+                last_report = now
+
+        progress = Progress(backfill.name, rows_done, rows_total, time.perf_counter() - started, finished)
+        self.report(progress)
+        return progress
+
+    def _throttle(self, batch_seconds: float, rows: int) -> None:
+        pause = self.pause_ratio * batch_seconds
+        if self.max_rows_per_second:
+            pause = max(pause, rows / self.max_rows_per_second - batch_seconds)
+        if pause > 0:
+            self.sleep(pause)
+
+
+# --- Registered backfills ---
+
+content = models.Content.__table__
+
+
+def _fill_url_hashes(connection: Connection, rows: list) -> None:
+    # An item whose fingerprint changes might now share it with the user's
+    # `unique_url` item for that URL: it stops being one itself.
+    connection.execute(
+        update(content)
+        .where(content.c.id == bindparam("row_id"))
+        .values(
+            url_hash=bindparam("new_hash"),
+            unique_url=case((content.c.url_hash == bindparam("new_hash"), content.c.unique_url), else_=None),
+        ),
+        [{"row_id": row.id, "new_hash": url_fingerprint(row.url)} for row in rows],
+    )
+
+
+BACKFILLS: Dict[str, Backfill] = {
+    backfill.name: backfill
+    for backfill in [
+        Backfill(
+            name="content_url_hash",
+            table=content,
+            columns=["url"],
+            process=_fill_url_hashes,
+            description="Recompute content.url_hash (e.g. after changing URL_TRACKING_PARAMS)",
+        ),
+    ]
+}
+
+
+def engines_for(backfill: Backfill) -> Dict[str, Engine]:
+    """The databases a backfill runs on: every data shard for sharded tables."""
+    if database.shard_engines and backfill.table.name not in database.GLOBAL_TABLES:
+        return dict(database.shard_engines)
+    return {"main": database.engine}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run chunked, resumable data backfills.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list the registered backfills")
+    run = commands.add_parser("run", help="run or resume a backfill")
+    run.add_argument("name", choices=sorted(BACKFILLS))
+    run.add_argument("--batch-size", type=int, default=1000)
+    run.add_argument("--rows-per-second", type=float, default=None)
+    run.add_argument("--pause-ratio", type=float, default=1.0)
+    run.add_argument("--restart", action="store_true", help="start over instead of resuming")
+    run.add_argument("--db-url", default=None, help="run on this database instead of the configured ones")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for backfill in BACKFILLS.values():
+            print(f"{backfill.name:<24}{backfill.description}")
+        return
+
+    backfill = BACKFILLS[args.name]
+    engines = {"main": database.make_engine(args.db_url)} if args.db_url else engines_for(backfill)
+    for shard, engine in engines.items():
+        print(f"[{shard}]")
+        runner = BackfillRunner(
+            engine,
+            batch_size=args.batch_size,
+            max_rows_per_second=args.rows_per_second,
+            pause_ratio=args.pause_ratio,
+        )
+        runner.run(backfill, restart=args.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# app/batching.py
+"""
+Runs the sub-requests of `POST /batch` inside this process.
+
+Each sub-request is an ordinary ASGI request sent through the whole
+application, so routing, validation, rate limits and error responses are
+exactly what a direct call would get. The batch attaches some state to each
+sub-request's scope (read back with `batch_state`):
+
+- the email of the user the batch authenticated as, so that
+  `security.get_current_user` doesn't verify the same JWT again;
+- for sub-requests that run on their own, the batch's database session,
+  which `database.get_db` uses instead of checking out another connection.
+
+Consecutive read-only sub-requests run concurrently (each with its own
+session, as a session must not be used by two threads at once); a
+sub-request that writes waits for everything before it, and everything
+after it waits for it.
+"""
+
+import asyncio
+import json
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .config import settings
+
+# Keys of the batch state in a sub-request's `scope["state"]`.
+IN_BATCH = "in_batch"
+BATCH_USER_EMAIL = "batch_user_email"
+BATCH_SESSION = "batch_session"
+
+# Sub-requests with these methods don't change anything, so consecutive ones
+# can run at the same time.
+CONCURRENT_METHODS = {"GET"}
+
+# Request headers that a sub-request can't set itself: the batch's own
+# credentials apply, and the body is always the sub-request's JSON.
+FIXED_REQUEST_HEADERS = {"authorization", "content-type", "content-length", "accept-encoding"}
+
+# Response headers that describe the raw body, which is decoded into the
+# sub-response instead.
+DROPPED_RESPONSE_HEADERS = {"content-length", "content-encoding", "transfer-encoding"}
+
+
+def batch_state(scope) -> dict:
+    """The batch state of a request's scope (empty for requests that aren't part of a batch)."""
+    state = scope.get("state") or {}
+    return state if state.get(IN_BATCH) else {}
+
+
+def is_allowed(path: str) -> bool:
+    """Batches can't contain batches, or streams that never finish (`ADMISSION_EXEMPT_PATHS`)."""
+    path = path.partition("?")[0]
+    return path != "/batch" and path not in settings.ADMISSION_EXEMPT_PATHS
+
+
+def _decode_body(headers: dict, body: bytes):
+    if not body:
+        return None
+    if headers.get("content-type", "").startswith("application/json"):
+        return json.loads(body)
+    return body.decode("utf-8", "replace")
+
+
+async def call(app, parent_scope: dict, request: schemas.BatchSubRequest, state: dict) -> dict:
+    """
+    Sends one sub-request through `app` and collects its response.
+
+    Returns:
+        dict: The sub-response (`schemas.BatchSubResponse` fields).
+    """
+    body = b"" if request.body is None else json.dumps(request.body).encode()
+    headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in request.headers.items()
+        if name.lower() not in FIXED_REQUEST_HEADERS
+    ]
+    headers += [(name, value) for name, value in parent_scope["headers"] if name == b"authorization"]
+    if request.body is not None:
+        headers.append((b"content-type", b"application/json"))
+    headers.append((b"content-length", str(len(body)).encode()))
+
+    path, _, query = request.path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": parent_scope.get("asgi", {"version": "3.0"}),
+        "http_version": parent_scope.get("http_version", "1.1"),
+        "method": request.method,
+        "scheme": parent_scope.get("scheme", "http"),
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": parent_scope.get("root_path", ""),
+        "query_string": query.encode(),
+        "headers": headers,
+        "client": parent_scope.get("client"),
+        "server": parent_scope.get("server"),
+        "state": {IN_BATCH: True, **state},
+    }
+
+    response = {"status": 500, "headers": {}}
+    chunks: List[bytes] = []
+    body_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Like a client that stays connected until the response is complete.
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            for name, value in message.get("headers", []):
+                name = name.decode("latin-1").lower()
+                if name not in DROPPED_RESPONSE_HEADERS:
+                    response["headers"][name] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # Starlette's ServerErrorMiddleware sends its 500 response and then
+        # re-raises the error. Keep the failure to this sub-request: it gets
+        # a 500, and the rest of the batch carries on.
+        if not finished.is_set() or response["status"] >= 500:
+            response = {"status": 500, "headers": {"content-type": "application/json"}}
+            chunks = [json.dumps({"detail": "Internal Server Error"}).encode()]
+    finally:
+        finished.set()
+    response["body"] = _decode_body(response["headers"], b"".join(chunks))
+    return {"id": request.id, **response}
+
+
+async def run(
+    app,
+    parent_scope: dict,
+    requests: List[schemas.BatchSubRequest],
+    user_email: Optional[str],
+    db: Session,
+) -> List[dict]:
+    """
+    Runs a batch's sub-requests and returns their responses, in the same order.
+
+    Runs of consecutive GETs execute concurrently (at most
+    `settings.BATCH_CONCURRENCY` at a time); every other sub-request runs on
+    its own, in order, with the batch's session `db`.
+    """
+    responses: List[Optional[dict]] = [None] * len(requests)
+    limit = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    user_state = {BATCH_USER_EMAIL: user_email} if user_email else {}
+
+    async def run_one(index: int, state: dict) -> None:
+        request = requests[index]
+        if not is_allowed(request.path):
+            responses[index] = {
+                "id": request.id, "status": 400, "headers": {},
+                "body": {"detail": f"{request.path} can't be called in a batch"},
+            }
+            return
+        async with limit:
+            responses[index] = await call(app, parent_scope, request, state)
+
+    async def run_group(group: List[int]) -> None:
+        if len(group) == 1:
+            # Nothing else runs meanwhile, so the batch's session is free.
+            await run_one(group[0], {**user_state, BATCH_SESSION: db})
+        elif group:
+            await asyncio.gather(*(run_one(index, user_state) for index in group))
+
+    group: List[int] = []
+    for index, request in enumerate(requests):
+        if request.method in CONCURRENT_METHODS:
+            group.append(index)
+            continue
+        await run_group(group)
+        group = []
+        await run_group([index])
+    await run_group(group)
+    return responses
@@ -0,0 +1,135 @@
+# app/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .config import settings
+
+
+class InProcessVersions:
+    """
+    A version counter per cache key, kept in this process.
+
+    A mutator bumps the counter of every key its change affects, and a cached
+    entry is only served while the version it was stored with is still the
+    current one. Only changes made by this worker are seen; for several
+    workers, replace it (see `EntityCache.set_versions`) with a store shared
+    by all of them (e.g. Redis `INCR`/`MGET`) that exposes the same methods.
+
+    Counters are never reset individually, as that could make an old entry
+    look current again. When there are more than `max_keys` of them, they
+    are all dropped and every key starts from a new, higher floor instead,
+    which invalidates the whole cache at once.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._floor = 0
+        self._versions: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> int:
+        with self._lock:
+            return self._versions.get(key, self._floor)
+
+    def bump(self, key: Hashable) -> None:
+        with self._lock:
+            self._versions[key] = self._versions.get(key, self._floor) + 1
+            if len(self._versions) > self.max_keys:
+                self._floor = max(self._versions.values()) + 1
+                self._versions.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._floor += 1
+            self._versions.clear()
+
+
+class EntityCache:
+    """
+    A size-bounded LRU of entity rows, looked up by key, e.g. ("tags", "name", "python").
+
+    Entries are plain column values (or None, to remember that nothing
+    matched the key), never ORM objects, so one entry can be attached to any
+    request's session. Each entry records the key's version when it was
+    read; `get` treats it as a miss once the key has been bumped since, or
+    once it is older than `ttl` seconds. With `InProcessVersions`, the TTL
+    is what bounds how long a change made by another worker goes unseen.
+    """
+
+    def __init__(self, max_size: int, versions: InProcessVersions, ttl: Optional[float] = None, clock=time.monotonic):
+        self.max_size = max_size
+        self.versions = versions
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def set_versions(self, versions) -> None:
+        self.versions = versions
+        self.clear()
+
+    def version(self, key: Hashable) -> int:
+        """The key's current version; read it *before* loading the row to `put`."""
+        return self.versions.get(key)
+
+    def get(self, key: Hashable) -> Tuple[bool, Optional[Any]]:
+        """
+        Returns:
+            (hit, row): `row` is None on a miss, and also on a hit for a key
+            that is known not to exist.
+        """
+        current = self.versions.get(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != current or self._expired(entry[1]):
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+
+    def put(self, key: Hashable, version: int, row: Optional[Any]) -> None:
+        if self.max_size <= 0 or version != self.versions.get(key):
+            return
+        with self._lock:
+            self._entries[key] = (version, self.clock(), row)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and self.clock() - stored_at >= self.ttl
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """Bumps the version of every key, so their entries are reloaded on next use."""
+        for key in keys:
+            self.versions.bump(key)
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.versions.clear()
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# The process-wide cache under `crud.get_tag_by_id` and `get_tag_by_name`.
+# User rows are never cached: they carry what authentication and
+# authorization check (`hashed_password` at login, `email` against
+# ADMIN_EMAILS), which must be current on every request.
+entity_cache = EntityCache(
+    max_size=settings.ENTITY_CACHE_SIZE,
+    versions=InProcessVersions(max_keys=max(10 * settings.ENTITY_CACHE_SIZE, 1)),
+    ttl=settings.ENTITY_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,77 @@
+# app/calibrate.py
+"""
+Picks the bcrypt cost (BCRYPT_ROUNDS) for this machine.
+
+bcrypt's cost is a power of two, so each step up doubles the time a login
+takes. This times one hash at each cost, from the minimum upwards, and
+recommends the highest cost whose hash time stays within the budget.
+Run it on the hardware that serves logins:
+
+    python -m app.calibrate --target-ms 250
+
+and put the printed `BCRYPT_ROUNDS=...` line in the environment (or .env).
+Existing hashes are upgraded to the new cost as users log in.
+"""
+
+import argparse
+import statistics
+import time
+from typing import List, Tuple
+
+from passlib.hash import bcrypt
+
+# bcrypt's own limits on the cost factor.
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+
+def time_hash(rounds: int, samples: int = 3) -> float:
+    """The median time, in seconds, of hashing a password at `rounds`."""
+    hasher = bcrypt.using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.hash("calibration-password")
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(target_seconds: float, samples: int = 3, max_rounds: int = MAX_ROUNDS) -> Tuple[int, List[Tuple[int, float]]]:
+    """
+    Finds the highest bcrypt cost whose hash time is within `target_seconds`.
+
+    Costs are timed in increasing order and the search stops at the first
+    one over budget, so it takes at most about twice the budget per sample.
+
+    Returns:
+        (rounds, timings): the recommended cost (at least MIN_ROUNDS, even if
+        that is over budget), and the (cost, seconds) pairs that were measured.
+    """
+    # The first hash also loads the bcrypt backend; keep that out of the timings.
+    time_hash(MIN_ROUNDS, samples=1)
+    best = MIN_ROUNDS
+    timings = []
+    for rounds in range(MIN_ROUNDS, max_rounds + 1):
+        seconds = time_hash(rounds, samples)
+        timings.append((rounds, seconds))
+        if seconds > target_seconds:
+            break
+        best = rounds
+    return best, timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=250.0, help="hash time budget per login (default: 250)")
+    parser.add_argument("--samples", type=int, default=3, help="hashes timed per cost (default: 3)")
+    args = parser.parse_args()
+
+    rounds, timings = calibrate(args.target_ms / 1000, samples=args.samples)
+    print(f"{'cost':<6}{'hash time':>12}")
+    for cost, seconds in timings:
+        print(f"{cost:<6}{seconds * 1000:>9.1f} ms")
+    print(f"BCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# app/compression.py
+
+import gzip
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import settings
+
+# brotli and zstandard are optional. If they are not installed, clients that
+# ask for them simply get gzip (or an uncompressed response) instead.
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+
+# `level` is always given on gzip's 1-9 scale and mapped onto each codec's own range.
+def _gzip(body: bytes, level: int) -> bytes:
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _brotli(body: bytes, level: int) -> bytes:
+    return brotli.compress(body, quality=round(level * 11 / 9))
+
+
+def _zstd(body: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+
+# Available encodings, in the order we prefer them when the client accepts several.
+ENCODERS: List[Tuple[str, Callable[[bytes, int], bytes]]] = [
+    name_and_encoder
+    for name_and_encoder, available in [
+        (("zstd", _zstd), zstandard is not None),
+        (("br", _brotli), brotli is not None),
+        (("gzip", _gzip), True),
+    ]
+    if available
+]
+
+
+def choose_encoding(accept_encoding: str) -> Optional[Tuple[str, Callable[[bytes, int], bytes]]]:
+    """Picks the preferred encoding the client accepts (honouring `q=0`)."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    for name, encoder in ENCODERS:
+        if name in accepted or "*" in accepted:
+            return name, encoder
+    return None
+
+
+# Streamed a message at a time; never compressed, even if a prefix in the
+# levels (e.g. "text/") matches them.
+STREAMING_TYPES = {"text/event-stream"}
+
+
+def level_for(content_type: str, levels: Dict[str, int]) -> Optional[int]:
+    """
+    Returns the compression level for a content type, or None if it should
+    not be compressed. Keys in `levels` are matched as prefixes, so "text/"
+    covers every text type (except `STREAMING_TYPES`).
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in STREAMING_TYPES:
+        return None
+    best = None
+    for prefix, level in levels.items():
+        if media_type.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+            best = (prefix, level)
+    return best[1] if best else None
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses response bodies with zstd, brotli or gzip.
+
+    - Only responses at least `minimum_size` bytes long are compressed; for
+      small bodies the headers cost more than the savings.
+    - The level depends on the content type (`settings.COMPRESSION_LEVELS`).
+      Types that are not listed (e.g. images) are sent as-is.
+    - Streaming responses (such as server-sent events) are passed through
+      untouched, because buffering them would delay every event. Their
+      headers are sent as soon as the application starts the response.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None, levels: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+        self.levels = settings.COMPRESSION_LEVELS if levels is None else levels
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        level = None
+
+        async def compressing_send(message):
+            nonlocal start_message, level
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = next(
+                    (value.decode("latin-1") for name, value in headers if name.lower() == b"content-type"), ""
+                )
+                level = level_for(content_type, self.levels)
+                if level is None or any(name.lower() == b"content-encoding" for name, _ in headers):
+                    # Never compressed: don't make the client wait for the headers.
+                    await send(message)
+                    return
+                # Hold the headers back until we know how large the body is.
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = list(start.get("headers", []))
+
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                await send(start)
+                await send(message)
+                return
+
+            name, encoder = encoding
+            compressed = encoder(body, level)
+            headers = [(key, value) for key, value in headers if key.lower() != b"content-length"]
+            headers += [
+                (b"content-encoding", name.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, compressing_send)
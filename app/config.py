@@ -13,12 +13,198 @@ class Settings(BaseSettings):
 
     # ALGORITHM: The cryptographic algorithm used for encoding JWTs.
     # HS256 (HMAC using SHA-256) is a common and secure choice.
+    # Asymmetric algorithms (RS256, ES256) let other services verify tokens
+    # with a public key; they require JWT_PRIVATE_KEY_FILE.
     ALGORITHM: str = "HS256"
 
+    # The id of the key tokens are currently signed with (the `kid` header).
+    JWT_KEY_ID: str = "primary"
+
+    # For asymmetric algorithms: the PEM file of the current signing key, and
+    # the public keys (kid -> PEM file) of older keys that are still accepted.
+    JWT_PRIVATE_KEY_FILE: str | None = None
+    JWT_PUBLIC_KEY_FILES: dict[str, str] = {}
+
+    # For HS algorithms: secrets (kid -> secret) of older keys that are still
+    # accepted while tokens signed with them expire.
+    JWT_RETIRED_SECRET_KEYS: dict[str, str] = {}
+
+    # bcrypt cost factor (log2 of the number of rounds) for new password
+    # hashes. Pick it for your hardware with `python -m app.calibrate`.
+    # Stored hashes with a lower cost are upgraded when their user next logs in.
+    BCRYPT_ROUNDS: int = 12
+
+    # How many already-verified tokens to remember, so repeated requests with
+    # the same token skip the signature check. 0 disables the cache.
+    TOKEN_VERIFY_CACHE_SIZE: int = 1024
+
     # Defines the lifetime of the access token in  minutes.
     # After this time, the user will need to log in again.
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # How long (in seconds) a response stored under an `Idempotency-Key` is
+    # replayed for retries of the same request.
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+
+    # Upper bound on the number of idempotency keys kept in memory. When the
+    # store is full, the oldest keys are evicted first.
+    IDEMPOTENCY_MAX_KEYS: int = 10_000
+
+    # When enabled, creating content with a URL the user has already saved
+    # (compared after normalization, see `urls.normalize_url`) updates that
+    # item instead of inserting a duplicate row, even for concurrent requests
+    # (a unique index arbitrates, see `crud.create_user_content`). This is the
+    # default of the `on_duplicate` option of `POST /content/`.
+    CONTENT_UPSERT_BY_URL: bool = False
+
+    # Query parameters removed when URLs are normalized for duplicate detection
+    # (shell-style patterns, matched case-insensitively). Changing this changes
+    # the stored `content.url_hash` fingerprints; recompute them afterwards
+    # with `python -m app.backfill run content_url_hash --restart`.
+    URL_TRACKING_PARAMS: list[str] = [
+        "utm_*", "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid",
+        "mc_cid", "mc_eid", "_ga", "_hsenc", "_hsmi",
+    ]
+
+    # Size of the database connection pool, and how many extra connections may
+    # be opened on top of it under load.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+
+    # Optional sharding. When set, users and their content are spread across
+    # these databases by a hash of the user id, and the main database only
+    # holds the global tables (tags, tag statistics, id allocation). Every
+    # database needs the full schema (run the migrations against each one).
+    SHARD_DATABASE_URLS: list[str] = []
+
+    # Token-bucket rate limiting, applied per client and per route.
+    # Limits are written as "<requests>/<second|minute|hour>". A client is the
+    # `sub` of a valid bearer token, or the remote address for anonymous calls.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_DEFAULT: str = "120/minute"
+    # Per-route overrides, matched by the longest path prefix.
+    RATE_LIMIT_ROUTES: dict[str, str] = {"/token": "10/minute", "/feed": "60/minute"}
+    # Upper bound on the number of tracked (route, client) buckets.
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+
+    # Maximum number of requests processed at once. Requests beyond this are
+    # rejected with 503 instead of queueing for a database connection.
+    # Defaults to the size of the connection pool (pool size + overflow).
+    MAX_CONCURRENT_REQUESTS: int | None = None
+    # Long-lived streaming endpoints that don't hold a database connection,
+    # and so don't count towards MAX_CONCURRENT_REQUESTS.
+    ADMISSION_EXEMPT_PATHS: list[str] = ["/feed/stream"]
+
+    # Load the content/tag/follow graph into memory at startup and serve
+    # `/feed` from it instead of joining `content_tags` on every request.
+    FEED_GRAPH_ENABLED: bool = False
+
+    # Maximum number of IDs accepted by the batch endpoints (`?ids=...`).
+    MAX_BATCH_IDS: int = 100
+
+    # `POST /batch`: the maximum number of sub-requests per batch, and how
+    # many of them may run at once (each concurrent one uses a database
+    # connection, so keep this well below the pool size).
+    MAX_BATCH_REQUESTS: int = 20
+    BATCH_CONCURRENCY: int = 4
+
+    # Bulk deletes (`DELETE /content?ids=`, `DELETE /users/me/content`) remove
+    # at most this many items per statement (and, for purges, per transaction).
+    DELETE_BATCH_SIZE: int = 500
+
+    # Retention: content older than CONTENT_RETENTION_DAYS is moved to the
+    # `content_archive` table, ARCHIVE_BATCH_SIZE items per transaction, every
+    # ARCHIVE_INTERVAL_SECONDS. None disables archiving.
+    CONTENT_RETENTION_DAYS: int | None = None
+    ARCHIVE_BATCH_SIZE: int = 1000
+    ARCHIVE_INTERVAL_SECONDS: int = 60 * 60
+
+    # How many tag lookups (by id or name, including misses) each worker keeps
+    # in its entity cache. 0 (the default) disables the cache. A worker only
+    # sees its own changes right away; it serves another worker's entries
+    # until they are ENTITY_CACHE_TTL_SECONDS old, so only enable it with
+    # several workers if tags that are that stale are acceptable.
+    ENTITY_CACHE_SIZE: int = 0
+    ENTITY_CACHE_TTL_SECONDS: float = 60
+
+    # Related content ("more like this"): how many neighbours are precomputed
+    # per item, and how often (in seconds) the whole index is rebuilt so tag
+    # weights stay current. 0 disables the periodic rebuild (the index is
+    # still built once, in the background, when the application starts).
+    RELATED_CONTENT_TOP_K: int = 20
+    RELATED_REBUILD_SECONDS: int = 60 * 60
+
+    # Trending tags: tag activity is counted in 1-hour buckets, which are
+    # compacted into 24-hour buckets once older than TRENDING_HOURLY_HOURS and
+    # dropped after TRENDING_RETENTION_HOURS (the longest trending window).
+    # Compaction runs every TRENDING_COMPACT_SECONDS; 0 disables it.
+    TRENDING_HOURLY_HOURS: int = 48
+    TRENDING_RETENTION_HOURS: int = 7 * 24
+    TRENDING_COMPACT_SECONDS: int = 60 * 60
+
+    # Link previews: after content is saved, a background pipeline fetches its
+    # URL and stores the page's title, description, image and site name.
+    # At most ENRICHMENT_CONCURRENCY pages are fetched at once (the size of
+    # the HTTP connection pool), and at most ENRICHMENT_PER_HOST_CONCURRENCY
+    # from any one host. A fetch fails after ENRICHMENT_TIMEOUT_SECONDS, and
+    # only the first ENRICHMENT_MAX_BYTES of a page are read.
+    ENRICHMENT_ENABLED: bool = False
+    ENRICHMENT_CONCURRENCY: int = 20
+    ENRICHMENT_PER_HOST_CONCURRENCY: int = 2
+    ENRICHMENT_TIMEOUT_SECONDS: float = 5.0
+    ENRICHMENT_MAX_BYTES: int = 256 * 1024
+    # Results (failures too) are cached by normalized URL, so a popular link is
+    # fetched once per ENRICHMENT_CACHE_TTL_SECONDS, for up to
+    # ENRICHMENT_CACHE_SIZE URLs. 0 disables the cache.
+    ENRICHMENT_CACHE_SIZE: int = 10_000
+    ENRICHMENT_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+    # Previews are written ENRICHMENT_BATCH_SIZE items per UPDATE, and at
+    # least every ENRICHMENT_FLUSH_SECONDS. Items waiting to be fetched beyond
+    # ENRICHMENT_QUEUE_SIZE are dropped (they keep an empty preview).
+    ENRICHMENT_BATCH_SIZE: int = 100
+    ENRICHMENT_FLUSH_SECONDS: float = 1.0
+    ENRICHMENT_QUEUE_SIZE: int = 10_000
+    # Fetch URLs whose host is a private, loopback or link-local address. Off
+    # by default, so that saving a link can't make the server probe the
+    # internal network.
+    ENRICHMENT_ALLOW_PRIVATE_HOSTS: bool = False
+
+    # The longest date range (in days) the `/stats` endpoints accept.
+    STATS_MAX_DAYS: int = 366
+
+    # Server-sent events (`GET /feed/stream`): how many recent events are kept
+    # for clients resuming with `Last-Event-ID`, how many undelivered events a
+    # slow client may have queued before it is disconnected, and how often an
+    # idle connection gets a keep-alive comment.
+    EVENT_HISTORY_SIZE: int = 1000
+    EVENT_SUBSCRIBER_QUEUE_SIZE: int = 100
+    FEED_STREAM_HEARTBEAT_SECONDS: float = 15.0
+
+    # Users (by email) allowed to use the `/admin` endpoints.
+    ADMIN_EMAILS: list[str] = []
+
+    # Sampling profiler (`POST /admin/profile`, and the `X-Profile: 1` header
+    # for single requests). Stacks are sampled every
+    # PROFILE_SAMPLE_INTERVAL_SECONDS, slowed down if sampling would take more
+    # than PROFILE_MAX_OVERHEAD (a fraction) of the time. The last
+    # PROFILE_MAX_STORED per-request profiles are kept for download.
+    PROFILE_SAMPLE_INTERVAL_SECONDS: float = 0.005
+    PROFILE_MAX_OVERHEAD: float = 0.02
+    PROFILE_MAX_SECONDS: int = 60
+    PROFILE_MAX_STORED: int = 20
+
+    # Response compression (zstd, brotli or gzip, whichever the client accepts).
+    # Bodies smaller than COMPRESSION_MINIMUM_SIZE bytes are sent uncompressed.
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 500
+    # Compression level (on gzip's 1-9 scale) per content type prefix. Content
+    # types that are not listed here are never compressed.
+    COMPRESSION_LEVELS: dict[str, int] = {
+        "application/json": 6,
+        "text/html": 6,
+        "text/plain": 4,
+    }
+
     # model_config is a special Pydantic configuration attribute.
     # It instructs the Settings class to load values from a file named ".env" using UTF-8 encoding.
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
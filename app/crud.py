@@ -1,8 +1,144 @@
-from typing import List, Optional
+import base64
+import heapq
+import json
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from typing import List, Optional, Tuple, Union
 
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.ext.horizontal_shard import set_shard_id
+from sqlalchemy.orm import Session, make_transient_to_detached, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import asc, case, delete, desc, func, inspect, literal, select, tuple_, union_all, update
+from sqlalchemy.sql import Select
+from sqlalchemy.dialects import postgresql, sqlite
 from . import models, schemas, security
+from .cache import entity_cache
+from .config import settings
+from .database import allocate_ids, run_after_commit, shard_for_user
+from .enrichment import enricher
+from .events import bus, tag_topic
+from .graph import feed_graph
+from .related import related_index
+from .rows import ContentRow, TagRow
+from .urls import url_fingerprint
+
+# Note on transactions: mutators below only `flush()` their changes, which
+# sends the SQL but does not commit. The request's unit of work
+# (`database.get_db`) commits once after the endpoint returns. Server-side
+# defaults such as `created_at` come back from the INSERT itself via
+# RETURNING (see `eager_defaults` on the models), so no refresh is needed.
+
+
+def _dialect_insert(db: Session):
+    """Returns the `insert()` construct with ON CONFLICT support for the session's database."""
+    bind = db.bind if db.bind is not None else db.get_bind()
+    if bind.dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+def _replicate(db: Session, model, rows: List[dict]) -> None:
+    """
+    In sharded mode, copies rows of a global table into every data shard, so
+    shard-local queries can join it. Does nothing when sharding is off.
+    """
+    for shard_id in db.info.get("data_shards", ()):
+        connection = db.connection(bind_arguments={"shard_id": shard_id})
+        connection.execute(_dialect_insert(db)(model.__table__).on_conflict_do_nothing(), rows)
+
+def _scatter_gather(
+    db: Session, statement, skip: int, limit: int, newest_first: bool, as_rows: bool = False
+) -> list:
+    """
+    Runs a content SELECT ordered by (created_at, id) and returns rows
+    `skip` to `skip + limit`: `models.Content` objects, or with `as_rows`
+    the plain result rows of a SELECT of columns.
+
+    In sharded mode, each data shard is asked for its first `skip + limit`
+    rows, and the sorted per-shard results are combined with a k-way merge.
+    """
+    def fetch(statement, shard_id=None):
+        if as_rows:
+            bind_arguments = {"shard_id": shard_id} if shard_id else None
+            return db.execute(statement, bind_arguments=bind_arguments).all()
+        if shard_id:
+            statement = statement.options(set_shard_id(shard_id))
+        return db.execute(statement).scalars().all()
+
+    data_shards = db.info.get("data_shards")
+    if not data_shards:
+        return fetch(statement.offset(skip).limit(limit))
+
+    per_shard = [fetch(statement.limit(skip + limit), shard_id) for shard_id in data_shards]
+    merged = heapq.merge(
+        *per_shard, key=lambda content: (content.created_at, content.id), reverse=newest_first
+    )
+    return list(islice(merged, skip, skip + limit))
+
+def _increment_counters(db: Session, model, rows: List[dict], amount: int = 1) -> None:
+    """
+    Adds `amount` to the `count` column of several counter rows in one statement.
+
+    Each dict in `rows` holds the primary key of one counter row, and may
+    carry its own "count" to add instead of `amount`. Rows that don't exist
+    yet are inserted with that count (an upsert), so callers never need to
+    check first.
+    """
+    if not rows:
+        return
+    # A Core insert on the table (rather than an ORM bulk insert), which
+    # sharded sessions can route like any other statement.
+    table = model.__table__
+    insert = _dialect_insert(db)(table)
+    statement = insert.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={"count": table.c.count + insert.excluded.count},
+    )
+    db.execute(statement, [{"count": amount, **row} for row in rows])
+
+
+def _cached_lookup(db: Session, model, key: tuple, load):
+    """
+    Read-through lookup of a single tag in `cache.entity_cache`.
+
+    On a hit, the cached column values are attached to `db` as a persistent
+    instance without running any SQL (relationships still load lazily, so
+    they are always current). A cached None means the key is known not to
+    exist. On a miss, `load()` runs the query, and the result (or the miss)
+    is cached once the session commits, so rolled-back reads never are.
+
+    Mutators must call `_invalidate_entities` for every key they change.
+    """
+    hit, row = entity_cache.get(key)
+    if hit:
+        if row is None:
+            return None
+        identity_token, values = row
+        instance = model(**values)
+        make_transient_to_detached(instance)
+        state = inspect(instance)
+        state.key = state.mapper.identity_key_from_primary_key(
+            [values["id"]], identity_token=identity_token
+        )
+        instance = db.merge(instance, load=False)
+        # In sharded mode, lazy loads go to the shard named by the token.
+        inspect(instance).identity_token = identity_token
+        return instance
+
+    version = entity_cache.version(key)
+    instance = load()
+    row = None
+    if instance is not None:
+        state = inspect(instance)
+        values = {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+        row = (state.identity_token, values)
+    run_after_commit(db, entity_cache.put, key, version, row)
+    return instance
+
+def _invalidate_entities(db: Session, *keys: tuple) -> None:
+    """Bumps the cache versions of `keys` once the change to them is committed."""
+    run_after_commit(db, entity_cache.invalidate, *keys)
+
 
 def get_user_by_email(db: Session, email:str):
     return db.query(models.User).filter(models.User.email == email).first()
@@ -16,68 +152,190 @@ def create_user(db: Session, user: schemas.UserCreate):
     Creates a new user in the database.
     1. Hashes the plain-text password.
     2. Creates a new SQLAlchemy User model instance.
-    3. Adds it to the session, commits it to the DB, and refreshes the instance.
+    3. Adds it to the session and flushes it, so the DB assigns its id and created_at.
     """
     # Step 1: Hash the password from the incoming user data.
     hashed_password = security.get_password_hash(user.password)
 
     # Step 2: Create a SQLAlchemy User model instance from the data.
     # We DON'T store the plain 'user.password'. We store the 'hashed_password'.
+    # A brand-new user has no content or followed tags; starting both lists
+    # empty means serializing the response doesn't query for them.
     db_user = models.User(
         email=user.email, 
         full_name=user.full_name,
-        hashed_password=hashed_password
+        hashed_password=hashed_password,
+        content=[],
+        followed_tags=[],
     )
 
     # Step 3: Add the new user object to the database session.
     db.add(db_user)
 
-    # Step 4: Commit the changes to the database. This is what actually saves it. 
-    db.commit()
-
-    # Step 5: Refresh the 'db_user' instance. This makes the database return
-    # the new data that was created, like the auto-generated 'id' and 'created_at'.
-    db.refresh(db_user)
+    # Step 4: Flush the INSERT. The database returns the new data that was
+    # created, like the auto-generated 'id' and 'created_at', in the same
+    # round trip. The request's unit of work commits it.
+    db.flush()
     
-    # Step 6: Return the new user instance.
+    # Step 5: Return the new user instance.
     return db_user
 
-def create_user_content(db: Session, content: schemas.ContentCreate, user_id: int) -> models.Content:
-    """Creates a new content item in the DB associated with a user."""
-    db_content = models.Content(**content.dict(), owner_id=user_id)
-    db.add(db_content)
-    db.commit()
-    db.refresh(db_content)
+def rehash_user_password(db: Session, user_id: int, old_hash: str, password: str) -> bool:
+    """
+    Replaces a user's outdated password hash with one made with the current
+    settings (see `security.needs_rehash`). Called after a successful login,
+    the only time the plain password is known.
+
+    The UPDATE only applies while the stored hash is still `old_hash`, so a
+    password change that happened in the meantime is never overwritten.
+
+    Returns:
+        bool: True if the hash was replaced.
+    """
+    new_hash = security.get_password_hash(password)
+    result = db.execute(
+        update(models.User)
+        .where(models.User.id == user_id, models.User.hashed_password == old_hash)
+        .values(hashed_password=new_hash)
+    )
+    return bool(result.rowcount)
+
+def get_content_by_url(db: Session, url: str, owner_id: Optional[int] = None, limit: int = 100) -> List[models.Content]:
+    """
+    Returns the content items whose URL normalizes to the same URL as `url`
+    (see `urls.normalize_url`), oldest first, optionally only `owner_id`'s.
+
+    This is an index lookup on the fingerprint (`content.url_hash`), however
+    large the table is.
+    """
+    query = db.query(models.Content).filter(models.Content.url_hash == url_fingerprint(url))
+    if owner_id is not None:
+        query = query.filter(models.Content.owner_id == owner_id)
+    return query.order_by(models.Content.id).limit(limit).all()
+
+def create_user_content(
+    db: Session,
+    content: schemas.ContentCreate,
+    user_id: int,
+    on_duplicate: Optional[schemas.DuplicateMode] = None,
+) -> Optional[models.Content]:
+    """
+    Creates a new content item in the DB associated with a user.
+
+    `on_duplicate` decides what happens when the user has already saved the
+    same URL (after normalization, so tracking parameters, letter case in the
+    host, etc. don't matter):
+
+    - "allow": create another item anyway.
+    - "update": treat it as an update of the existing item, so a retried
+      submission does not create a duplicate row.
+    - "reject": create nothing and return None.
+
+    It defaults to "update" when `settings.CONTENT_UPSERT_BY_URL` is enabled,
+    and to "allow" otherwise.
+
+    "update" and "reject" hold under concurrency: a retry usually finds the
+    item with an index lookup, and when two requests for the same URL race
+    past that lookup, the unique index on `unique_url` lets only one of them
+    insert (see `_insert_unique_content`); the other then updates (or
+    rejects) the item the first one saved.
+    """
+    if on_duplicate is None:
+        on_duplicate = "update" if settings.CONTENT_UPSERT_BY_URL else "allow"
+    if on_duplicate == "allow":
+        db_content = models.Content(
+            **content.dict(), url_hash=url_fingerprint(content.url), owner_id=user_id, tags=[]
+        )
+        db.add(db_content)
+        db.flush()
+    else:
+        existing = get_content_by_url(db, content.url, owner_id=user_id, limit=1)
+        db_content = None if existing else _insert_unique_content(db, content, user_id)
+        if db_content is None:
+            # Saved before, or by a concurrent request since the lookup.
+            existing = existing or get_content_by_url(db, content.url, owner_id=user_id, limit=1)
+            if on_duplicate == "reject":
+                return None
+            return update_content(db, content=existing[0], content_update=content)
+
+    _count_daily_stats(db, [(db_content.created_at, user_id)])
+    _enrich_link(db, db_content)
     return db_content
 
-def create_tag(db: Session, tag: schemas.TagCreate) -> models.Tag:
+def _insert_unique_content(db: Session, content: schemas.ContentCreate, user_id: int) -> Optional[models.Content]:
+    """
+    Inserts a content item marked `unique_url`, with `INSERT ... ON CONFLICT
+    DO NOTHING RETURNING` on the unique (owner_id, url_hash, unique_url)
+    index, like `create_tag` does for tag names.
+
+    Returns:
+        Optional[models.Content]: The new item, or None if the user already
+                                  has a `unique_url` item for this URL.
+    """
+    values = {**content.dict(), "url_hash": url_fingerprint(content.url), "owner_id": user_id, "unique_url": True}
+    bind_arguments = None
+    data_shards = db.info.get("data_shards")
+    if data_shards:
+        # A flush gives new objects their global id and routes them to their
+        # owner's shard; an INSERT statement has to do both itself.
+        values["id"] = allocate_ids(db.bind, models.Content.__tablename__, 1)[0]
+        bind_arguments = {"shard_id": shard_for_user(user_id, data_shards)}
+    statement = (
+        _dialect_insert(db)(models.Content)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=["owner_id", "url_hash", "unique_url"])
+        .returning(models.Content)
+    )
+    db_content = db.scalars(statement, bind_arguments=bind_arguments).first()
+    if db_content is not None:
+        # A new item has no tags; don't query for them.
+        set_committed_value(db_content, "tags", [])
+    return db_content
+
+def _enrich_link(db: Session, content: models.Content) -> None:
+    """Has the link preview of the content fetched in the background, once committed."""
+    run_after_commit(db, enricher.submit, content.id, content.owner_id, content.url)
+
+def _publish_feed_item(db: Session, content: models.Content, tag: models.Tag) -> None:
+    """Tells `/feed/stream` subscribers of `tag` about the content, once committed."""
+    event = {"content_id": content.id, "tag_id": tag.id, "title": content.title, "url": content.url}
+    run_after_commit(db, bus.publish, tag_topic(tag.id), event)
+
+def create_tag(db: Session, tag: schemas.TagCreate) -> Optional[models.Tag]:
     """
     Creates and saves a new tag to the database.
 
+    The unique index on `tags.name` is the source of truth for duplicates:
+    we run `INSERT ... ON CONFLICT DO NOTHING RETURNING`, which either returns
+    the new row or nothing if the name is taken, instead of checking and then
+    inserting (which races under concurrency).
+
     Args:
         db (Session): The SQLAlchemy database session dependency.
         tag (schemas.TagCreate): A Pydantic model containing the data for the new tag
                                 (in this case, just the 'name').
 
     Returns:
-        models.Tag: The new SQLAlchemy Tag object that has been saved to the database,
-                    including its database-generated ID.
+        Optional[models.Tag]: The new SQLAlchemy Tag object that has been saved to the database,
+                              including its database-generated ID, or None if a tag
+                              with this name already exists.
     """
-    # Create an instance of our SQLAlchemy `Tag` model.
-    # We get the 'name' from the Pydantic `tag` object.
-    db_tag = models.Tag(name=tag.name)
-    
-    # Add the new model instance to the session (staging area).
-    db.add(db_tag)
-    
-    # Commit the session to write the new tag to the database.
-    db.commit()
-    
-    # Refresh the `db_tag` instance to get the values generated by the database,
-    # like the new 'id'.
-    db.refresh(db_tag)
-    
-    # Return the complete, saved Tag object.
+    # Build the INSERT for the `tags` table. We get the 'name' from the Pydantic `tag` object.
+    # If another request created the same name first, the unique index turns
+    # this insert into a no-op and no row comes back.
+    statement = (
+        _dialect_insert(db)(models.Tag)
+        .values(name=tag.name)
+        .on_conflict_do_nothing(index_elements=["name"])
+        .returning(models.Tag)
+    )
+
+    db_tag = db.scalars(statement).first()
+    if db_tag is not None:
+        _replicate(db, models.Tag, [{"id": db_tag.id, "name": db_tag.name}])
+        _invalidate_entities(db, ("tags", "name", db_tag.name), ("tags", "id", db_tag.id))
+
+    # Return the complete, saved Tag object (or None for a duplicate).
     return db_tag
 
 def add_tag_to_content(db: Session, content: models.Content, tag: models.Tag) -> models.Content:
@@ -96,28 +354,213 @@ def add_tag_to_content(db: Session, content: models.Content, tag: models.Tag) ->
     Returns:
         models.Content: The updated Content object with the new tag associated.
     """
-    # Check if the tag is not already associated with the content
-    if tag not in content.tags:
+    # Check if the tag is not already associated with the content.
+    # (Compared by id: in sharded mode the tag may be a copy from another shard.)
+    if tag.id not in {existing.id for existing in content.tags}:
         # The magic of SQLAlchemy's relationship() feature.
         # Simply appending the `tag` object to the `content.tags` list
         # stages the creation of a new row in the association table.
         content.tags.append(tag)
         
-        # We need to commit the session to save this new association.
-        db.commit()
-        db.refresh(content)
+        # Flush to write the new association row.
+        db.flush()
+
+        # Keep the in-memory feed graph in step with the database, once the
+        # association is committed.
+        run_after_commit(db, feed_graph.add_content_tag, content.id, tag.id)
+        run_after_commit(db, related_index.add_tag, content.id, tag.id)
+        _count_tag_activity(db, content, [tag])
+        _count_daily_stats(db, [], [(content.created_at, tag.id)])
+        _publish_feed_item(db, content, tag)
         
     # Return the content object, which now reflects the new association.
     return content
 
+# The `content` columns a `ContentRow` is built from.
+CONTENT_ROW_COLUMNS = [models.Content.__table__.c[name] for name in ContentRow.COLUMNS]
+
+def _content_rows(db: Session, records) -> List[ContentRow]:
+    """
+    Turns result rows of `CONTENT_ROW_COLUMNS` into `ContentRow` objects
+    (keeping their order), and attaches their tags, all read with one more
+    query. Items share one `TagRow` per tag.
+    """
+    items = [ContentRow(*record) for record in records]
+    if not items:
+        return items
+    by_id = {item.id: item for item in items}
+    links = models.content_tags_association
+    tags = models.Tag.__table__
+    tag_rows = {}
+    for content_id, tag_id, name in db.execute(
+        select(links.c.content_id, tags.c.id, tags.c.name)
+        .join(tags, tags.c.id == links.c.tag_id)
+        .where(links.c.content_id.in_(list(by_id)))
+        .order_by(links.c.content_id, links.c.tag_id)
+    ):
+        tag = tag_rows.get(tag_id)
+        if tag is None:
+            tag = tag_rows[tag_id] = TagRow(tag_id, name)
+        by_id[content_id].tags.append(tag)
+    return items
+
 def get_content(db: Session, skip: int = 0, limit: int = 100) -> List[models.Content]:
     """Returns a list of all content items, with pagination."""
     return db.query(models.Content).offset(skip).limit(limit).all()
 
-def get_user_feed(db: Session, user: models.User, skip: int = 0, limit: int = 100) -> List[models.Content]:
+def encode_content_cursor(content: models.Content, sort: str) -> str:
+    """
+    Builds the opaque cursor that points just past `content` in a listing.
+
+    The cursor is the sort order plus the item's (created_at, id), base64
+    encoded so clients treat it as a token rather than something to edit.
+    """
+    payload = [sort, content.id, content.created_at.isoformat() if content.created_at else None]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_content_cursor(cursor: str, sort: str) -> Tuple[int, Optional[datetime]]:
+    """
+    Reads a cursor made by `encode_content_cursor`.
+
+    Returns:
+        (content_id, created_at) of the last item of the previous page.
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, content_id, created_at = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        content_id = int(content_id)
+        created_at = datetime.fromisoformat(created_at) if created_at else None
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort:
+        raise ValueError("The cursor was issued for a different sort order")
+    return content_id, created_at
+
+
+def build_content_query(
+    tag_ids: Optional[List[int]] = None,
+    tag_match: str = "any",
+    owner_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    sort: str = "newest",
+    after: Optional[Tuple[int, Optional[datetime]]] = None,
+) -> Select:
+    """
+    Builds the SELECT behind `GET /content/` from whichever filters are given.
+
+    Every filter is optional and they combine freely. Each combination is
+    shaped so that one index can do the work:
+
+    - no filter, or only a date range: `ix_content_created_at_id` is walked
+      in sort order, and the date range is a range scan on it.
+    - `owner_id` (with or without dates): `ix_content_owner_id_created_at_id`
+      gives that owner's items already sorted.
+    - `tag_ids`: the matching content ids come from
+      `ix_content_tags_tag_id_content_id`. With `tag_match="all"` an item
+      must carry every tag (GROUP BY ... HAVING COUNT = number of tags).
+
+    Results are always ordered by (created_at, id), so pagination is keyset
+    based: `after` is the (id, created_at) of the previous page's last item
+    and the query continues right after it, at the same cost for every page.
+
+    Args:
+        tag_ids: Only items with these tags.
+        tag_match: "any" (at least one of the tags) or "all".
+        owner_id: Only items owned by this user.
+        created_after: Only items created at or after this time.
+        created_before: Only items created before this time.
+        sort: "newest" or "oldest" first.
+        after: Keyset position to continue from (see `decode_content_cursor`).
+
+    Returns:
+        Select: The query, without a LIMIT.
+    """
+    query = select(models.Content)
+
+    if owner_id is not None:
+        query = query.where(models.Content.owner_id == owner_id)
+    if created_after is not None:
+        query = query.where(models.Content.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(models.Content.created_at < created_before)
+
+    if tag_ids:
+        unique_tag_ids = set(tag_ids)
+        links = models.content_tags_association.c
+        tagged = select(links.content_id).where(links.tag_id.in_(unique_tag_ids))
+        if tag_match == "all" and len(unique_tag_ids) > 1:
+            tagged = tagged.group_by(links.content_id).having(func.count() == len(unique_tag_ids))
+        query = query.where(models.Content.id.in_(tagged))
+
+    newest_first = sort == "newest"
+    if after is not None:
+        after_id, after_created_at = after
+        # A row-value comparison, which databases turn into one range scan
+        # on the (created_at, id) index.
+        position = tuple_(models.Content.created_at, models.Content.id)
+        pivot = tuple_(literal(after_created_at, models.Content.created_at.type), literal(after_id))
+        query = query.where(position < pivot if newest_first else position > pivot)
+
+    direction = desc if newest_first else asc
+    return query.order_by(direction(models.Content.created_at), direction(models.Content.id))
+
+
+def search_content(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "newest",
+    as_rows: bool = False,
+    **filters,
+) -> Tuple[List[Union[models.Content, ContentRow]], Optional[str]]:
+    """
+    Returns one page of content matching `filters` (see `build_content_query`).
+
+    One row more than `limit` is fetched to learn whether another page
+    exists; if so, the cursor for it is returned alongside the page.
+    `skip` is kept for older clients; a cursor stays fast on deep pages,
+    where an offset has to step over every skipped row.
+
+    With `as_rows`, the items are read-only `ContentRow` objects loaded with
+    Core SELECTs instead of ORM objects (see `app/rows.py`).
+
+    Returns:
+        (items, next_cursor): `next_cursor` is None on the last page.
+
+    Raises:
+        ValueError: If `cursor` is invalid.
+    """
+    after = decode_content_cursor(cursor, sort) if cursor else None
+    query = build_content_query(sort=sort, after=after, **filters)
+    newest_first = sort == "newest"
+    if as_rows:
+        records = _scatter_gather(
+            db, query.with_only_columns(*CONTENT_ROW_COLUMNS), skip, limit + 1, newest_first, as_rows=True
+        )
+        rows = _content_rows(db, records)
+    else:
+        rows = _scatter_gather(db, query.options(selectinload(models.Content.tags)), skip, limit + 1, newest_first)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_content_cursor(rows[-1], sort)
+    return rows, None
+
+def get_user_feed(
+    db: Session, user: models.User, skip: int = 0, limit: int = 100, as_rows: bool = False
+) -> List[Union[models.Content, ContentRow]]:
     """
     Constructs a personalized feed for a user based on the tags they follow.
 
+    If the in-memory feed graph (`app.graph.feed_graph`) is loaded, the page of
+    ids comes from it and only that page is read from the database. Otherwise
+    the feed is built with the SQL query below.
+
     The query performs the following steps:
     1. Identifies all tags the user follows.
     2. Joins the Content and Tag tables via the content_tags_association table.
@@ -131,10 +574,17 @@ def get_user_feed(db: Session, user: models.User, skip: int = 0, limit: int = 10
         user (models.User): The authenticated user for whom to generate the feed.
         skip (int): The number of items to skip for pagination.
         limit (int): The maximum number of items to return.
+        as_rows (bool): Return read-only `ContentRow` objects instead of ORM objects.
 
     Returns:
-        List[models.Content]: A list of Content objects for the user's feed.
+        List[models.Content]: A list of Content objects (or ContentRow objects) for the user's feed.
     """
+    # Fast path: when the in-memory feed graph is loaded, it computes the page
+    # of ids and we only load those rows from the database.
+    if feed_graph.loaded:
+        page_ids = feed_graph.feed_ids(user.id, skip=skip, limit=limit)
+        return get_content_by_ids(db, page_ids, as_rows=as_rows)
+
     # 1. Get the IDs of the tags the user follows.
     followed_tag_ids = [tag.id for tag in user.followed_tags]
 
@@ -142,29 +592,78 @@ def get_user_feed(db: Session, user: models.User, skip: int = 0, limit: int = 10
     if not followed_tag_ids:
         return []
 
+    if as_rows:
+        # The same feed as below, as a SELECT of columns: the items whose id
+        # is among the content ids with a followed tag (no DISTINCT needed).
+        links = models.content_tags_association.c
+        content = models.Content.__table__.c
+        feed_query = (
+            select(*CONTENT_ROW_COLUMNS)
+            .where(content.id.in_(select(links.content_id).where(links.tag_id.in_(followed_tag_ids))))
+            .order_by(desc(content.created_at), desc(content.id))
+        )
+        return _content_rows(db, _scatter_gather(db, feed_query, skip, limit, newest_first=True, as_rows=True))
+
     # 2. Construct the complex query.
     feed_query = (
-        db.query(models.Content)
+        select(models.Content)
         # Join Content with its tags relationship.
         .join(models.Content.tags)
         # Filter to get content where the tag's ID is in our list of followed tags.
-        .filter(models.Tag.id.in_(followed_tag_ids))
+        .where(models.Tag.id.in_(followed_tag_ids))
         # Ensure we don't get duplicate content items.
         .distinct()
-        # Order the results so the newest content is first.
-        .order_by(desc(models.Content.created_at))
-        # Apply pagination.
-        .offset(skip)
-        .limit(limit)
+        # Order the results so the newest content is first (ties by id).
+        .order_by(desc(models.Content.created_at), desc(models.Content.id))
     )
     
-    # 3. Execute the query and return the results.
-    return feed_query.all()
+    # 3. Execute the query with pagination and return the results. In sharded
+    # mode every shard is queried and the results are merged.
+    return _scatter_gather(db, feed_query, skip, limit, newest_first=True)
 
 def get_content_by_id(db: Session, content_id: int) -> Optional[models.Content]:
     """Returns a single content item by its ID, or None if not found."""
     return db.query(models.Content).filter(models.Content.id == content_id).first()
 
+def get_content_by_ids(
+    db: Session, content_ids: List[int], as_rows: bool = False
+) -> List[Union[models.Content, ContentRow]]:
+    """
+    Returns the content items with the given IDs, in the same order as `content_ids`.
+
+    All rows are fetched with one `IN` query, and their tags with one more
+    (`selectinload`), however many IDs are requested. IDs that don't exist
+    are skipped. With `as_rows`, the items are read-only `ContentRow` objects.
+    """
+    if not content_ids:
+        return []
+    if as_rows:
+        rows = _content_rows(db, db.execute(
+            select(*CONTENT_ROW_COLUMNS).where(models.Content.__table__.c.id.in_(content_ids))
+        ).all())
+    else:
+        rows = (
+            db.query(models.Content)
+            .options(selectinload(models.Content.tags))
+            .filter(models.Content.id.in_(content_ids))
+            .all()
+        )
+    by_id = {row.id: row for row in rows}
+    return [by_id[content_id] for content_id in content_ids if content_id in by_id]
+
+def get_related_content(db: Session, content_id: int, limit: int = 10) -> List[models.Content]:
+    """
+    Returns the items most similar to a content item, based on shared tags.
+
+    The ranking comes from the precomputed `related_index`; only the final
+    items are loaded from the database. The application builds the index in
+    the background when it starts (see `main.lifespan`); until then, there is
+    no related content.
+    """
+    if not related_index.loaded:
+        return []
+    return get_content_by_ids(db, related_index.related_ids(content_id, limit=limit))
+
 def update_content(
     db: Session, 
     content: models.Content, 
@@ -183,32 +682,224 @@ def update_content(
     """
     # Get the Pydantic model as a dictionary
     update_data = content_update.dict(exclude_unset=True)
+    # Whether the URL points to another page, not just the same one written
+    # differently (e.g. with tracking parameters).
+    page_changed = "url" in update_data and url_fingerprint(update_data["url"]) != content.url_hash
     
     # Iterate over the key-value pairs in the update data
     for key, value in update_data.items():
         # Use setattr to dynamically set the attribute on the SQLAlchemy model
         setattr(content, key, value)
+
+    # Keep the URL's fingerprint in step with the URL.
+    if "url" in update_data:
+        content.url_hash = url_fingerprint(content.url)
+
+    # The old link preview describes another page: drop it and fetch the new
+    # one. The item also stops counting as the user's unique item for its old
+    # page (it might collide with the one for the new page).
+    if page_changed:
+        content.unique_url = None
+        content.preview_title = content.preview_description = None
+        content.preview_image_url = content.preview_site_name = None
+        content.enriched_at = None
+        _enrich_link(db, content)
         
     # The `content` object is now "dirty" in the session.
-    # We commit the session to write the changes to the database.
-    db.commit()
-    # Refresh the instance to get the final state from the database.
-    db.refresh(content)
+    # We flush the session to write the changes to the database.
+    db.flush()
     
     return content
 
 def get_tag_by_id(db: Session, tag_id: int) -> Optional[models.Tag]:
-    """Retrieves a single tag from the database by its primary key ID."""
-    return db.query(models.Tag).filter(models.Tag.id == tag_id).first()
+    """Retrieves a single tag from the database by its primary key ID (or the entity cache)."""
+    return _cached_lookup(
+        db, models.Tag, ("tags", "id", tag_id),
+        lambda: db.query(models.Tag).filter(models.Tag.id == tag_id).first(),
+    )
+
+def delete_content(db: Session, content: models.Content) -> models.Content:
+    """Deletes an already-loaded content item, along with its tag associations."""
+    content_id = content.id
+    _count_tag_activity(db, content, content.tags, amount=-1)
+    _count_daily_stats(
+        db,
+        [(content.created_at, content.owner_id)],
+        [(content.created_at, tag.id) for tag in content.tags],
+        amount=-1,
+    )
+    db.delete(content)
+    db.flush()
+    run_after_commit(db, feed_graph.remove_content, content_id)
+    run_after_commit(db, related_index.remove_content, content_id)
+    return content
 
 def delete_content_by_id(db: Session, content_id: int) -> Optional[models.Content]:
     """Deletes a content item from the DB by its ID."""
-    db_content = db.query(models.Content).filter(models.Content.id == content_id).first()
+    db_content = get_content_by_id(db, content_id=content_id)
     if db_content:
-        db.delete(db_content)
-        db.commit()
+        delete_content(db, db_content)
     return db_content
 
+
+def _chunks(items: List[int], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _insert_owned_rows(db: Session, table, rows: List[dict]) -> None:
+    """Inserts rows of a table sharded by `owner_id`, each into its owner's shard (if sharding is on)."""
+    if not rows:
+        return
+    data_shards = db.info.get("data_shards")
+    if not data_shards:
+        db.execute(table.insert(), rows)
+        return
+    by_shard = {}
+    for row in rows:
+        by_shard.setdefault(shard_for_user(row["owner_id"], data_shards), []).append(row)
+    for shard_id, shard_rows in by_shard.items():
+        db.execute(table.insert(), shard_rows, bind_arguments={"shard_id": shard_id})
+
+def _bulk_delete_content(db: Session, content_ids: List[int], archiving: bool = False) -> None:
+    """
+    Deletes content items and their tag links with set-based statements,
+    without loading the items: one DELETE for the `content_tags` rows, one
+    for the content, and upserts that take the items out of the trending-tag
+    counters and (unless `archiving`, as archived items still count) the
+    daily statistics.
+
+    Callers bound `content_ids` (see `settings.DELETE_BATCH_SIZE`).
+    """
+    links = models.content_tags_association
+    tagged = db.execute(
+        select(links.c.tag_id, models.Content.created_at)
+        .join(models.Content, models.Content.id == links.c.content_id)
+        .where(links.c.content_id.in_(content_ids))
+    ).all()
+    if not archiving:
+        items = db.execute(
+            select(models.Content.created_at, models.Content.owner_id).where(models.Content.id.in_(content_ids))
+        ).all()
+        _count_daily_stats(db, items, [(created_at, tag_id) for tag_id, created_at in tagged], amount=-1)
+    # Buckets past the trending retention are already gone; don't recreate them.
+    oldest_bucket = _hour_bucket(datetime.now(timezone.utc)) - settings.TRENDING_RETENTION_HOURS
+    counts = Counter(
+        (tag_id, _hour_bucket(created_at)) for tag_id, created_at in tagged if created_at is not None
+    )
+    _increment_counters(db, models.TagActivity, [
+        {"tag_id": tag_id, "span_hours": 1, "bucket_start": bucket, "count": -count}
+        for (tag_id, bucket), count in counts.items()
+        if bucket >= oldest_bucket
+    ])
+
+    db.execute(delete(links).where(links.c.content_id.in_(content_ids)))
+    db.execute(
+        delete(models.Content)
+        .where(models.Content.id.in_(content_ids))
+        .execution_options(synchronize_session=False)
+    )
+    for content_id in content_ids:
+        run_after_commit(db, feed_graph.remove_content, content_id)
+        run_after_commit(db, related_index.remove_content, content_id)
+
+def delete_content_by_ids(db: Session, content_ids: List[int], owner_id: int) -> Tuple[List[int], List[int]]:
+    """
+    Deletes those of `content_ids` that belong to `owner_id`, in batches of
+    `settings.DELETE_BATCH_SIZE`.
+
+    Returns:
+        (deleted, forbidden): the IDs that were deleted, and the IDs that
+        exist but belong to someone else (and were left alone).
+    """
+    if not content_ids:
+        return [], []
+    owners = dict(db.execute(
+        select(models.Content.id, models.Content.owner_id).where(models.Content.id.in_(content_ids))
+    ).all())
+    deleted = [content_id for content_id in content_ids if owners.get(content_id) == owner_id]
+    forbidden = [content_id for content_id in content_ids if owners.get(content_id, owner_id) != owner_id]
+    for chunk in _chunks(deleted, settings.DELETE_BATCH_SIZE):
+        _bulk_delete_content(db, chunk)
+    return deleted, forbidden
+
+def purge_user_content_batch(db: Session, owner_id: int, batch_size: int) -> int:
+    """
+    Deletes up to `batch_size` of a user's content items, or once none are
+    left, of their archived items. Run it with `database.run_in_batches` to
+    delete everything a user owns in bounded transactions.
+
+    Returns:
+        int: The number of items deleted; 0 when the user owns nothing more.
+    """
+    content_ids = db.scalars(
+        select(models.Content.id)
+        .where(models.Content.owner_id == owner_id)
+        .order_by(models.Content.id)
+        .limit(batch_size)
+    ).all()
+    if content_ids:
+        _bulk_delete_content(db, content_ids)
+        return len(content_ids)
+
+    archive = models.ArchivedContent.__table__
+    archived = db.execute(
+        select(archive.c.id, archive.c.created_at, archive.c.tag_ids)
+        .where(archive.c.owner_id == owner_id)
+        .order_by(archive.c.id)
+        .limit(batch_size)
+    ).all()
+    if archived:
+        _count_daily_stats(
+            db,
+            [(row.created_at, owner_id) for row in archived],
+            [(row.created_at, tag_id) for row in archived for tag_id in json.loads(row.tag_ids)],
+            amount=-1,
+        )
+        db.execute(delete(archive).where(
+            archive.c.owner_id == owner_id, archive.c.id.in_([row.id for row in archived])
+        ))
+    return len(archived)
+
+def archive_content_batch(db: Session, older_than: datetime, batch_size: int) -> int:
+    """
+    Moves up to `batch_size` content items created before `older_than` to
+    the `content_archive` table, oldest first (an index range scan on
+    `ix_content_created_at_id`). Run it with `database.run_in_batches`.
+
+    Each item's tag ids are kept with it in the archive, and the item is
+    deleted from `content` like any other deleted item.
+
+    Returns:
+        int: The number of items archived; 0 when there are no more.
+    """
+    content = models.Content.__table__
+    rows = db.execute(
+        select(content)
+        .where(content.c.created_at < older_than)
+        .order_by(content.c.created_at, content.c.id)
+        .limit(batch_size)
+    ).mappings().all()
+    if not rows:
+        return 0
+    content_ids = [row["id"] for row in rows]
+
+    links = models.content_tags_association
+    tag_ids = {}
+    for content_id, tag_id in db.execute(
+        select(links.c.content_id, links.c.tag_id)
+        .where(links.c.content_id.in_(content_ids))
+        .order_by(links.c.content_id, links.c.tag_id)
+    ):
+        tag_ids.setdefault(content_id, []).append(tag_id)
+
+    archived_at = datetime.now(timezone.utc)
+    _insert_owned_rows(db, models.ArchivedContent.__table__, [
+        {**row, "tag_ids": json.dumps(tag_ids.get(row["id"], [])), "archived_at": archived_at}
+        for row in rows
+    ])
+    _bulk_delete_content(db, content_ids, archiving=True)
+    return len(rows)
+
 def follow_tag(db: Session, user: models.User, tag: models.Tag) -> models.User:
     """
     Creates an association for a user to follow a tag.
@@ -225,13 +916,21 @@ def follow_tag(db: Session, user: models.User, tag: models.Tag) -> models.User:
         models.User: The updated User object, now reflecting the new followed tag.
     """
     # Check if the user is not already following the tag to prevent duplicates.
-    if tag not in user.followed_tags:
+    if tag.id not in {followed.id for followed in user.followed_tags}:
+        # Count the new tag as co-followed with every tag the user already follows
+        # (in both directions), plus one more follower on the diagonal.
+        pairs = [{"tag_id": tag.id, "other_tag_id": tag.id}]
+        for other in user.followed_tags:
+            pairs.append({"tag_id": tag.id, "other_tag_id": other.id})
+            pairs.append({"tag_id": other.id, "other_tag_id": tag.id})
+
         # Append the tag object to the user's relationship list.
         # This stages the creation of a new row in the association table.
         user.followed_tags.append(tag)
         
-        db.commit()
-        db.refresh(user)
+        db.flush()
+        _increment_counters(db, models.TagCoFollow, pairs)
+        run_after_commit(db, feed_graph.follow, user.id, tag.id)
         
     return user
 
@@ -252,20 +951,322 @@ def unfollow_tag(db: Session, user: models.User, tag: models.Tag) -> models.User
         models.User: The updated User object, with the tag association removed.
     """
     # Check if the user is currently following the tag before trying to remove it.
-    if tag in user.followed_tags:
+    followed = next((followed for followed in user.followed_tags if followed.id == tag.id), None)
+    if followed is not None:
         # The inverse of append() is remove().
         # This stages the deletion of the row in the association table.
-        user.followed_tags.remove(tag)
+        user.followed_tags.remove(followed)
         
-        db.commit()
-        db.refresh(user)
+        db.flush()
+
+        # Undo the co-follow counts this follow contributed, including the diagonal.
+        other_ids = [other.id for other in user.followed_tags] + [tag.id]
+        db.execute(
+            update(models.TagCoFollow)
+            .where(models.TagCoFollow.tag_id == tag.id, models.TagCoFollow.other_tag_id.in_(other_ids))
+            .values(count=models.TagCoFollow.count - 1)
+        )
+        db.execute(
+            update(models.TagCoFollow)
+            .where(models.TagCoFollow.other_tag_id == tag.id, models.TagCoFollow.tag_id.in_(other_ids[:-1]))
+            .values(count=models.TagCoFollow.count - 1)
+        )
+        run_after_commit(db, feed_graph.unfollow, user.id, tag.id)
         
     return user
 
+# Trending windows accepted by `get_trending_tags`, in hours.
+TRENDING_WINDOWS = {"1h": 1, "24h": 24, "7d": 7 * 24}
+
+
+def _hour_bucket(moment: datetime) -> int:
+    """The number of whole hours between the Unix epoch and `moment` (naive means UTC)."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp()) // 3600
+
+
+def _count_tag_activity(db: Session, content: models.Content, tags: List[models.Tag], amount: int = 1) -> None:
+    """Adds `amount` to the current 1-hour activity bucket of each tag, by the content's creation time."""
+    if not tags or content.created_at is None:
+        return
+    bucket = _hour_bucket(content.created_at)
+    rows = [{"tag_id": tag.id, "span_hours": 1, "bucket_start": bucket} for tag in tags]
+    _increment_counters(db, models.TagActivity, rows, amount)
+
+
+def get_trending_tags(
+    db: Session, window_hours: int, limit: int = 10, now: Optional[datetime] = None
+) -> List[Tuple[models.Tag, float]]:
+    """
+    Returns the tags used on the most content created in the last `window_hours`.
+
+    Reads the pre-aggregated `tag_activity` buckets instead of scanning
+    `content_tags`, so the cost depends on the number of buckets in the
+    window, not on the amount of content. The oldest bucket usually
+    straddles the start of the window; it is counted pro rata, which turns
+    the fixed buckets into a smoothly sliding window.
+
+    Returns:
+        (tag, score) pairs, highest score first.
+    """
+    now = now or datetime.now(timezone.utc)
+    hours_now = now.replace(tzinfo=now.tzinfo or timezone.utc).timestamp() / 3600
+    window_start = hours_now - window_hours
+
+    activity = models.TagActivity
+    bucket_end = activity.bucket_start + activity.span_hours
+    weight = case(
+        (activity.bucket_start >= window_start, 1.0),
+        else_=(bucket_end - window_start) * 1.0 / activity.span_hours,
+    )
+    score = func.sum(activity.count * weight).label("score")
+    rows = db.execute(
+        select(activity.tag_id, score)
+        # The first condition is the index range; buckets are at most a day long.
+        .where(activity.bucket_start > window_start - 24, bucket_end > window_start)
+        .group_by(activity.tag_id)
+        .having(score > 0)
+        .order_by(desc(score), activity.tag_id)
+        .limit(limit)
+    ).all()
+
+    tags = {tag.id: tag for tag in db.query(models.Tag).filter(models.Tag.id.in_([row.tag_id for row in rows])).all()}
+    return [(tags[row.tag_id], row.score) for row in rows if row.tag_id in tags]
+
+
+def compact_tag_activity(db: Session, now: Optional[datetime] = None) -> None:
+    """
+    Keeps `tag_activity` small: 1-hour buckets older than
+    `settings.TRENDING_HOURLY_HOURS` are merged into 24-hour buckets, and
+    buckets older than `settings.TRENDING_RETENTION_HOURS` are deleted.
+    """
+    now_hour = _hour_bucket(now or datetime.now(timezone.utc))
+    activity = models.TagActivity
+    # Only fold whole days, so a daily bucket never overlaps live hourly ones.
+    fold_before = (now_hour - settings.TRENDING_HOURLY_HOURS) // 24 * 24
+    old_hours = (activity.span_hours == 1, activity.bucket_start < fold_before)
+
+    day_start = (activity.bucket_start // 24) * 24
+    daily = (
+        select(activity.tag_id, literal(24), day_start, func.sum(activity.count))
+        .where(*old_hours)
+        .group_by(activity.tag_id, day_start)
+    )
+    insert = _dialect_insert(db)(activity.__table__).from_select(
+        ["tag_id", "span_hours", "bucket_start", "count"], daily
+    )
+    db.execute(insert.on_conflict_do_update(
+        index_elements=["tag_id", "span_hours", "bucket_start"],
+        set_={"count": activity.__table__.c.count + insert.excluded.count},
+    ))
+    db.execute(delete(activity).where(*old_hours))
+    db.execute(delete(activity).where(
+        activity.bucket_start + activity.span_hours <= now_hour - settings.TRENDING_RETENTION_HOURS
+    ))
+
+
+def rebuild_tag_activity(db: Session, chunk_size: int = 1000, now: Optional[datetime] = None) -> None:
+    """
+    Recomputes `tag_activity` from the content and tag history.
+
+    Content is read in chunks of `chunk_size` items (in id order, continuing
+    after the last id of the previous chunk), so memory use stays flat
+    however much history there is. Only content inside the retention period
+    is counted. The result is then compacted as usual.
+    """
+    now = now or datetime.now(timezone.utc)
+    horizon = _hour_bucket(now) - settings.TRENDING_RETENTION_HOURS
+    db.execute(delete(models.TagActivity))
+
+    last_id = 0
+    while True:
+        chunk = db.execute(
+            select(models.Content.id, models.Content.created_at)
+            .where(models.Content.id > last_id)
+            .order_by(models.Content.id)
+            .limit(chunk_size)
+        ).all()
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        hours = {row.id: _hour_bucket(row.created_at) for row in chunk if row.created_at is not None}
+        recent = [content_id for content_id, hour in hours.items() if hour >= horizon]
+        if recent:
+            links = models.content_tags_association.c
+            counts: dict = {}
+            for content_id, tag_id in db.execute(
+                select(links.content_id, links.tag_id).where(links.content_id.in_(recent))
+            ):
+                key = (tag_id, hours[content_id])
+                counts[key] = counts.get(key, 0) + 1
+            _increment_counters(db, models.TagActivity, [
+                {"tag_id": tag_id, "span_hours": 1, "bucket_start": hour, "count": count}
+                for (tag_id, hour), count in counts.items()
+            ])
+
+    compact_tag_activity(db, now)
+
+
+def _utc_day(moment: datetime) -> date:
+    """The UTC calendar day of `moment` (naive means UTC)."""
+    if moment.tzinfo is None:
+        return moment.date()
+    return moment.astimezone(timezone.utc).date()
+
+
+def _count_daily_stats(db: Session, items, tagged=(), amount: int = 1) -> None:
+    """
+    Adds `amount` to the daily rollups of some content items and tag links,
+    by the day each item was created.
+
+    Args:
+        items: (created_at, owner_id) of each content item.
+        tagged: (created_at, tag_id) of each tag link, with its item's creation time.
+    """
+    per_day, per_curator, per_tag = Counter(), Counter(), Counter()
+    for created_at, owner_id in items:
+        if created_at is not None:
+            day = _utc_day(created_at)
+            per_day[day] += 1
+            per_curator[(day, owner_id)] += 1
+    for created_at, tag_id in tagged:
+        if created_at is not None:
+            per_tag[(_utc_day(created_at), tag_id)] += 1
+
+    _increment_counters(db, models.DailyContentStats, [
+        {"day": day, "count": count * amount} for day, count in per_day.items()
+    ])
+    _increment_counters(db, models.DailyCuratorStats, [
+        {"day": day, "user_id": user_id, "count": count * amount} for (day, user_id), count in per_curator.items()
+    ])
+    _increment_counters(db, models.DailyTagStats, [
+        {"day": day, "tag_id": tag_id, "count": count * amount} for (day, tag_id), count in per_tag.items()
+    ])
+
+
+def _fill_days(start: date, end: date, counts: dict) -> List[Tuple[date, int]]:
+    """One (day, count) pair for every day from `start` to `end`, 0 where `counts` has none."""
+    return [
+        (start + timedelta(days=offset), counts.get(start + timedelta(days=offset), 0))
+        for offset in range((end - start).days + 1)
+    ]
+
+
+def get_daily_content_counts(db: Session, start: date, end: date) -> List[Tuple[date, int]]:
+    """Returns how many content items were created on each day from `start` to `end` (inclusive)."""
+    stats = models.DailyContentStats
+    rows = db.execute(select(stats.day, stats.count).where(stats.day.between(start, end)))
+    return _fill_days(start, end, dict(rows.all()))
+
+
+def get_daily_active_curators(db: Session, start: date, end: date) -> List[Tuple[date, int]]:
+    """Returns how many users created content on each day from `start` to `end` (inclusive)."""
+    stats = models.DailyCuratorStats
+    rows = db.execute(
+        select(stats.day, func.count())
+        .where(stats.day.between(start, end), stats.count > 0)
+        .group_by(stats.day)
+    )
+    return _fill_days(start, end, dict(rows.all()))
+
+
+def get_tag_content_counts(db: Session, start: date, end: date, limit: int = 100) -> List[Tuple[models.Tag, int]]:
+    """
+    Returns the tags of the content created from `start` to `end`
+    (inclusive), with how many of those items have each tag, most used first.
+    """
+    stats = models.DailyTagStats
+    total = func.sum(stats.count).label("total")
+    rows = db.execute(
+        select(stats.tag_id, total)
+        .where(stats.day.between(start, end))
+        .group_by(stats.tag_id)
+        .having(total > 0)
+        .order_by(desc(total), stats.tag_id)
+        .limit(limit)
+    ).all()
+    tags = {tag.id: tag for tag in db.query(models.Tag).filter(models.Tag.id.in_([row.tag_id for row in rows])).all()}
+    return [(tags[row.tag_id], row.total) for row in rows if row.tag_id in tags]
+
+
+def _id_chunks(db: Session, query: Select, key, chunk_size: int, bind_arguments: dict):
+    """Runs `query` in chunks of `chunk_size` rows, in order of the integer column `key`."""
+    last_id = 0
+    while True:
+        chunk = db.execute(
+            query.where(key > last_id).order_by(key).limit(chunk_size), bind_arguments=bind_arguments
+        ).all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def rebuild_daily_stats(db: Session, chunk_size: int = 1000) -> None:
+    """
+    Recomputes the daily rollups (`daily_content_stats`, `daily_tag_stats`,
+    `daily_curator_stats`) from the content, its tags and the archive.
+
+    Items are read in chunks of `chunk_size` (in sharded mode, shard by
+    shard), so memory use stays flat; the whole rebuild is one transaction.
+    """
+    for model in (models.DailyContentStats, models.DailyTagStats, models.DailyCuratorStats):
+        db.execute(delete(model))
+
+    content = models.Content.__table__
+    links = models.content_tags_association
+    archive = models.ArchivedContent.__table__
+    for shard_id in db.info.get("data_shards") or [None]:
+        bind_arguments = {"shard_id": shard_id} if shard_id else {}
+        items = select(content.c.id, content.c.created_at, content.c.owner_id)
+        for chunk in _id_chunks(db, items, content.c.id, chunk_size, bind_arguments):
+            created = {row.id: row.created_at for row in chunk}
+            tagged = db.execute(
+                select(links.c.content_id, links.c.tag_id).where(links.c.content_id.in_(created)),
+                bind_arguments=bind_arguments,
+            )
+            _count_daily_stats(
+                db,
+                [(row.created_at, row.owner_id) for row in chunk],
+                [(created[content_id], tag_id) for content_id, tag_id in tagged],
+            )
+
+        archived = select(archive.c.id, archive.c.created_at, archive.c.owner_id, archive.c.tag_ids)
+        for chunk in _id_chunks(db, archived, archive.c.id, chunk_size, bind_arguments):
+            _count_daily_stats(
+                db,
+                [(row.created_at, row.owner_id) for row in chunk],
+                [(row.created_at, tag_id) for row in chunk for tag_id in json.loads(row.tag_ids)],
+            )
+
+
+def get_backfill_statuses(db: Session) -> List[dict]:
+    """Returns the checkpoint of every backfill that has run (see `app/backfill.py`), with its speed."""
+    statuses = []
+    for checkpoint in db.query(models.BackfillCheckpoint).order_by(models.BackfillCheckpoint.name):
+        seconds = ((checkpoint.finished_at or checkpoint.updated_at) - checkpoint.started_at).total_seconds()
+        statuses.append({
+            "name": checkpoint.name,
+            "status": checkpoint.status,
+            "last_id": checkpoint.last_id,
+            "rows_done": checkpoint.rows_done,
+            "started_at": checkpoint.started_at,
+            "updated_at": checkpoint.updated_at,
+            "finished_at": checkpoint.finished_at,
+            "rows_per_second": checkpoint.rows_done / seconds if seconds > 0 else 0.0,
+        })
+    return statuses
+
+
 def get_tag_by_name(db: Session, name: str) -> Optional[models.Tag]:
     """
     Retrieves a single tag from the database by its unique name.
 
+    Tags almost never change, so when the entity cache is enabled (see
+    ENTITY_CACHE_SIZE), lookups (including misses) are served from it after
+    the first one.
+
     Args:
         db (Session): The SQLAlchemy database session dependency.
         name (str): The name of the tag to retrieve. The search is case-sensitive.
@@ -277,7 +1278,10 @@ def get_tag_by_name(db: Session, name: str) -> Optional[models.Tag]:
     # Start a query on the Tag model (the 'tags' table).
     # Apply a filter to find a row where the 'name' column matches the provided name.
     # .first() executes the query and returns the first result or None.
-    return db.query(models.Tag).filter(models.Tag.name == name).first()
+    return _cached_lookup(
+        db, models.Tag, ("tags", "name", name),
+        lambda: db.query(models.Tag).filter(models.Tag.name == name).first(),
+    )
 
 
 def get_user_by_id(db: Session, user_id: int) -> Optional[models.User]:
@@ -285,3 +1289,119 @@ def get_user_by_id(db: Session, user_id: int) -> Optional[models.User]:
     Retrieves a single user from the database by their primary key ID.
     """
     return db.query(models.User).filter(models.User.id == user_id).first()
+
+
+def get_users_by_ids(db: Session, user_ids: List[int]) -> List[models.User]:
+    """
+    Returns the users with the given IDs, in the same order as `user_ids`.
+
+    Everything a `schemas.User` response needs (their content with its tags,
+    and their followed tags) is loaded up front with one query per
+    relationship, instead of lazily per user. IDs that don't exist are skipped.
+    """
+    if not user_ids:
+        return []
+    rows = (
+        db.query(models.User)
+        .options(
+            selectinload(models.User.content).selectinload(models.Content.tags),
+            selectinload(models.User.followed_tags),
+        )
+        .filter(models.User.id.in_(user_ids))
+        .all()
+    )
+    by_id = {row.id: row for row in rows}
+    return [by_id[user_id] for user_id in user_ids if user_id in by_id]
+
+
+def get_suggested_tags(
+    db: Session,
+    user: models.User,
+    limit: int = 10,
+    candidates_per_tag: int = 50,
+    max_seed_tags: int = 50,
+) -> List[models.Tag]:
+    """
+    Suggests tags for a user to follow, from what people with similar follows follow.
+
+    For each tag the user follows, we read its most co-followed tags from
+    `tag_co_follows` (an index range read capped at `candidates_per_tag` rows),
+    so the work is bounded no matter how many users or follows there are.
+    Each candidate scores the sum of its co-follow counts, divided by the square
+    root of its own follower count so that merely popular tags don't crowd
+    out more specific ones.
+
+    Returns:
+        List[models.Tag]: Up to `limit` tags the user doesn't follow yet, best first.
+                          Empty if the user follows no tags.
+    """
+    followed_ids = {tag.id for tag in user.followed_tags}
+    if not followed_ids:
+        return []
+
+    co_follow = models.TagCoFollow
+    seed_ids = sorted(followed_ids)[:max_seed_tags]
+    per_tag = [
+        select(co_follow.other_tag_id, co_follow.count)
+        .where(co_follow.tag_id == tag_id, co_follow.count > 0)
+        .order_by(co_follow.count.desc())
+        .limit(candidates_per_tag)
+        .subquery()
+        for tag_id in seed_ids
+    ]
+    rows = db.execute(union_all(*(select(sq.c.other_tag_id, sq.c.count) for sq in per_tag))).all()
+
+    co_counts = {}
+    for other_tag_id, count in rows:
+        if other_tag_id not in followed_ids:
+            co_counts[other_tag_id] = co_counts.get(other_tag_id, 0) + count
+    if not co_counts:
+        return []
+
+    # The diagonal rows hold each candidate's follower count.
+    followers = dict(db.execute(
+        select(co_follow.tag_id, co_follow.count).where(
+            co_follow.tag_id.in_(co_counts), co_follow.other_tag_id == co_follow.tag_id
+        )
+    ).all())
+    ranked = sorted(
+        co_counts,
+        key=lambda tag_id: (-co_counts[tag_id] / max(followers.get(tag_id, 1), 1) ** 0.5, tag_id),
+    )[:limit]
+
+    tags = {tag.id: tag for tag in db.query(models.Tag).filter(models.Tag.id.in_(ranked)).all()}
+    return [tags[tag_id] for tag_id in ranked if tag_id in tags]
+
+
+def rebuild_tag_co_follows(db: Session) -> None:
+    """
+    Recomputes `tag_co_follows` from scratch out of `user_followed_tags`.
+
+    The table is normally kept up to date by `follow_tag`/`unfollow_tag`;
+    this is for filling it initially or repairing it.
+    """
+    mine = models.user_followed_tags_association.alias("mine")
+    theirs = models.user_followed_tags_association.alias("theirs")
+    pairs = (
+        select(mine.c.tag_id, theirs.c.tag_id, func.count())
+        .join(theirs, theirs.c.user_id == mine.c.user_id)
+        .group_by(mine.c.tag_id, theirs.c.tag_id)
+    )
+    db.execute(models.TagCoFollow.__table__.delete())
+    if not db.info.get("data_shards"):
+        db.execute(
+            models.TagCoFollow.__table__.insert().from_select(["tag_id", "other_tag_id", "count"], pairs)
+        )
+        return
+
+    # In sharded mode the follows are spread over the data shards while the
+    # counts live in the global shard. A user's follows all sit in one shard,
+    # so the per-shard counts just add up.
+    totals = {}
+    for tag_id, other_tag_id, count in db.execute(pairs):
+        totals[(tag_id, other_tag_id)] = totals.get((tag_id, other_tag_id), 0) + count
+    if totals:
+        db.execute(
+            models.TagCoFollow.__table__.insert(),
+            [{"tag_id": tag_id, "other_tag_id": other, "count": count} for (tag_id, other), count in totals.items()],
+        )
@@ -1,27 +1,301 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base
+import zlib
+from typing import Dict, List
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList
+from sqlalchemy.sql.util import find_tables
+
+from .batching import BATCH_SESSION, batch_state
+from .config import settings
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
 
-# The 'engine' is the main entry point to the database.
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
 
-# Each instance of SessionLocal will be a database session.
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def make_engine(url: str) -> Engine:
+    """Creates an engine with the application's connection pool settings."""
+    return create_engine(
+        url,
+        connect_args={"check_same_thread": False} if url.startswith("sqlite") else {},
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+    )
+
+
+# The 'engine' is the main entry point to the database.
+# In sharded mode (see below) it is the "global" shard.
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
 
 # We will inherit from this Base class to create each of the database models.
 Base = declarative_base()
 
-def get_db():
-    # A dependency function that creates and yields a new database session for each request, and ensures it's closed afterward.
 
-    db = SessionLocal()  # Create a new session from our session factory
+# --- Optional sharded mode ---
+#
+# With `settings.SHARD_DATABASE_URLS` set, a user and everything they own
+# (content, tag links, follows) live together in one "data shard", chosen by
+# a hash of the user id. Tables that are not owned by a user live in the
+# "global" shard. `tags` is global too, but every data shard keeps a copy of
+# it (see `crud._replicate`) so content and follows can join it locally.
+#
+# User and content ids come from the global shard (`id_sequences`), so they
+# are unique across shards and a user's shard is known before the INSERT.
+
+GLOBAL_SHARD = "global"
+
+# Tables whose rows only live in the global shard.
+GLOBAL_TABLES = {
+    "tags", "tag_co_follows", "tag_activity", "id_sequences",
+    "daily_content_stats", "daily_tag_stats", "daily_curator_stats",
+}
+
+# For each table partitioned by user, the column holding the owning user's id.
+SHARD_KEYS = {"users": "id", "content": "owner_id"}
+
+
+def shard_for_user(user_id: int, data_shards: List[str]) -> str:
+    """Returns the data shard holding `user_id` and everything they own."""
+    return data_shards[zlib.crc32(str(user_id).encode()) % len(data_shards)]
+
+
+def allocate_ids(global_engine: Engine, name: str, count: int) -> List[int]:
+    """
+    Reserves `count` consecutive ids for `name` (a table) from the global shard.
+
+    Like a database sequence, this runs in its own short transaction, so it
+    doesn't hold the global shard's write lock for the rest of the request,
+    and ids are not handed back if the request rolls back.
+    """
+    with global_engine.begin() as connection:
+        last_id = connection.execute(
+            text(
+                "INSERT INTO id_sequences (name, last_id) VALUES (:name, :count) "
+                "ON CONFLICT (name) DO UPDATE SET last_id = id_sequences.last_id + excluded.last_id "
+                "RETURNING last_id"
+            ),
+            {"name": name, "count": count},
+        ).scalar_one()
+    return list(range(last_id - count + 1, last_id + 1))
+
+
+def _shard_from_criteria(statement, data_shards: List[str]):
+    """
+    Finds a `<shard key> = <value>` condition among the top-level AND terms of
+    a statement's WHERE clause (e.g. `users.id = 5`), and returns the shard
+    it points at. Returns None if the statement may touch several shards.
+    """
+    where = getattr(statement, "whereclause", None)
+    if where is None:
+        return None
+    if isinstance(where, BooleanClauseList) and where.operator is operators.and_:
+        terms = where.clauses
+    else:
+        terms = [where]
+    for term in terms:
+        if not isinstance(term, BinaryExpression) or term.operator is not operators.eq:
+            continue
+        column, value = term.left, term.right
+        table = getattr(column, "table", None)
+        if (
+            table is not None
+            and SHARD_KEYS.get(table.name) == column.name
+            and isinstance(value, BindParameter)
+            and value.effective_value is not None
+        ):
+            return shard_for_user(value.effective_value, data_shards)
+    return None
+
+
+class UserShardedSession(ShardedSession):
+    """
+    A ShardedSession that also routes many-to-many link rows (content_tags,
+    user_followed_tags).
+
+    The ORM writes those rows without an object to route by, so they go to
+    the shard of the users/content being flushed (see `sharded_sessionmaker`).
+    A flush can therefore change the links of one shard's objects at a time;
+    requests only ever touch the current user's objects, so this holds.
+    """
+
+    def get_bind(self, mapper=None, *, shard_id=None, instance=None, clause=None, **kw):
+        flush_shards = self.info.get("flush_shards")
+        if shard_id is None and instance is None and flush_shards:
+            if len(flush_shards) > 1:
+                raise ValueError(
+                    f"Can't write links for objects in several shards ({sorted(flush_shards)}) in one flush"
+                )
+            shard_id = next(iter(flush_shards))
+        return super().get_bind(mapper, shard_id=shard_id, instance=instance, clause=clause, **kw)
+
+
+def sharded_sessionmaker(global_engine: Engine, shard_engines: Dict[str, Engine]) -> sessionmaker:
+    """
+    Builds a session factory that routes every statement to the right shard.
+
+    - New users and content are written to their owner's shard.
+    - Loading an object by primary key goes to its shard when that can be
+      worked out (users), otherwise to every data shard.
+    - Queries on global tables go to the global shard. Other queries go to
+      the owner's shard when they filter on the shard key, and otherwise run
+      on every data shard, with the results concatenated.
+    """
+    data_shards = list(shard_engines)
+
+    def shard_chooser(mapper, instance, clause=None):
+        table = mapper.local_table.name
+        if table in SHARD_KEYS and instance is not None:
+            user_id = getattr(instance, SHARD_KEYS[table])
+            if user_id is None:
+                raise ValueError(f"Can't choose a shard for a {table} row without a user id")
+            return shard_for_user(user_id, data_shards)
+        return GLOBAL_SHARD
+
+    def identity_chooser(mapper, primary_key, *, lazy_loaded_from, **kw):
+        if lazy_loaded_from is not None:
+            # Related objects live next to the object they were loaded from.
+            return [lazy_loaded_from.identity_token]
+        table = mapper.local_table.name
+        if table in GLOBAL_TABLES:
+            return [GLOBAL_SHARD]
+        if table == "users":
+            return [shard_for_user(primary_key[0], data_shards)]
+        return data_shards
+
+    def execute_chooser(context):
+        if context.is_select and context.lazy_loaded_from is not None:
+            return [context.lazy_loaded_from.identity_token]
+        tables = {table.name for table in find_tables(context.statement, include_crud=True)}
+        if tables and tables <= GLOBAL_TABLES:
+            return [GLOBAL_SHARD]
+        shard = _shard_from_criteria(context.statement, data_shards)
+        return [shard] if shard is not None else data_shards
+
+    factory = sessionmaker(
+        class_=UserShardedSession,
+        autocommit=False,
+        autoflush=False,
+        # Lets code that only needs the dialect use `db.bind`.
+        bind=global_engine,
+        shards={GLOBAL_SHARD: global_engine, **shard_engines},
+        shard_chooser=shard_chooser,
+        identity_chooser=identity_chooser,
+        execute_chooser=execute_chooser,
+        info={"data_shards": data_shards},
+    )
+
+    @event.listens_for(factory, "before_flush")
+    def _prepare_flush(session, flush_context, instances):
+        # Give new users and content their global id before they are routed.
+        pending: Dict[str, list] = {}
+        for obj in session.new:
+            table = obj.__table__.name
+            if table in SHARD_KEYS and obj.id is None:
+                pending.setdefault(table, []).append(obj)
+        for table, objects in pending.items():
+            for obj, new_id in zip(objects, allocate_ids(global_engine, table, len(objects))):
+                obj.id = new_id
+
+        # Remember which shards this flush writes to, for the link rows.
+        session.info["flush_shards"] = {
+            shard_chooser(inspect(obj).mapper, obj)
+            for obj in (*session.new, *session.dirty, *session.deleted)
+            if obj.__table__.name in SHARD_KEYS
+        }
+
+    @event.listens_for(factory, "after_flush")
+    @event.listens_for(factory, "after_soft_rollback")
+    def _finish_flush(session, *args):
+        session.info.pop("flush_shards", None)
+
+    return factory
+
+
+if settings.SHARD_DATABASE_URLS:
+    shard_engines = {
+        f"shard{number}": make_engine(url)
+        for number, url in enumerate(settings.SHARD_DATABASE_URLS)
+    }
+    # Each instance of SessionLocal will be a database session.
+    SessionLocal = sharded_sessionmaker(engine, shard_engines)
+else:
+    shard_engines = {}
+    # Each instance of SessionLocal will be a database session.
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def get_db(request: Request):
+    """
+    A dependency function that creates and yields a new database session for each request, and ensures it's closed afterward.
+
+    The session is a unit of work: crud functions only flush their changes,
+    and the whole request is committed once here, after the endpoint has run.
+    If the endpoint raises, nothing is committed.
+
+    Sub-requests of a `POST /batch` that run on their own reuse the batch's
+    session instead (see `batching`); they still commit their own work.
+
+    Endpoints must declare it as `Depends(database.get_db, scope="function")`
+    so the commit happens before the response is sent, not after.
+    """
+    shared = batch_state(request.scope).get(BATCH_SESSION)
+    db = shared or SessionLocal()  # Create a new session from our session factory
     try:
         yield db  # Provide the session to the endpoint
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     finally:
         # This 'finally' block will run whether the request was successful
         # or an error occurred. It guarantees the session is closed.
-        db.close()
+        # (A batch's session is closed by the batch itself.)
+        if shared is None:
+            db.close()
+
+
+def run_after_commit(db: Session, callback, *args) -> None:
+    """
+    Schedules `callback(*args)` to run once the session's transaction commits.
+
+    Used to update in-memory structures (such as the feed graph) only when the
+    database change they mirror is durable. If the transaction rolls back,
+    the callback is dropped.
+    """
+    db.info.setdefault("after_commit", []).append((callback, args))
+
+
+def run_in_batches(db: Session, batch, *args) -> int:
+    """
+    Calls `batch(db, *args)` until it returns 0, committing after every call.
+
+    For jobs too large for one transaction (purges, archiving): `batch` does
+    a bounded amount of work and returns how many rows it handled, and each
+    commit releases the locks it took. If a batch fails, the batches before
+    it stay committed, so rerunning the job carries on where it stopped.
+
+    Returns:
+        int: The total number of rows handled.
+    """
+    total = 0
+    while True:
+        rows = batch(db, *args)
+        db.commit()
+        if not rows:
+            return total
+        total += rows
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit_callbacks(session: Session) -> None:
+    for callback, args in session.info.pop("after_commit", []):
+        callback(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit_callbacks(session: Session) -> None:
+    session.info.pop("after_commit", None)
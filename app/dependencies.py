@@ -0,0 +1,64 @@
+# app/dependencies.py
+
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Query, status
+
+from .config import settings
+
+
+def batch_ids(
+    ids: str = Query(..., description="Comma-separated IDs, e.g. `ids=3,1,2`")
+) -> List[int]:
+    """
+    Parses the `ids` query parameter of the batch endpoints.
+
+    Returns the IDs in the order given, without duplicates.
+
+    Raises:
+        HTTPException 422: If an ID is not an integer, or more than
+                           `settings.MAX_BATCH_IDS` IDs are requested.
+    """
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids must be a comma-separated list of integers",
+        )
+    unique = list(dict.fromkeys(parsed))
+    if not unique:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="ids must not be empty")
+    if len(unique) > settings.MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.MAX_BATCH_IDS} ids can be requested at once",
+        )
+    return unique
+
+
+def date_range(
+    start: Optional[date] = Query(None, description="First day (UTC), default: 29 days before `end`"),
+    end: Optional[date] = Query(None, description="Last day (UTC), default: today"),
+) -> Tuple[date, date]:
+    """
+    Parses the `start` / `end` query parameters of the `/stats` endpoints.
+
+    Returns:
+        (start, end): both inclusive; by default, the last 30 days.
+
+    Raises:
+        HTTPException 422: If `start` is after `end`, or the range is longer
+                           than `settings.STATS_MAX_DAYS` days.
+    """
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="start must not be after end")
+    if (end - start).days + 1 > settings.STATS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.STATS_MAX_DAYS} days can be requested at once",
+        )
+    return start, end
@@ -0,0 +1,448 @@
+# app/enrichment.py
+"""
+Link previews: fetches the page behind each saved URL and stores its title,
+description, image and site name on the content item.
+
+`crud.create_user_content` (and `crud.update_content`, when the URL changes)
+hand the new item to `enricher.submit` once their transaction commits. The
+pipeline runs on the application's event loop:
+
+- a fixed number of workers take items from a bounded queue and fetch the
+  pages with one shared `httpx.AsyncClient`, whose connection pool caps
+  the fetches in flight (`ENRICHMENT_CONCURRENCY`);
+- each host gets at most `ENRICHMENT_PER_HOST_CONCURRENCY` of them, so a
+  burst of links to one site doesn't hammer it;
+- results are cached by normalized URL (`urls.normalize_url`), and
+  concurrent requests for the same page share one fetch;
+- finished previews are written in batches, one executemany UPDATE per
+  `ENRICHMENT_BATCH_SIZE` items, from a worker thread.
+
+A fetch that fails, times out or finds no metadata still sets `enriched_at`,
+so the item isn't fetched again. Previews are best effort: items still
+queued when the application stops keep an empty preview.
+"""
+
+import asyncio
+import ipaddress
+import time
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import database, models
+from .config import settings
+from .urls import normalize_url
+
+USER_AGENT = "CuratorBot/1.0 (link previews)"
+
+# Longest stored value per preview field; longer values are cut.
+MAX_TEXT_LENGTH = {"title": 300, "description": 1000, "image_url": 2048, "site_name": 200}
+
+# Metadata names, in order of preference, for each preview field.
+META_NAMES = {
+    "title": ["og:title", "twitter:title"],
+    "description": ["og:description", "twitter:description", "description"],
+    "image_url": ["og:image", "og:image:url", "twitter:image"],
+    "site_name": ["og:site_name"],
+}
+
+
+class LinkPreview(NamedTuple):
+    """The metadata of a page. Fields the page doesn't provide are None."""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    image_url: Optional[str] = None
+    site_name: Optional[str] = None
+
+
+EMPTY_PREVIEW = LinkPreview()
+
+
+class BlockedURLError(Exception):
+    """Raised for URLs the pipeline must not fetch (see `ENRICHMENT_ALLOW_PRIVATE_HOSTS`)."""
+
+
+# --- Parsing ---
+
+class _MetadataParser(HTMLParser):
+    """Collects the <title> and <meta> tags of a document's head."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta: Dict[str, str] = {}
+        self.title: List[str] = []
+        self.in_title = False
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            attrs = dict(attrs)
+            name = (attrs.get("property") or attrs.get("name") or "").lower()
+            if name and attrs.get("content"):
+                self.meta.setdefault(name, attrs["content"])
+        elif tag == "title":
+            self.in_title = True
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self.in_title = False
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title.append(data)
+
+
+def _clean(value: Optional[str], field: str) -> Optional[str]:
+    if value is None:
+        return None
+    value = " ".join(value.split())
+    return value[:MAX_TEXT_LENGTH[field]] or None
+
+
+def _decode(body: bytes, charset: Optional[str]) -> str:
+    """Decodes a page with its declared charset, or as UTF-8 if it declares none (or one Python doesn't know)."""
+    try:
+        return body.decode(charset or "utf-8", "replace")
+    except LookupError:
+        return body.decode("utf-8", "replace")
+
+
+def parse_metadata(html: str, base_url: str) -> LinkPreview:
+    """
+    Extracts a preview from an HTML document.
+
+    Open Graph tags win over Twitter cards, which win over the plain
+    `<title>` and `<meta name="description">`. A relative image URL is
+    resolved against `base_url` (the URL the page was served from).
+    """
+    parser = _MetadataParser()
+    # Feed the document in pieces, so parsing stops soon after the head.
+    for start in range(0, len(html), 8192):
+        parser.feed(html[start:start + 8192])
+        if parser.done:
+            break
+
+    values = {
+        field: next((parser.meta[name] for name in names if name in parser.meta), None)
+        for field, names in META_NAMES.items()
+    }
+    if values["title"] is None and parser.title:
+        values["title"] = "".join(parser.title)
+    if values["image_url"] is not None:
+        values["image_url"] = urljoin(base_url, values["image_url"].strip())
+        if urlsplit(values["image_url"]).scheme not in ("http", "https"):
+            values["image_url"] = None
+    return LinkPreview(**{field: _clean(value, field) for field, value in values.items()})
+
+
+# --- Caching and limits ---
+
+class PreviewCache:
+    """
+    Previews by normalized URL: a least-recently-used cache of at most
+    `max_size` entries, each kept for `ttl_seconds`. Only used from the
+    pipeline's event loop, so it needs no lock.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, LinkPreview]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[LinkPreview]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, preview = entry
+        if expires <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return preview
+
+    def put(self, key: str, preview: LinkPreview) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (self.clock() + self.ttl_seconds, preview)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class HostLimiter:
+    """
+    At most `limit` concurrent holders per host. A host's semaphore only
+    exists while someone holds or waits for it, so the number of hosts seen
+    doesn't matter.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        # host -> [semaphore, number of holders and waiters]
+        self._hosts: Dict[str, list] = {}
+
+    @asynccontextmanager
+    async def hold(self, host: str):
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = [asyncio.Semaphore(self.limit), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._hosts[host]
+
+
+# --- Writing ---
+
+_content = models.Content.__table__
+_save_preview = (
+    update(_content)
+    # Skip items whose URL changed while the old one was being fetched.
+    .where(_content.c.id == bindparam("row_id"), _content.c.url == bindparam("fetched_url"))
+    .values(
+        preview_title=bindparam("new_title"),
+        preview_description=bindparam("new_description"),
+        preview_image_url=bindparam("new_image_url"),
+        preview_site_name=bindparam("new_site_name"),
+        enriched_at=bindparam("new_enriched_at"),
+    )
+)
+
+
+def save_previews(db: Session, rows: List[dict]) -> None:
+    """
+    Writes fetched previews with one executemany UPDATE (per data shard, in
+    sharded mode). Each row has `row_id`, `owner_id`, `fetched_url` and the
+    `new_*` values. Only flushes; the caller commits.
+    """
+    data_shards = db.info.get("data_shards")
+    if not data_shards:
+        db.execute(_save_preview, rows)
+        return
+    by_shard = {}
+    for row in rows:
+        by_shard.setdefault(database.shard_for_user(row["owner_id"], data_shards), []).append(row)
+    for shard_id, shard_rows in by_shard.items():
+        db.execute(_save_preview, shard_rows, bind_arguments={"shard_id": shard_id})
+
+
+# --- The pipeline ---
+
+class EnrichmentPipeline:
+    """
+    Fetches link previews in the background; see the module docstring.
+
+    `start` and `stop` run on the event loop that will do the work (the
+    application's lifespan). `submit` may be called from any thread.
+    `session_factory` makes the sessions previews are written with
+    (`database.SessionLocal` by default).
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None):
+        self.session_factory = session_factory
+        self.cache = PreviewCache(settings.ENRICHMENT_CACHE_SIZE, settings.ENRICHMENT_CACHE_TTL_SECONDS)
+        # How many pages were fetched, served from the cache or failed, and
+        # how many items were dropped (queue full), written or not written,
+        # or hit an unexpected error.
+        self.stats: Counter = Counter()
+        self.running = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        """Starts the workers on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Tuple[int, int, str]]" = asyncio.Queue(maxsize=settings.ENRICHMENT_QUEUE_SIZE)
+        self._results: List[dict] = []
+        self._write_lock = asyncio.Lock()
+        self._in_flight: Dict[str, "asyncio.Future[LinkPreview]"] = {}
+        self._hosts = HostLimiter(settings.ENRICHMENT_PER_HOST_CONCURRENCY)
+        self._client = httpx.AsyncClient(
+            transport=transport,
+            timeout=settings.ENRICHMENT_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=settings.ENRICHMENT_CONCURRENCY,
+                max_keepalive_connections=settings.ENRICHMENT_CONCURRENCY,
+            ),
+            follow_redirects=True,
+            max_redirects=5,
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"},
+            # Runs for every request, redirects included.
+            event_hooks={"request": [self._check_url]},
+        )
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(settings.ENRICHMENT_CONCURRENCY)]
+        self._tasks.append(asyncio.create_task(self._flush_periodically()))
+        self.running = True
+
+    async def stop(self) -> None:
+        """Stops the workers, writes the previews already fetched and closes the HTTP client."""
+        if not self.running:
+            return
+        self.running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+        await self._client.aclose()
+
+    async def join(self) -> None:
+        """Waits until every submitted item is fetched and written."""
+        await self._queue.join()
+        await self.flush()
+
+    def submit(self, content_id: int, owner_id: int, url: str) -> None:
+        """Queues a content item for enrichment. Does nothing while the pipeline isn't running."""
+        if not self.running:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._enqueue, (content_id, owner_id, url))
+        except RuntimeError:
+            # The event loop has already shut down.
+            pass
+
+    def _enqueue(self, item: Tuple[int, int, str]) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+
+    # --- Fetching ---
+
+    async def _check_url(self, request: httpx.Request) -> None:
+        if request.url.scheme not in ("http", "https"):
+            raise BlockedURLError(f"unsupported scheme {request.url.scheme!r}")
+        if settings.ENRICHMENT_ALLOW_PRIVATE_HOSTS:
+            return
+        port = request.url.port or (443 if request.url.scheme == "https" else 80)
+        addresses = await asyncio.get_running_loop().getaddrinfo(request.url.host, port)
+        for *_, sockaddr in addresses:
+            if not ipaddress.ip_address(sockaddr[0]).is_global:
+                raise BlockedURLError(f"{request.url.host} is not a public address")
+
+    async def _download(self, url: str) -> LinkPreview:
+        async with self._client.stream("GET", url) as response:
+            content_type = response.headers.get("content-type", "")
+            if response.status_code != 200 or not content_type.startswith(("text/html", "application/xhtml")):
+                return EMPTY_PREVIEW
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= settings.ENRICHMENT_MAX_BYTES:
+                    break
+            html = _decode(bytes(body[:settings.ENRICHMENT_MAX_BYTES]), response.charset_encoding)
+            return parse_metadata(html, str(response.url))
+
+    async def fetch(self, url: str) -> LinkPreview:
+        """Fetches one page's preview, within the per-host limit and the timeout."""
+        host = urlsplit(url).hostname or ""
+        async with self._hosts.hold(host):
+            try:
+                preview = await asyncio.wait_for(self._download(url), settings.ENRICHMENT_TIMEOUT_SECONDS)
+            except (httpx.HTTPError, httpx.InvalidURL, BlockedURLError, OSError, ValueError, asyncio.TimeoutError):
+                self.stats["failed"] += 1
+                return EMPTY_PREVIEW
+        self.stats["fetched"] += 1
+        return preview
+
+    async def lookup(self, url: str) -> LinkPreview:
+        """A page's preview from the cache, or from the fetch already under way, or fetched now."""
+        try:
+            key = normalize_url(url)
+        except ValueError:
+            self.stats["failed"] += 1
+            return EMPTY_PREVIEW
+        preview = self.cache.get(key)
+        if preview is not None:
+            self.stats["cached"] += 1
+            return preview
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.stats["cached"] += 1
+            return await asyncio.shield(pending)
+
+        pending = self._in_flight[key] = asyncio.ensure_future(self.fetch(url))
+        try:
+            preview = await asyncio.shield(pending)
+        finally:
+            del self._in_flight[key]
+        self.cache.put(key, preview)
+        return preview
+
+    # --- Workers ---
+
+    async def _work(self) -> None:
+        while True:
+            content_id, owner_id, url = await self._queue.get()
+            try:
+                preview = await self.lookup(url)
+                self._results.append({
+                    "row_id": content_id,
+                    "owner_id": owner_id,
+                    "fetched_url": url,
+                    "new_title": preview.title,
+                    "new_description": preview.description,
+                    "new_image_url": preview.image_url,
+                    "new_site_name": preview.site_name,
+                    "new_enriched_at": datetime.now(timezone.utc),
+                })
+                if len(self._results) >= settings.ENRICHMENT_BATCH_SIZE:
+                    await self.flush()
+            except Exception:
+                # An unexpected error with one item must not stop the worker;
+                # the item keeps an empty preview.
+                self.stats["errors"] += 1
+            finally:
+                self._queue.task_done()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(settings.ENRICHMENT_FLUSH_SECONDS)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Writes the previews fetched so far, one batch at a time."""
+        async with self._write_lock:
+            while self._results:
+                rows = self._results[:settings.ENRICHMENT_BATCH_SIZE]
+                del self._results[:settings.ENRICHMENT_BATCH_SIZE]
+                await run_in_threadpool(self._write, rows)
+
+    def _write(self, rows: List[dict]) -> None:
+        db = self.session_factory() if self.session_factory else database.SessionLocal()
+        try:
+            save_previews(db, rows)
+            db.commit()
+            self.stats["written"] += len(rows)
+        except SQLAlchemyError:
+            # Previews are best effort; don't let a failed write stop the workers.
+            db.rollback()
+            self.stats["write_failed"] += len(rows)
+        finally:
+            db.close()
+
+
+# The application's pipeline, started by its lifespan when ENRICHMENT_ENABLED is set.
+enricher = EnrichmentPipeline()
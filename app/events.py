@@ -0,0 +1,155 @@
+# app/events.py
+
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+from .config import settings
+
+
+class Event:
+    """One published event. `id` increases monotonically, for `Last-Event-ID` resume."""
+
+    __slots__ = ("id", "topic", "data")
+
+    def __init__(self, id: int, topic: str, data: dict):
+        self.id = id
+        self.topic = topic
+        self.data = data
+
+    def to_sse(self) -> str:
+        """Formats the event as a server-sent events message."""
+        return f"id: {self.id}\nevent: {self.topic.split(':')[0]}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class Subscription:
+    """
+    A subscriber's queue of events, bound to the event loop it reads from.
+
+    Publishers may run in worker threads (our crud functions do), so events are
+    handed to the loop with `call_soon_threadsafe`. If a subscriber falls too
+    far behind, its queue overflows and the subscription is closed; the
+    client reconnects with `Last-Event-ID` and catches up from the history.
+    """
+
+    def __init__(self, topics: Set[str], loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.topics = topics
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def deliver(self, event: Optional[Event]) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's event loop has already shut down.
+            self.closed = True
+
+    def _put(self, event: Optional[Event]) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop the subscriber rather than buffer without bound.
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class InProcessBackend:
+    """
+    Delivers events to subscribers in this process, and keeps the most recent
+    `history_size` events so reconnecting clients can resume.
+
+    This only reaches clients connected to the same worker. For several
+    workers, replace it (see `EventBus.set_backend`) with a backend that
+    relays through a shared broker but exposes the same three methods.
+    """
+
+    def __init__(self, history_size: int, max_queue: int):
+        self.max_queue = max_queue
+        self._ids = itertools.count(1)
+        self._history: "deque[Event]" = deque(maxlen=history_size)
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, topic: str, data: dict) -> Event:
+        with self._lock:
+            event = Event(next(self._ids), topic, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return event
+
+    def subscribe(self, topics: Iterable[str], last_event_id: Optional[int] = None) -> "tuple[Subscription, List[Event]]":
+        """
+        Registers a subscription for `topics` on the running event loop.
+
+        Returns the subscription and, if `last_event_id` is given, the events
+        after it that are still in the history (to be sent before live ones).
+        """
+        subscription = Subscription(set(topics), asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+            missed = []
+            if last_event_id is not None:
+                missed = [
+                    event for event in self._history
+                    if event.id > last_event_id and event.topic in subscription.topics
+                ]
+        return subscription, missed
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscription.closed = True
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({sub for subs in self._subscribers.values() for sub in subs})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._history.clear()
+            self._subscribers.clear()
+
+
+class EventBus:
+    """The publish/subscribe entry point used by the rest of the application."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def set_backend(self, backend) -> None:
+        self.backend = backend
+
+    def publish(self, topic: str, data: dict) -> Event:
+        return self.backend.publish(topic, data)
+
+    def subscribe(self, topics: Iterable[str], last_event_id: Optional[int] = None):
+        return self.backend.subscribe(topics, last_event_id)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.backend.unsubscribe(subscription)
+
+
+def tag_topic(tag_id: int) -> str:
+    return f"tag:{tag_id}"
+
+
+bus = EventBus(InProcessBackend(
+    history_size=settings.EVENT_HISTORY_SIZE,
+    max_queue=settings.EVENT_SUBSCRIBER_QUEUE_SIZE,
+))
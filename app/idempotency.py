@@ -0,0 +1,213 @@
+# app/idempotency.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from .config import settings
+
+# Only requests with these methods can change state, so only they are deduplicated.
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Response headers that are safe to replay. Anything else (e.g. `date`)
+# is produced fresh for the replayed response.
+REPLAYED_HEADERS = {b"content-type", b"location"}
+
+
+class StoredResponse:
+    """A compact copy of a finished response, kept for replays."""
+
+    __slots__ = ("request_hash", "status", "headers", "body", "expires_at")
+
+    def __init__(self, request_hash: str, expires_at: float):
+        self.request_hash = request_hash
+        self.expires_at = expires_at
+        # `status` stays None while the original request is still running.
+        self.status: Optional[int] = None
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.body = b""
+
+
+class IdempotencyStore:
+    """
+    An in-memory, size-bounded store of responses keyed by idempotency key.
+
+    Entries expire after `ttl_seconds`. Because every entry has the same TTL,
+    insertion order is also expiry order, so eviction only ever has to look at
+    the oldest end of the OrderedDict.
+    """
+
+    def __init__(self, ttl_seconds: int, max_keys: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        # Drop expired entries from the oldest end, then enforce the size bound.
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest.expires_at > now and len(self._entries) <= self.max_keys:
+                break
+            self._entries.popitem(last=False)
+
+    def reserve(self, key: str, request_hash: str) -> Tuple[bool, Optional[StoredResponse]]:
+        """
+        Claims `key` for a new request.
+
+        Returns:
+            (True, None) if the key was free and is now reserved by the caller.
+            (False, entry) if the key is already known; the entry is either a
+            finished response or an in-flight reservation (`entry.status is None`).
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                return False, entry
+            self._entries[key] = StoredResponse(request_hash, now + self.ttl_seconds)
+            self._evict(now)
+            return True, None
+
+    def complete(self, key: str, status: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> None:
+        """Stores the final response for a reserved key."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.status = status
+            entry.headers = headers
+            entry.body = body
+
+    def release(self, key: str) -> None:
+        """Forgets a reservation so the client can retry with the same key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# The process-wide store used by the middleware.
+store = IdempotencyStore(
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    max_keys=settings.IDEMPOTENCY_MAX_KEYS,
+)
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware that makes state-changing requests safe to retry.
+
+    When a client sends an `Idempotency-Key` header, the first response for
+    that key is stored and returned verbatim for every retry, so a retried
+    `POST /content/` costs a dictionary lookup instead of creating a duplicate.
+
+    - Keys are scoped to the caller's credentials, method and path.
+    - Reusing a key with a different request body returns 422.
+    - A retry that arrives while the original is still running returns 409.
+    - Server errors (5xx) are not stored, so they can be retried.
+    """
+
+    def __init__(self, app, store: IdempotencyStore = store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        # Read the whole request body up front so it can be fingerprinted,
+        # then hand the buffered messages to the application.
+        messages = []
+        body_hash = hashlib.sha256()
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body_hash.update(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+
+        async def replay_receive():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        principal = hashlib.sha256(headers.get(b"authorization", b"")).hexdigest()
+        key = f"{principal}:{scope['method']}:{scope['path']}:{idempotency_key.decode('latin-1')}"
+        request_hash = body_hash.hexdigest()
+
+        reserved, entry = self.store.reserve(key, request_hash)
+        if not reserved:
+            if entry.request_hash != request_hash:
+                await _send_error(send, 422, "Idempotency-Key was already used with a different request")
+            elif entry.status is None:
+                await _send_error(send, 409, "A request with this Idempotency-Key is already in progress")
+            else:
+                await _send_stored(send, entry)
+            return
+
+        status = None
+        response_headers: List[Tuple[bytes, bytes]] = []
+        body_parts = []
+
+        async def capturing_send(message):
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = [
+                    (name, value) for name, value in message.get("headers", [])
+                    if name.lower() in REPLAYED_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capturing_send)
+        except Exception:
+            self.store.release(key)
+            raise
+
+        if status is None or status >= 500:
+            self.store.release(key)
+        else:
+            self.store.complete(key, status, response_headers, b"".join(body_parts))
+
+
+async def _send_stored(send, entry: StoredResponse) -> None:
+    headers = list(entry.headers) + [
+        (b"content-length", str(len(entry.body)).encode()),
+        (b"idempotent-replayed", b"true"),
+    ]
+    await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+    await send({"type": "http.response.body", "body": entry.body})
+
+
+async def _send_error(send, status: int, detail: str) -> None:
+    body = ('{"detail":"%s"}' % detail).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
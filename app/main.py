@@ -1,16 +1,132 @@
 # app/main.py
 
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 
 # We can also clean up these unused imports now
 # from .database import engine  <-- No longer needed here
 # from . import models          <-- No longer needed here
 
 # Import all the routers for your different application sections
-from .routers import users, auth, content , tags , feed
+from .routers import users, auth, content , tags , feed , admin , batch , stats
+from .idempotency import IdempotencyMiddleware
+from .ratelimit import RateLimitMiddleware
+from .compression import CompressionMiddleware
+from .profiling import ProfilingMiddleware
+from . import crud
+from .config import settings
+from .database import SessionLocal, run_in_batches
+from .enrichment import enricher
+from .graph import feed_graph
+from .related import related_index
+
+
+def rebuild_related_index():
+    db = SessionLocal()
+    try:
+        related_index.build(db)
+    finally:
+        db.close()
+
+
+async def build_related_index_periodically():
+    """
+    Builds the related-content index, then rebuilds it every
+    RELATED_REBUILD_SECONDS (if that is not 0). Until the first build is done,
+    items have no related content.
+    """
+    while True:
+        await run_in_threadpool(rebuild_related_index)
+        if settings.RELATED_REBUILD_SECONDS <= 0:
+            return
+        await asyncio.sleep(settings.RELATED_REBUILD_SECONDS)
+
+
+def compact_tag_activity():
+    db = SessionLocal()
+    try:
+        crud.compact_tag_activity(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def compact_tag_activity_periodically():
+    """Compacts the trending-tag buckets every TRENDING_COMPACT_SECONDS."""
+    while True:
+        await asyncio.sleep(settings.TRENDING_COMPACT_SECONDS)
+        await run_in_threadpool(compact_tag_activity)
+
+
+def archive_old_content():
+    """Moves content older than CONTENT_RETENTION_DAYS to the archive, in batches."""
+    older_than = datetime.now(timezone.utc) - timedelta(days=settings.CONTENT_RETENTION_DAYS)
+    db = SessionLocal()
+    try:
+        run_in_batches(db, crud.archive_content_batch, older_than, settings.ARCHIVE_BATCH_SIZE)
+    finally:
+        db.close()
+
+
+async def archive_old_content_periodically():
+    """Applies the content retention policy every ARCHIVE_INTERVAL_SECONDS."""
+    while True:
+        await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+        await run_in_threadpool(archive_old_content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Runs once when the application starts (before `yield`) and stops."""
+    # Warm the in-memory feed graph, if it is enabled.
+    if settings.FEED_GRAPH_ENABLED:
+        db = SessionLocal()
+        try:
+            feed_graph.load(db)
+        finally:
+            db.close()
+
+    # Fetch link previews of new content in the background.
+    if settings.ENRICHMENT_ENABLED:
+        await enricher.start()
+
+    # The related-content index takes a while to build; requests don't wait for it.
+    background_tasks = [asyncio.create_task(build_related_index_periodically())]
+    if settings.TRENDING_COMPACT_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(compact_tag_activity_periodically()))
+    if settings.CONTENT_RETENTION_DAYS is not None and settings.ARCHIVE_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(archive_old_content_periodically()))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    await enricher.stop()
+    feed_graph.clear()
+    related_index.clear()
+
  
 # Create the main FastAPI application instance.
-app = FastAPI(title="Curator API")
+app = FastAPI(title="Curator API", lifespan=lifespan)
+
+# Sample the process while a request runs, when an admin asks for it with
+# `X-Profile: 1`. Innermost, so the profile covers the request's own work.
+app.add_middleware(ProfilingMiddleware)
+
+# Replay stored responses for retried requests that carry an `Idempotency-Key`.
+app.add_middleware(IdempotencyMiddleware)
+
+# Compress large responses. This sits outside the idempotency layer, so
+# stored responses are kept uncompressed and re-encoded for each client.
+app.add_middleware(CompressionMiddleware)
+
+# Shed load and enforce per-client rate limits. Added last so it runs first,
+# before any other work is done for a request that will be rejected.
+app.add_middleware(RateLimitMiddleware)
 
 # Include the routers from other files. This connects all the endpoints
 # from the users, auth, and content files to our main application.
@@ -19,6 +135,9 @@ app.include_router(auth.router)
 app.include_router(content.router)
 app.include_router(tags.router)
 app.include_router(feed.router)
+app.include_router(admin.router)
+app.include_router(batch.router)
+app.include_router(stats.router)
 
 # The root endpoint, for a simple health check to see if the API is running.
 @app.get("/", tags=["Root"])
@@ -1,4 +1,5 @@
-from sqlalchemy import Boolean , Column , ForeignKey , Integer, String , Table , Text, DateTime
+from sqlalchemy import Boolean , Column , Date , ForeignKey , Index , Integer, String , Table , Text, DateTime
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -7,7 +8,9 @@ from .database import Base
 content_tags_association = Table(
     'content_tags', Base.metadata,
     Column('content_id', Integer , ForeignKey('content.id') , primary_key = True ),
-    Column('tag_id' , Integer , ForeignKey('tags.id'), primary_key = True )
+    Column('tag_id' , Integer , ForeignKey('tags.id'), primary_key = True ),
+    # The primary key only helps lookups by content; this one finds a tag's content.
+    Index('ix_content_tags_tag_id_content_id' , 'tag_id' , 'content_id'),
 )
 
 # Table that links Users and Tags they follow (many-to-many relationship)
@@ -26,6 +29,10 @@ class User(Base):
     hashed_password = Column(String , nullable = False)
     created_at = Column(DateTime(timezone = True) , server_default = func.now())
 
+    # Fetch server-generated values (id, created_at) with RETURNING on INSERT,
+    # instead of a separate SELECT afterwards.
+    __mapper_args__ = {"eager_defaults": True}
+
     # creating relationship with Content (one-to-many i.e a user can have multiple content)
     content = relationship("Content", back_populates = "owner")
 
@@ -38,13 +45,53 @@ class Content(Base):
     id = Column(Integer, primary_key = True , index = True)
     title = Column(String , index = True , nullable= False)
     url = Column(String , nullable = False)
+    # Fingerprint of the normalized URL (`urls.url_fingerprint`), for finding
+    # duplicates through an index instead of comparing URLs.
+    url_hash = Column(String(32) , nullable = True)
+    # True for items saved by a duplicate-aware create (`on_duplicate` is
+    # "update" or "reject"), NULL for the others. A unique index on
+    # (owner_id, url_hash, unique_url) then allows one such item per user and
+    # URL, so concurrent retries can't both insert one, while other items
+    # never conflict (NULLs are distinct in a unique index).
+    unique_url = Column(Boolean , nullable = True)
     description = Column(Text , nullable = True)
     owner_id = Column(Integer, ForeignKey("users.id") , nullable = False)
-    created_at = Column(DateTime(timezone= True) , server_default = func.now())
+    # SQLite's CURRENT_TIMESTAMP has whole seconds; binding values the same
+    # way (no microseconds) keeps comparisons with stored times exact, which
+    # the keyset pagination in `crud.build_content_query` relies on.
+    created_at = Column(
+        DateTime(timezone= True).with_variant(sqlite.DATETIME(truncate_microseconds = True) , "sqlite") ,
+        server_default = func.now()
+    )
+    # The link preview, filled in after the item is saved by the background
+    # pipeline in `enrichment.py` from the page's metadata (Open Graph tags or
+    # its <title>). `enriched_at` is when the page was fetched; the other
+    # columns stay empty if the fetch failed or the page had no metadata.
+    preview_title = Column(String , nullable = True)
+    preview_description = Column(Text , nullable = True)
+    preview_image_url = Column(String , nullable = True)
+    preview_site_name = Column(String , nullable = True)
+    enriched_at = Column(DateTime(timezone = True) , nullable = True)
+
+    __mapper_args__ = {"eager_defaults": True}
 
     owner = relationship("User" , back_populates = "content")
     tags = relationship("Tag" , secondary = content_tags_association , back_populates = "content_items")
 
+    # - (url_hash, owner_id) finds the items for a URL, everyone's
+    #   (`GET /content/lookup`) or one user's (the duplicate check in
+    #   `crud.create_user_content`), without scanning content.
+    # - the unique (owner_id, url_hash, unique_url) is the arbiter of the
+    #   duplicate-aware create (`INSERT ... ON CONFLICT DO NOTHING`).
+    # - (created_at, id) and (owner_id, created_at, id) serve the sorted,
+    #   keyset-paginated listing in `crud.search_content`.
+    __table_args__ = (
+        Index("ix_content_url_hash_owner_id" , "url_hash" , "owner_id"),
+        Index("uq_content_owner_id_url_hash_unique_url" , "owner_id" , "url_hash" , "unique_url" , unique = True),
+        Index("ix_content_created_at_id" , "created_at" , "id"),
+        Index("ix_content_owner_id_created_at_id" , "owner_id" , "created_at" , "id"),
+    )
+
 class Tag(Base):
     __tablename__ = "tags"
 
@@ -54,3 +101,139 @@ class Tag(Base):
     content_items = relationship("Content" , secondary = content_tags_association , back_populates = "tags")
 
     followers = relationship("User" , secondary = user_followed_tags_association , back_populates = "followed_tags")
+
+
+class ArchivedContent(Base):
+    """
+    Content moved out of the `content` table by the retention policy
+    (`crud.archive_content_batch`), so the hot table and its indexes only hold
+    recent items. Same columns as `Content`, plus the item's tag ids (a JSON
+    list) and when it was archived.
+    """
+    __tablename__ = "content_archive"
+
+    id = Column(Integer , primary_key = True)
+    title = Column(String , nullable = False)
+    url = Column(String , nullable = False)
+    url_hash = Column(String(32) , nullable = True)
+    unique_url = Column(Boolean , nullable = True)
+    description = Column(Text , nullable = True)
+    owner_id = Column(Integer , ForeignKey("users.id") , nullable = False , index = True)
+    created_at = Column(DateTime(timezone = True) , nullable = True)
+    preview_title = Column(String , nullable = True)
+    preview_description = Column(Text , nullable = True)
+    preview_image_url = Column(String , nullable = True)
+    preview_site_name = Column(String , nullable = True)
+    enriched_at = Column(DateTime(timezone = True) , nullable = True)
+    tag_ids = Column(Text , nullable = False , default = "[]")
+    archived_at = Column(DateTime(timezone = True) , nullable = False)
+
+
+class TagCoFollow(Base):
+    """
+    How many users follow both `tag_id` and `other_tag_id`.
+
+    This is a tag x tag co-occurrence table maintained by `crud.follow_tag` and
+    `crud.unfollow_tag`. Each pair is stored in both directions, and the
+    diagonal row (tag_id == other_tag_id) holds the tag's follower count.
+    """
+    __tablename__ = "tag_co_follows"
+
+    tag_id = Column(Integer , ForeignKey("tags.id") , primary_key = True)
+    other_tag_id = Column(Integer , ForeignKey("tags.id") , primary_key = True)
+    count = Column(Integer , nullable = False , default = 0)
+
+    # Serves "the tags most co-followed with X" as an index range read.
+    __table_args__ = (
+        Index("ix_tag_co_follows_tag_id_count" , "tag_id" , "count"),
+    )
+
+class TagActivity(Base):
+    """
+    How many content items got a tag, per time bucket, for trending tags.
+
+    A bucket covers `span_hours` hours starting at hour `bucket_start`
+    (counted in whole hours since the Unix epoch, UTC), by the content's
+    creation time. Recent activity is kept in 1-hour buckets; older buckets
+    are compacted into 24-hour ones and eventually evicted (see
+    `crud.compact_tag_activity`). Rows are additive: a period's count is the
+    sum of every row covering it.
+    """
+    __tablename__ = "tag_activity"
+
+    tag_id = Column(Integer , ForeignKey("tags.id") , primary_key = True)
+    span_hours = Column(Integer , primary_key = True)
+    bucket_start = Column(Integer , primary_key = True)
+    count = Column(Integer , nullable = False , default = 0)
+
+    # Trending queries read a recent time range across all tags.
+    __table_args__ = (
+        Index("ix_tag_activity_bucket_start" , "bucket_start"),
+    )
+
+class DailyContentStats(Base):
+    """
+    How many content items were created on each day (UTC), for `GET /stats`.
+
+    Like the other daily rollups below, it is kept up to date by the crud
+    write paths (archived content still counts; deleted content doesn't) and
+    can be recomputed with `crud.rebuild_daily_stats`.
+    """
+    __tablename__ = "daily_content_stats"
+
+    day = Column(Date , primary_key = True)
+    count = Column(Integer , nullable = False , default = 0)
+
+class DailyTagStats(Base):
+    """How many content items created on each day got each tag."""
+    __tablename__ = "daily_tag_stats"
+
+    # (day, tag_id): the key serves "per tag, over a range of days" directly.
+    day = Column(Date , primary_key = True)
+    tag_id = Column(Integer , ForeignKey("tags.id") , primary_key = True)
+    count = Column(Integer , nullable = False , default = 0)
+
+class DailyCuratorStats(Base):
+    """
+    How many content items each user created on each day. A day's active
+    curators are its rows with a positive count.
+    """
+    __tablename__ = "daily_curator_stats"
+
+    day = Column(Date , primary_key = True)
+    # No foreign key: in sharded mode users live in the data shards, and the
+    # rollups in the global one.
+    user_id = Column(Integer , primary_key = True)
+    count = Column(Integer , nullable = False , default = 0)
+
+class IdSequence(Base):
+    """
+    The last id handed out for a table, in sharded mode.
+
+    Users and content get their ids from here (see `database.allocate_ids`)
+    instead of from each shard's autoincrement, so ids are unique across shards.
+    """
+    __tablename__ = "id_sequences"
+
+    name = Column(String , primary_key = True)
+    last_id = Column(Integer , nullable = False)
+
+class BackfillCheckpoint(Base):
+    """
+    How far a data backfill (see `app/backfill.py`) has got.
+
+    Each batch of a backfill commits together with the update of its
+    checkpoint, so after a crash the backfill resumes after the last batch
+    that was committed, and no batch is applied twice.
+    """
+    __tablename__ = "backfill_checkpoints"
+
+    name = Column(String , primary_key = True)
+    # The primary key of the last row processed; rows are visited in key order.
+    last_id = Column(Integer , nullable = False , default = 0)
+    rows_done = Column(Integer , nullable = False , default = 0)
+    # "running" or "done".
+    status = Column(String , nullable = False , default = "running")
+    started_at = Column(DateTime(timezone = True) , nullable = False)
+    updated_at = Column(DateTime(timezone = True) , nullable = False)
+    finished_at = Column(DateTime(timezone = True) , nullable = True)
@@ -0,0 +1,201 @@
+# app/profiling.py
+
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, Optional
+
+from .config import settings
+from . import security
+
+# Leaf functions of threads that are waiting rather than working (an idle
+# thread-pool worker, the event loop waiting for I/O). Their samples are
+# dropped so the profile shows where time is actually spent.
+IDLE_FUNCTIONS = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    A statistical profiler for the whole running process.
+
+    A background thread wakes up every `interval` seconds, takes a snapshot
+    of every other thread's Python stack (`sys._current_frames()`) and counts
+    identical stacks. Nothing is instrumented, so the application runs at
+    full speed between samples.
+
+    The sampler also bounds its own cost: it measures how long each sample
+    takes and, if sampling would use more than `max_overhead` (a fraction)
+    of the wall time, it waits longer before the next one.
+
+    `collapsed()` returns the result in the "collapsed stack" format read by
+    flamegraph.pl, speedscope and similar tools: one line per distinct stack,
+    `outer;...;inner <count>`.
+    """
+
+    def __init__(self, interval: float = 0.005, max_overhead: float = 0.02):
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.wall_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+
+    def start(self) -> None:
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.wall_seconds = time.perf_counter() - self._started_at
+
+    def _run(self) -> None:
+        own_thread = threading.get_ident()
+        while not self._stop.is_set():
+            began = time.perf_counter()
+            self._sample(own_thread)
+            cost = time.perf_counter() - began
+            self.sampling_seconds += cost
+            # Sleep at least `interval`, and long enough that `cost` stays
+            # within `max_overhead` of the time between samples.
+            self._stop.wait(max(self.interval, cost / self.max_overhead - cost))
+
+    def _sample(self, own_thread: int) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            leaf = frame.f_code
+            if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FUNCTIONS:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+        self.samples += 1
+
+    @property
+    def overhead(self) -> float:
+        """The fraction of wall time the sampler spent taking samples."""
+        return self.sampling_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def stats_headers(self) -> Dict[str, str]:
+        return {
+            "X-Profile-Samples": str(self.samples),
+            "X-Profile-Overhead": f"{self.overhead:.4f}",
+        }
+
+
+def new_profiler() -> SamplingProfiler:
+    return SamplingProfiler(
+        interval=settings.PROFILE_SAMPLE_INTERVAL_SECONDS,
+        max_overhead=settings.PROFILE_MAX_OVERHEAD,
+    )
+
+
+class ProfileStore:
+    """The most recent per-request profiles, by id, for `GET /admin/profiles/{id}`."""
+
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, SamplingProfiler]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, profile_id: str, profiler: SamplingProfiler) -> None:
+        with self._lock:
+            self._profiles[profile_id] = profiler
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[SamplingProfiler]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+profiles = ProfileStore(settings.PROFILE_MAX_STORED)
+
+# Only one process-wide profile runs at a time; overlapping samplers would
+# double the overhead and sample each other.
+profile_lock = threading.Lock()
+
+
+def is_admin(email: Optional[str]) -> bool:
+    return email is not None and email in settings.ADMIN_EMAILS
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware for per-request profiling.
+
+    An admin can send `X-Profile: 1` with any request. The process is sampled
+    while that request runs, the response gets an `X-Profile-Id` header, and
+    the collapsed stacks can then be downloaded from
+    `GET /admin/profiles/{id}`. Other threads' work during the request
+    (e.g. concurrent requests) is included, as with `POST /admin/profile`.
+
+    The header is ignored for non-admins, and while another profile is
+    already running.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        profiler = new_profiler()
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode()),
+                ]
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            profile_lock.release()
+            profiles.put(profile_id, profiler)
+
+    @staticmethod
+    def _wants_profile(scope) -> bool:
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") not in (b"1", b"true"):
+            return False
+        scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        return is_admin(security.decode_access_token(token))
@@ -0,0 +1,205 @@
+# app/ratelimit.py
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .batching import batch_state
+from .config import settings
+from . import security
+
+# Number of seconds in each period a limit can be expressed in.
+PERIODS = {"second": 1, "minute": 60, "hour": 60 * 60}
+
+
+def parse_limit(limit: str) -> Tuple[int, int]:
+    """
+    Parses a limit such as "10/minute" into (requests, period_seconds).
+
+    Raises:
+        ValueError: If the limit is not in the "<requests>/<period>" format.
+    """
+    count, _, period = limit.partition("/")
+    if period not in PERIODS or not count.strip().isdigit():
+        raise ValueError(f"Invalid rate limit {limit!r}, expected e.g. '10/minute'")
+    return int(count), PERIODS[period]
+
+
+class TokenBucketStore:
+    """
+    Keeps one token bucket per key in a size-bounded LRU.
+
+    Each bucket is just (tokens, last_refill_time); refilling is computed
+    lazily from the elapsed time, so every check is O(1). When the store is
+    full, the least recently used bucket is dropped - a forgotten client
+    simply starts again with a full bucket.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[tuple, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: tuple, capacity: int, period: int) -> Tuple[bool, int, float]:
+        """
+        Tries to take one token from the bucket for `key`.
+
+        Returns:
+            (allowed, remaining_tokens, retry_after_seconds)
+        """
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(capacity), now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, int(bucket[0]), 0.0
+            return False, 0, (1 - bucket[0]) / rate
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimiter:
+    """Resolves which limit applies to a request and checks it against the store."""
+
+    def __init__(self, default: str, routes: Dict[str, str], max_keys: int):
+        self.default = parse_limit(default)
+        # Longest prefixes first, so "/feed/stream" can override "/feed".
+        self.routes = sorted(
+            ((prefix, parse_limit(limit)) for prefix, limit in routes.items()),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        self.store = TokenBucketStore(max_keys)
+
+    def limit_for(self, path: str) -> Tuple[str, Tuple[int, int]]:
+        for prefix, limit in self.routes:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return prefix, limit
+        return "*", self.default
+
+    def check(self, path: str, principal: str) -> Tuple[bool, int, int, float]:
+        """Returns (allowed, limit, remaining, retry_after) for one request."""
+        route, (capacity, period) = self.limit_for(path)
+        allowed, remaining, retry_after = self.store.take((route, principal), capacity, period)
+        return allowed, capacity, remaining, retry_after
+
+
+limiter = RateLimiter(
+    default=settings.RATE_LIMIT_DEFAULT,
+    routes=settings.RATE_LIMIT_ROUTES,
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+)
+
+
+def get_principal(scope) -> str:
+    """
+    Identifies who is making the request.
+
+    Uses the `sub` of a valid bearer token when present (the same subject that
+    `security.get_current_user` resolves), and falls back to the client address.
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                subject = security.decode_access_token(token)
+                if subject is not None:
+                    return f"user:{subject}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware for admission control and per-client rate limiting.
+
+    1. Admission control: at most `max_concurrent` requests are processed at
+       once. Past that, requests are shed with 503 immediately, rather than
+       piling up behind an exhausted database connection pool. Streaming
+       endpoints listed in `settings.ADMISSION_EXEMPT_PATHS` don't count,
+       and neither do the sub-requests of an already admitted `POST /batch`.
+    2. Rate limiting: each (route, client) pair has a token bucket; requests
+       beyond the limit get 429 with a `Retry-After` header.
+    """
+
+    def __init__(self, app, limiter: RateLimiter = limiter, max_concurrent: Optional[int] = None):
+        self.app = app
+        self.limiter = limiter
+        if max_concurrent is None:
+            max_concurrent = settings.MAX_CONCURRENT_REQUESTS
+        if max_concurrent is None:
+            max_concurrent = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        admitted = scope["path"] not in settings.ADMISSION_EXEMPT_PATHS and not batch_state(scope)
+        if admitted and self.in_flight >= self.max_concurrent:
+            await _reject(send, 503, "Server is busy, please retry", retry_after=1)
+            return
+
+        rate_headers = []
+        if settings.RATE_LIMIT_ENABLED:
+            allowed, limit, remaining, retry_after = self.limiter.check(
+                scope["path"], get_principal(scope)
+            )
+            rate_headers = [
+                (b"x-ratelimit-limit", str(limit).encode()),
+                (b"x-ratelimit-remaining", str(remaining).encode()),
+            ]
+            if not allowed:
+                await _reject(send, 429, "Too many requests", math.ceil(retry_after), rate_headers)
+                return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and rate_headers:
+                message["headers"] = list(message.get("headers", [])) + rate_headers
+            await send(message)
+
+        if not admitted:
+            await self.app(scope, receive, send_with_headers)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            self.in_flight -= 1
+
+
+async def _reject(send, status: int, detail: str, retry_after: int, extra_headers=()) -> None:
+    body = ('{"detail":"%s"}' % detail).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(retry_after, 1)).encode()),
+            *extra_headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
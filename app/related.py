@@ -0,0 +1,174 @@
+# app/related.py
+
+import math
+import threading
+from array import array
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+
+
+class RelatedContentIndex:
+    """
+    Precomputed "more like this" neighbours for every content item.
+
+    Each item is treated as a sparse vector over its tags, where a tag's
+    weight is its inverse document frequency (rare tags say more about an item
+    than common ones). Two items are related by the cosine similarity of
+    their vectors, and for every item we store only its top-k neighbours, as a
+    pair of compact arrays (ids and scores).
+
+    Candidates are found through an inverted index (tag -> items), so an item
+    is only ever compared with items it shares at least one tag with.
+
+    - `build` recomputes everything from `content_tags`; the application
+      rebuilds periodically so tag weights stay current.
+    - `add_tag` / `remove_content` apply single changes incrementally: the
+      changed item, and the items sharing a tag with it, are marked dirty and
+      their neighbours are recomputed the next time they are read.
+    """
+
+    def __init__(self, top_k: int = 20, max_tag_items: int = 10_000):
+        self.top_k = top_k
+        # Tags on more items than this are too generic to find candidates
+        # with; they still count towards the similarity score.
+        self.max_tag_items = max_tag_items
+        self.loaded = False
+        self._item_tags: Dict[int, Set[int]] = {}
+        self._tag_items: Dict[int, Set[int]] = {}
+        self._neighbors: Dict[int, Tuple[array, array]] = {}
+        self._dirty: Set[int] = set()
+        self._pending: List[Tuple[str, tuple]] = []
+        self._building = False
+        self._lock = threading.RLock()
+
+    # --- Building ---
+
+    def build(self, db: Session) -> None:
+        """Rebuilds the whole index from the `content_tags` table."""
+        with self._lock:
+            self._building = True
+            self._pending = []
+        try:
+            item_tags: Dict[int, Set[int]] = {}
+            tag_items: Dict[int, Set[int]] = {}
+            rows = db.execute(
+                select(
+                    models.content_tags_association.c.content_id,
+                    models.content_tags_association.c.tag_id,
+                )
+            )
+            for content_id, tag_id in rows:
+                item_tags.setdefault(content_id, set()).add(tag_id)
+                tag_items.setdefault(tag_id, set()).add(content_id)
+        except Exception:
+            with self._lock:
+                self._building = False
+            raise
+
+        with self._lock:
+            self._item_tags = item_tags
+            self._tag_items = tag_items
+            # Replay changes that were made while the rows were being read.
+            for operation, args in self._pending:
+                getattr(self, "_" + operation)(*args)
+            self._pending = []
+            self._building = False
+            self._neighbors = {}
+            self._dirty = set(item_tags)
+            self.loaded = True
+        # Compute every item's neighbours now, rather than on first read.
+        for content_id in list(item_tags):
+            self.related_ids(content_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._item_tags = {}
+            self._tag_items = {}
+            self._neighbors = {}
+            self._dirty = set()
+            self._pending = []
+            self.loaded = False
+
+    # --- Incremental updates ---
+
+    def add_tag(self, content_id: int, tag_id: int) -> None:
+        self._apply("add_tag", (content_id, tag_id))
+
+    def remove_content(self, content_id: int) -> None:
+        self._apply("remove_content", (content_id,))
+
+    def _apply(self, operation: str, args: tuple) -> None:
+        with self._lock:
+            if self._building:
+                self._pending.append((operation, args))
+            if self.loaded:
+                getattr(self, "_" + operation)(*args)
+
+    def _add_tag(self, content_id: int, tag_id: int) -> None:
+        tags = self._item_tags.setdefault(content_id, set())
+        if tag_id in tags:
+            return
+        tags.add(tag_id)
+        self._mark_neighbours_dirty(content_id)
+        self._tag_items.setdefault(tag_id, set()).add(content_id)
+        self._dirty.add(content_id)
+
+    def _remove_content(self, content_id: int) -> None:
+        self._mark_neighbours_dirty(content_id)
+        for tag_id in self._item_tags.pop(content_id, ()):
+            self._tag_items.get(tag_id, set()).discard(content_id)
+        self._neighbors.pop(content_id, None)
+        self._dirty.discard(content_id)
+
+    def _mark_neighbours_dirty(self, content_id: int) -> None:
+        for tag_id in self._item_tags.get(content_id, ()):
+            self._dirty.update(self._tag_items.get(tag_id, ()))
+
+    # --- Scoring ---
+
+    def _weight(self, tag_id: int) -> float:
+        return math.log(1 + len(self._item_tags) / len(self._tag_items[tag_id]))
+
+    def _norm(self, tags: Set[int]) -> float:
+        return math.sqrt(sum(self._weight(tag_id) ** 2 for tag_id in tags))
+
+    def _compute(self, content_id: int) -> Tuple[array, array]:
+        tags = self._item_tags.get(content_id, set())
+        overlap: Dict[int, float] = {}
+        for tag_id in tags:
+            items = self._tag_items.get(tag_id, ())
+            if len(items) > self.max_tag_items:
+                continue
+            weight = self._weight(tag_id) ** 2
+            for other in items:
+                if other != content_id:
+                    overlap[other] = overlap.get(other, 0.0) + weight
+
+        norm = self._norm(tags)
+        scored = []
+        for other, dot in overlap.items():
+            other_norm = self._norm(self._item_tags[other])
+            if norm and other_norm:
+                scored.append((dot / (norm * other_norm), other))
+        # Highest score first; ties go to the newest item.
+        scored.sort(key=lambda pair: (-pair[0], -pair[1]))
+        scored = scored[: self.top_k]
+        return array("q", (other for _, other in scored)), array("f", (score for score, _ in scored))
+
+    def related_ids(self, content_id: int, limit: int = 10) -> List[int]:
+        """Returns the ids of the items most related to `content_id`, best first."""
+        with self._lock:
+            if content_id in self._dirty or content_id not in self._neighbors:
+                self._neighbors[content_id] = self._compute(content_id)
+                self._dirty.discard(content_id)
+            ids, _ = self._neighbors[content_id]
+            return list(ids[:limit])
+
+
+# The process-wide index used by `GET /content/{id}/related`.
+related_index = RelatedContentIndex(top_k=settings.RELATED_CONTENT_TOP_K)
@@ -0,0 +1,36 @@
+# app/rollups.py
+"""
+Recomputes the daily statistics rollups behind `GET /stats/...` from the
+content, tag and archive tables.
+
+The write paths keep the rollups up to date; rebuild them once after adding
+them to an existing database, or to repair them. Run from the project root:
+
+    python -m app.rollups
+
+This is the same as `POST /admin/stats/rebuild`: one transaction, with the
+content read in chunks.
+"""
+
+import argparse
+
+from . import crud
+from .database import SessionLocal
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the daily statistics rollups from the content tables.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="content items read at a time (default: 1000)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        crud.rebuild_daily_stats(db, chunk_size=args.chunk_size)
+        db.commit()
+    finally:
+        db.close()
+    print("Daily statistics rebuilt.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# app/routers/admin.py
+
+import asyncio
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from .. import crud, database, models, schemas, security
+from ..config import settings
+from ..profiling import new_profiler, profile_lock, profiles
+
+# Operational endpoints, only for users listed in `settings.ADMIN_EMAILS`.
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+)
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile_process(
+    seconds: float = Query(..., gt=0, le=settings.PROFILE_MAX_SECONDS),
+    admin: models.User = Depends(security.get_current_admin_user),
+    db: Session = Depends(database.get_db, scope="function"),
+):
+    """
+    Samples what this worker process is doing for `seconds` seconds.
+
+    - **Authentication**: Admin only.
+    - Returns collapsed stacks (`frame;frame;frame count` per line), ready
+      for flamegraph.pl or speedscope.
+    - `X-Profile-Samples` and `X-Profile-Overhead` (the fraction of the time
+      spent sampling) report on the run itself.
+    - Only one profile runs at a time; a second request gets 409.
+    """
+    # The admin check is done with the database. End its transaction, so its
+    # connection goes back to the pool instead of being held for the whole run.
+    await run_in_threadpool(db.commit)
+
+    if not profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running")
+    try:
+        profiler = new_profiler()
+        profiler.start()
+        try:
+            # Wait without blocking the event loop, so the process keeps serving
+            # (and the profile shows) normal traffic.
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+    finally:
+        profile_lock.release()
+    return PlainTextResponse(profiler.collapsed(), headers=profiler.stats_headers())
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+def read_request_profile(
+    profile_id: str,
+    admin: models.User = Depends(security.get_current_admin_user),
+):
+    """
+    Returns the collapsed stacks recorded for a request sent with `X-Profile: 1`.
+
+    - **Authentication**: Admin only.
+    - `profile_id` is the `X-Profile-Id` header of that request's response.
+      Only the most recent profiles are kept.
+    """
+    profiler = profiles.get(profile_id)
+    if profiler is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return PlainTextResponse(profiler.collapsed(), headers=profiler.stats_headers())
+
+
+@router.post("/trending/rebuild", status_code=status.HTTP_204_NO_CONTENT)
+def rebuild_trending_tags(
+    db: Session = Depends(database.get_db, scope="function"),
+    admin: models.User = Depends(security.get_current_admin_user),
+):
+    """
+    Recomputes the trending-tag counters from the content history.
+
+    - **Authentication**: Admin only.
+    - Needed once after the counters are introduced, or to repair them.
+      Content is read in chunks, but the whole rebuild is one transaction.
+    """
+    crud.rebuild_tag_activity(db)
+
+
+@router.post("/stats/rebuild", status_code=status.HTTP_204_NO_CONTENT)
+def rebuild_daily_stats(
+    db: Session = Depends(database.get_db, scope="function"),
+    admin: models.User = Depends(security.get_current_admin_user),
+):
+    """
+    Recomputes the daily statistics behind `/stats` from the content tables.
+
+    - **Authentication**: Admin only.
+    - Needed once after the rollups are introduced, or to repair them (also
+      available as `python -m app.rollups`). Content is read in chunks, but
+      the whole rebuild is one transaction.
+    """
+    crud.rebuild_daily_stats(db)
+
+
+@router.get("/backfills", response_model=List[schemas.BackfillStatus])
+def read_backfills(
+    db: Session = Depends(database.get_db, scope="function"),
+    admin: models.User = Depends(security.get_current_admin_user),
+):
+    """
+    Shows the progress of the data backfills (`python -m app.backfill`).
+
+    - **Authentication**: Admin only.
+    - One entry per backfill that has been started: how far it got
+      (`last_id`, `rows_done`), whether it is `running` or `done`, and its
+      average speed.
+    """
+    return crud.get_backfill_statuses(db)
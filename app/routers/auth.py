@@ -1,5 +1,5 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
@@ -12,8 +12,12 @@ router = APIRouter(
 
 @router.post("/token", response_model=schemas.Token)
 def login_for_access_token(
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(database.get_db)
+    db: Session = Depends(database.get_db, scope="function"),
+    # A separate unit of work that stays open until after the response has
+    # been sent, for the password rehash (see Step 2).
+    rehash_db: Session = Depends(database.get_db, use_cache=False),
 ):
     """
     Provides a login endpoint to issue JWT access tokens.
@@ -26,6 +30,7 @@ def login_for_access_token(
         form_data (OAuth2PasswordRequestForm): FastAPI's dependency to handle
                                                form data with "username" and "password" fields.
         db (Session): The SQLAlchemy database session dependency.
+        rehash_db (Session): The session the outdated-hash upgrade is written with.
 
     Raises:
         HTTPException: 401 Unauthorized if authentication fails.
@@ -49,13 +54,35 @@ def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Step 2: Create the access token.
+    # Step 2: Upgrade an outdated password hash (e.g. one made before
+    # BCRYPT_ROUNDS was raised). Hashing is the slow part of a login, so the
+    # new hash is computed and saved in a background task, after the response
+    # has been sent, instead of doubling this request's latency.
+    if security.needs_rehash(user.hashed_password):
+        background_tasks.add_task(
+            crud.rehash_user_password,
+            rehash_db, user.id, user.hashed_password, form_data.password,
+        )
+
+    # Step 3: Create the access token.
     # The token's payload ('sub' for subject) should identify the user.
     # We use the user's email as the subject.
     access_token = security.create_access_token(
         data={"sub": user.email}
     )
 
-    # Step 3: Return the token.
+    # Step 4: Return the token.
     # The response is structured according to our `schemas.Token` Pydantic model.
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.get("/.well-known/jwks.json")
+def read_jwks():
+    """
+    Publishes the public keys that verify our access tokens, as a JSON Web Key Set.
+
+    Other services use these (matched by the token's `kid` header) to verify
+    tokens without knowing any secret. The set is empty when tokens are
+    signed with a shared HMAC secret.
+    """
+    return {"keys": security.key_ring.jwks()}
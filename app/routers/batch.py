@@ -0,0 +1,66 @@
+# app/routers/batch.py
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+
+from .. import batching, database, schemas, security
+from ..config import settings
+
+router = APIRouter(tags=["Batch"])
+
+# Like `security.oauth2_scheme`, but a batch may also be anonymous.
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+
+@router.post("/batch", response_model=schemas.BatchResponse)
+async def run_batch(
+    batch: schemas.BatchRequest,
+    request: Request,
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: Session = Depends(database.get_db, scope="function"),
+):
+    """
+    Makes several API calls in one round trip.
+
+    ```
+    {"requests": [
+        {"id": "me", "path": "/users/me"},
+        {"id": "feed", "path": "/feed?limit=20"},
+        {"id": "new", "method": "POST", "path": "/content/", "body": {"title": "...", "url": "..."}}
+    ]}
+    ```
+
+    - **Authentication**: Optional. With a bearer token, every sub-request
+      runs as that user (the token is verified once, for the whole batch).
+    - Responses come back in the order of the requests, each with its
+      `status`, `headers` and decoded `body`. A failing sub-request doesn't
+      stop the others.
+    - Consecutive `GET`s run concurrently. `POST`, `PUT` and `DELETE`
+      sub-requests run one at a time, after everything before them, and each
+      commits its own changes.
+    - Sub-requests count towards the rate limits of their own routes.
+    - At most `MAX_BATCH_REQUESTS` sub-requests per batch; batches can't
+      contain `/batch` or streaming endpoints.
+    """
+    if len(batch.requests) > settings.MAX_BATCH_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.MAX_BATCH_REQUESTS} requests can be batched at once",
+        )
+    if any(not sub.path.startswith("/") for sub in batch.requests):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Request paths must start with /",
+        )
+
+    user_email = None
+    if token is not None:
+        user = await run_in_threadpool(security.get_current_user, request, token, db)
+        user_email = user.email
+
+    responses = await batching.run(request.app, request.scope, batch.requests, user_email, db)
+    return {"responses": responses}
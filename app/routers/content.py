@@ -1,11 +1,13 @@
 # app/routers/content.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
 # Import all the necessary components from our application
 from .. import crud, models, schemas, database, security
+from ..dependencies import batch_ids
 
 # Create the router for content-related endpoints
 router = APIRouter(
@@ -16,7 +18,8 @@ router = APIRouter(
 @router.post("/", response_model=schemas.Content, status_code=status.HTTP_201_CREATED)
 def create_new_content(
     content: schemas.ContentCreate,
-    db: Session = Depends(database.get_db),
+    on_duplicate: Optional[schemas.DuplicateMode] = None,
+    db: Session = Depends(database.get_db, scope="function"),
     current_user: models.User = Depends(security.get_current_active_user)
 ):
     """
@@ -24,30 +27,136 @@ def create_new_content(
 
     - **Authentication**: Requires a valid JWT access token.
     - The new content will be owned by the user whose token is provided.
+    - `on_duplicate` applies when the user has already saved the same URL
+      (compared after normalization): `allow` creates another item, `update`
+      updates the existing one, and `reject` fails with 409. The default is
+      `update` if `CONTENT_UPSERT_BY_URL` is enabled, `allow` otherwise.
     """
     # We now have access to `current_user` thanks to our dependency.
     # We pass the user's ID to the CRUD function.
-    return crud.create_user_content(db=db, content=content, user_id=current_user.id)
+    db_content = crud.create_user_content(
+        db=db, content=content, user_id=current_user.id, on_duplicate=on_duplicate
+    )
+    if db_content is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="You have already saved this URL")
+    return db_content
 
 
-@router.get("/", response_model=List[schemas.Content])
+@router.get("/", response_model=Union[List[schemas.Content], schemas.NormalizedContentList])
 def read_all_content(
+    response: Response,
     skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(database.get_db)
+    limit: int = Query(100, ge=1, le=1000),
+    tag: Optional[List[int]] = Query(None, description="Tag ID to filter by; repeat for several"),
+    tag_match: schemas.TagMatch = "any",
+    owner_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    sort: schemas.ContentSort = "newest",
+    cursor: Optional[str] = None,
+    shape: schemas.ListShape = "full",
+    db: Session = Depends(database.get_db, scope="function")
 ):
     """
-    Retrieves a list of all content items.
+    Retrieves a list of content items, optionally filtered.
     
     - This is a public endpoint and does not require authentication.
-    - Supports pagination via `skip` and `limit` query parameters.
+    - Filters (all optional, combined with AND):
+      - `tag`: items with this tag ID; repeat it (`?tag=1&tag=2`) to match
+        items with any of the tags, or all of them with `tag_match=all`.
+      - `owner_id`: items owned by this user.
+      - `created_after` / `created_before`: a creation time range.
+    - `sort` is `newest` (default) or `oldest` first.
+    - Pagination: when there are more results, the `X-Next-Cursor` response
+      header holds a cursor; pass it back as `cursor` for the next page.
+      `skip` still works, but gets slower the deeper you page.
+    - `shape=normalized` sends each tag once in a `tags` table and has items
+      reference them by id, instead of repeating tag objects per item.
     """
-    all_content = crud.get_content(db, skip=skip, limit=limit)
+    try:
+        all_content, next_cursor = crud.search_content(
+            db,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
+            tag_ids=tag,
+            tag_match=tag_match,
+            owner_id=owner_id,
+            created_after=created_after,
+            created_before=created_before,
+            as_rows=True,
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if shape == "normalized":
+        return schemas.NormalizedContentList.from_content(all_content)
     return all_content
 
 
+@router.get("", response_model=schemas.ContentBatch)
+def read_content_batch(
+    ids: List[int] = Depends(batch_ids),
+    db: Session = Depends(database.get_db, scope="function")
+):
+    """
+    Retrieves several content items at once: `GET /content?ids=3,1,2`.
+
+    - This is a public endpoint.
+    - Items are returned in the order requested; IDs that don't exist are
+      listed in `missing`.
+    - At most `MAX_BATCH_IDS` IDs per request.
+    """
+    items = crud.get_content_by_ids(db, ids)
+    found = {item.id for item in items}
+    return {"items": items, "missing": [content_id for content_id in ids if content_id not in found]}
+
+
+@router.delete("", response_model=schemas.ContentBulkDelete)
+def delete_content_batch(
+    ids: List[int] = Depends(batch_ids),
+    db: Session = Depends(database.get_db, scope="function"),
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    Deletes several of your content items at once: `DELETE /content?ids=3,1,2`.
+
+    - **Authentication**: Requires a valid JWT access token.
+    - Only your own items are deleted; IDs of other users' items are listed
+      in `forbidden`, and IDs that don't exist in `missing`.
+    - The items and their tag links are removed with a few set-based
+      statements (in chunks of `DELETE_BATCH_SIZE`), in one transaction.
+    - At most `MAX_BATCH_IDS` IDs per request.
+    """
+    deleted, forbidden = crud.delete_content_by_ids(db, ids, owner_id=current_user.id)
+    found = set(deleted) | set(forbidden)
+    return {
+        "deleted": deleted,
+        "missing": [content_id for content_id in ids if content_id not in found],
+        "forbidden": forbidden,
+    }
+
+
+@router.get("/lookup", response_model=List[schemas.Content])
+def lookup_content_by_url(
+    url: str = Query(..., min_length=1),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(database.get_db, scope="function")
+):
+    """
+    Finds the content items that link to a URL, oldest first.
+
+    - This is a public endpoint.
+    - URLs are compared after normalization, so `https://Example.com/post/?utm_source=x`
+      finds items saved as `https://example.com/post`.
+    """
+    return crud.get_content_by_url(db, url, limit=limit)
+
+
 @router.get("/{content_id}", response_model=schemas.Content)
-def read_single_content(content_id: int, db: Session = Depends(database.get_db)):
+def read_single_content(content_id: int, db: Session = Depends(database.get_db, scope="function")):
     """
     Retrieves a single content item by its ID.
 
@@ -59,10 +168,27 @@ def read_single_content(content_id: int, db: Session = Depends(database.get_db))
     return db_content
 
 
+@router.get("/{content_id}/related", response_model=List[schemas.Content])
+def read_related_content(
+    content_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(database.get_db, scope="function")
+):
+    """
+    Retrieves the content most similar to a content item ("more like this").
+
+    - This is a public endpoint.
+    - Items are ranked by how many tags they share, with rarer tags counting more.
+    """
+    if crud.get_content_by_id(db, content_id=content_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Content not found")
+    return crud.get_related_content(db, content_id=content_id, limit=limit)
+
+
 @router.delete("/{content_id}", response_model=schemas.Content)
 def delete_user_content(
     content_id: int,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_db, scope="function"),
     current_user: models.User = Depends(security.get_current_active_user)
 ):
     """
@@ -88,8 +214,8 @@ def delete_user_content(
     # ---- END OF AUTHORIZATION CHECK ----
 
     # If authorization passes, proceed with deletion.
-    # We need a CRUD function for this. Let's assume it exists and add it next.
-    crud.delete_content_by_id(db, content_id=content_id)
+    # We already have the row loaded, so delete it directly instead of looking it up again.
+    crud.delete_content(db, db_content)
     
     # Return the data of the deleted item as confirmation.
     return db_content
@@ -97,7 +223,7 @@ def delete_user_content(
 def add_tag_to_a_piece_of_content(
     content_id: int,
     tag_id: int,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_db, scope="function"),
     current_user: models.User = Depends(security.get_current_active_user)
 ):
     """
@@ -134,7 +260,7 @@ def add_tag_to_a_piece_of_content(
 def update_a_piece_of_content(
     content_id: int,
     content_update: schemas.ContentCreate,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_db, scope="function"),
     current_user: models.User = Depends(security.get_current_active_user)
 ):
     """
@@ -1,21 +1,29 @@
 # app/routers/feed.py
 
-from fastapi import APIRouter, Depends
+import asyncio
+from collections import deque
+
+from fastapi import APIRouter, Depends, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
 from .. import crud, models, schemas, database, security
+from ..config import settings
+from ..events import bus, tag_topic
 
 # Create a new router for the feed endpoint
 router = APIRouter(
     tags=["Feed"]  # Group this endpoint under "Feed" in the API docs
 )
 
-@router.get("/feed", response_model=List[schemas.Content])
+@router.get("/feed", response_model=Union[List[schemas.Content], schemas.NormalizedContentList])
 def get_user_feed_endpoint(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(database.get_db),
+    shape: schemas.ListShape = "full",
+    db: Session = Depends(database.get_db, scope="function"),
     current_user: models.User = Depends(security.get_current_active_user)
 ):
     """
@@ -23,8 +31,71 @@ def get_user_feed_endpoint(
 
     The feed consists of content items tagged with tags that the user follows.
     - **Authentication**: Requires a valid JWT access token.
+    - `shape=normalized` returns tags once in a side table, referenced by id.
     """
     # The endpoint logic is extremely simple because all the complexity
     # is handled by the CRUD function.
-    feed = crud.get_user_feed(db=db, user=current_user, skip=skip, limit=limit)
-    return feed
\ No newline at end of file
+    feed = crud.get_user_feed(db=db, user=current_user, skip=skip, limit=limit, as_rows=True)
+    if shape == "normalized":
+        return schemas.NormalizedContentList.from_content(feed)
+    return feed
+
+
+@router.get("/feed/stream")
+async def stream_user_feed(
+    last_event_id: Optional[str] = Header(None),
+    db: Session = Depends(database.get_db, scope="function"),
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    Pushes new feed items to the client as server-sent events, instead of
+    the client polling `/feed`.
+
+    - **Authentication**: Requires a valid JWT access token.
+    - An event is sent whenever content is tagged with a tag the user follows.
+    - Send the `Last-Event-ID` header when reconnecting to receive the events
+      missed in between (as long as they are still in the server's history).
+    - Idle connections receive a keep-alive comment every few seconds.
+
+    The followed tags are read once when the stream opens; the database
+    session is released before streaming starts, so idle connections don't
+    hold database connections.
+    """
+    followed = await run_in_threadpool(lambda: [tag.id for tag in current_user.followed_tags])
+    topics = [tag_topic(tag_id) for tag_id in followed]
+    resume_from = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    async def event_stream():
+        subscription, missed = bus.subscribe(topics, last_event_id=resume_from)
+        # The same content can be tagged with several followed tags; send it
+        # once. Only recent ids are remembered, to keep memory per connection bounded.
+        sent_content_ids = deque(maxlen=256)
+        try:
+            for event in missed:
+                if event.data["content_id"] in sent_content_ids:
+                    continue
+                sent_content_ids.append(event.data["content_id"])
+                yield event.to_sse()
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.FEED_STREAM_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    # We fell too far behind; the client will reconnect and resume.
+                    break
+                if event.data["content_id"] in sent_content_ids:
+                    continue
+                sent_content_ids.append(event.data["content_id"])
+                yield event.to_sse()
+        finally:
+            bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,63 @@
+# app/routers/stats.py
+
+from datetime import date
+from typing import List, Tuple
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from .. import crud, database, schemas
+from ..dependencies import date_range
+
+# Aggregate numbers for dashboards. Every endpoint reads the daily rollup
+# tables, so the cost depends on the number of days asked for, not on how
+# much content there is.
+router = APIRouter(
+    prefix="/stats",
+    tags=["Stats"],
+)
+
+
+@router.get("/content-per-day", response_model=List[schemas.DailyCount])
+def read_content_per_day(
+    days: Tuple[date, date] = Depends(date_range),
+    db: Session = Depends(database.get_db, scope="function"),
+):
+    """
+    How many content items were created on each day (UTC).
+
+    - This is a public endpoint.
+    - `start` / `end` (inclusive) default to the last 30 days; days without
+      content are included with a count of 0.
+    """
+    return [{"day": day, "count": count} for day, count in crud.get_daily_content_counts(db, *days)]
+
+
+@router.get("/content-per-tag", response_model=List[schemas.TagCount])
+def read_content_per_tag(
+    days: Tuple[date, date] = Depends(date_range),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(database.get_db, scope="function"),
+):
+    """
+    How many content items created in the date range have each tag, most
+    used tags first.
+
+    - This is a public endpoint.
+    """
+    counts = crud.get_tag_content_counts(db, *days, limit=limit)
+    return [{"id": tag.id, "name": tag.name, "count": count} for tag, count in counts]
+
+
+@router.get("/active-curators", response_model=List[schemas.DailyCount])
+def read_active_curators(
+    days: Tuple[date, date] = Depends(date_range),
+    db: Session = Depends(database.get_db, scope="function"),
+):
+    """
+    How many users created content on each day (UTC).
+
+    - This is a public endpoint.
+    - `start` / `end` (inclusive) default to the last 30 days.
+    """
+    return [{"day": day, "count": count} for day, count in crud.get_daily_active_curators(db, *days)]
@@ -1,10 +1,11 @@
 # app/routers/tags.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List
 
 from .. import crud, models, schemas, database, security
+from ..cache import entity_cache
 
 
 router = APIRouter(
@@ -13,10 +14,28 @@ router = APIRouter(
 )
 
 
+@router.get("/trending", response_model=List[schemas.TrendingTag])
+def read_trending_tags(
+    window: schemas.TrendingWindow = "24h",
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(database.get_db, scope="function")
+):
+    """
+    Lists the tags used on the most content created in the last hour, day or week.
+
+    - This is a public endpoint.
+    - `window` is `1h`, `24h` (default) or `7d`.
+    - Served from counters kept up to date as content is tagged, so it does
+      not scan the content table.
+    """
+    trending = crud.get_trending_tags(db, window_hours=crud.TRENDING_WINDOWS[window], limit=limit)
+    return [{"id": tag.id, "name": tag.name, "score": score} for tag, score in trending]
+
+
 @router.post("/{tag_id}/follow", response_model=schemas.User)
 def follow_a_tag(
     tag_id: int,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_db, scope="function"),
     current_user: models.User = Depends(security.get_current_active_user)
 ):
     """
@@ -37,36 +56,40 @@ def follow_a_tag(
 
 
 @router.post("/", response_model=schemas.Tag, status_code=status.HTTP_201_CREATED)
-def create_new_tag(tag: schemas.TagCreate, db: Session = Depends(database.get_db)):
+def create_new_tag(tag: schemas.TagCreate, db: Session = Depends(database.get_db, scope="function")):
     """
     Creates a new tag in the database.
 
     - Checks if a tag with the same name already exists to prevent duplicates.
     - This is a public endpoint.
     """
-    # First, check if a tag with this name already exists.
     # We are converting the incoming tag name to lowercase to standardize tags.
-    tag_name_lower = tag.name.lower()
-    db_tag = crud.get_tag_by_name(db, name=tag_name_lower)
-    
+    tag_to_create = schemas.TagCreate(name=tag.name.lower())
+
+    # With the entity cache enabled, repeated attempts to create an existing
+    # tag are answered from it, without touching the database. Without it,
+    # that check would be an extra query, so only the insert below runs.
+    db_tag = None
+    if entity_cache.max_size <= 0 or crud.get_tag_by_name(db, name=tag_to_create.name) is None:
+        # Try to create it. The unique index on the name decides whether it
+        # already exists, so concurrent requests can't both insert it.
+        db_tag = crud.create_tag(db=db, tag=tag_to_create)
+
     # If the tag already exists, we should not create a new one.
     # Instead of an error, we could also just return the existing tag.
     # For now, raising an error is clearer.
-    if db_tag:
+    if db_tag is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="Tag with this name already exists"
         )
-    
-    # If the tag doesn't exist, create it.
-    # Note: We are creating it with the standardized lowercase name.
-    tag_to_create = schemas.TagCreate(name=tag_name_lower)
-    return crud.create_tag(db=db, tag=tag_to_create)
+
+    return db_tag
 
 @router.delete("/{tag_id}/follow", response_model=schemas.User)
 def unfollow_a_tag(
     tag_id: int,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_db, scope="function"),
     current_user: models.User = Depends(security.get_current_active_user)
 ):
     """
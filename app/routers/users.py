@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from typing import List
 
 # Import from the parent directory ('..') to get access to our other files
 from .. import crud, models, schemas, database, security  # <--- MODIFIED
+from ..config import settings
+from ..dependencies import batch_ids
 
 # Create an instance of APIRouter.
 # This is like a mini-FastAPI app.
@@ -12,7 +15,7 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.User)
-def create_new_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+def create_new_user(user: schemas.UserCreate, db: Session = Depends(database.get_db, scope="function")):
     """
     Creates a new user. Checks if the email is already registered.
     """
@@ -22,6 +25,23 @@ def create_new_user(user: schemas.UserCreate, db: Session = Depends(database.get
     
     return crud.create_user(db=db, user=user)
 
+@router.get("", response_model=schemas.UserBatch)
+def read_user_batch(
+    ids: List[int] = Depends(batch_ids),
+    db: Session = Depends(database.get_db, scope="function")
+):
+    """
+    Retrieves the public profiles of several users at once: `GET /users?ids=3,1,2`.
+
+    - This is a public endpoint.
+    - Users are returned in the order requested; IDs that don't exist are
+      listed in `missing`.
+    - At most `MAX_BATCH_IDS` IDs per request.
+    """
+    users = crud.get_users_by_ids(db, ids)
+    found = {user.id for user in users}
+    return {"items": users, "missing": [user_id for user_id in ids if user_id not in found]}
+
 # --- ADDED THIS ENTIRE ENDPOINT ---
 @router.get("/me", response_model=schemas.User)
 def read_current_user(current_user: models.User = Depends(security.get_current_active_user)):
@@ -33,8 +53,40 @@ def read_current_user(current_user: models.User = Depends(security.get_current_a
     """
     return current_user
 
+@router.get("/me/suggested-tags", response_model=List[schemas.Tag])
+def read_suggested_tags(
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(database.get_db, scope="function"),
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    Suggests tags for the current user to follow, based on what users who
+    follow the same tags also follow.
+
+    - **Authentication**: Requires a valid JWT access token.
+    """
+    return crud.get_suggested_tags(db, user=current_user, limit=limit)
+
+@router.delete("/me/content", response_model=schemas.PurgeResult)
+def purge_current_user_content(
+    db: Session = Depends(database.get_db, scope="function"),
+    current_user: models.User = Depends(security.get_current_active_user)
+):
+    """
+    Deletes all of the current user's content, including archived items.
+
+    - **Authentication**: Requires a valid JWT access token.
+    - Items are deleted `DELETE_BATCH_SIZE` at a time, each batch in its own
+      transaction, so a large purge never holds locks for long. If it is
+      interrupted, calling it again deletes whatever is left.
+    """
+    deleted = database.run_in_batches(
+        db, crud.purge_user_content_batch, current_user.id, settings.DELETE_BATCH_SIZE
+    )
+    return {"deleted": deleted}
+
 @router.get("/{user_id}", response_model=schemas.User)
-def read_user_by_id(user_id: int, db: Session = Depends(database.get_db)):
+def read_user_by_id(user_id: int, db: Session = Depends(database.get_db, scope="function")):
     """
     Retrieves the public profile for a specific user by their ID.
 
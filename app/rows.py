@@ -0,0 +1,65 @@
+# app/rows.py
+"""
+Lightweight, read-only objects for content listings.
+
+Loading `models.Content` through the ORM gives every item instance state,
+an identity-map entry and a tracked `tags` collection, which a listing only
+reads once to build its response. The listing endpoints ask `crud` for these
+plain `__slots__` objects instead (the `as_rows=True` read path): they are
+built straight from Core rows, and the response models read them like ORM
+objects (`from_attributes`).
+
+They are snapshots: changing one changes nothing in the database.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+
+class TagRow:
+    """A tag of a `ContentRow`. Items of the same page share one object per tag."""
+
+    __slots__ = ("id", "name")
+
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+
+
+class ContentRow:
+    """One content item, with the same attributes as `models.Content` that `schemas.Content` reads."""
+
+    # The `content` columns loaded, in the order `__init__` takes them.
+    COLUMNS = (
+        "id", "title", "url", "description", "owner_id", "created_at",
+        "preview_title", "preview_description", "preview_image_url", "preview_site_name", "enriched_at",
+    )
+
+    __slots__ = COLUMNS + ("tags",)
+
+    def __init__(
+        self,
+        id: int,
+        title: str,
+        url: str,
+        description: Optional[str],
+        owner_id: int,
+        created_at: Optional[datetime],
+        preview_title: Optional[str] = None,
+        preview_description: Optional[str] = None,
+        preview_image_url: Optional[str] = None,
+        preview_site_name: Optional[str] = None,
+        enriched_at: Optional[datetime] = None,
+    ):
+        self.id = id
+        self.title = title
+        self.url = url
+        self.description = description
+        self.owner_id = owner_id
+        self.created_at = created_at
+        self.preview_title = preview_title
+        self.preview_description = preview_description
+        self.preview_image_url = preview_image_url
+        self.preview_site_name = preview_site_name
+        self.enriched_at = enriched_at
+        self.tags: List[TagRow] = []
@@ -1,7 +1,7 @@
 
 from pydantic import BaseModel, ConfigDict 
-from typing import List, Optional
-from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+from datetime import date, datetime
 
 
 class TagBase(BaseModel):
@@ -27,7 +27,17 @@ class Tag(TagBase):
 
     model_config = ConfigDict(from_attributes=True)
 
-class Content(ContentBase):
+class LinkPreview(BaseModel):
+    # Metadata of the page behind the URL, filled in by the server shortly
+    # after the item is saved (see `enrichment.py`). All None until then, and
+    # `enriched_at` is set even when the page had nothing to offer.
+    preview_title: Optional[str] = None
+    preview_description: Optional[str] = None
+    preview_image_url: Optional[str] = None
+    preview_site_name: Optional[str] = None
+    enriched_at: Optional[datetime] = None
+
+class Content(LinkPreview, ContentBase):
     id: int
     owner_id: int
     created_at: datetime
@@ -35,6 +45,52 @@ class Content(ContentBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+# How list endpoints shape their response:
+# - "full": every item embeds its tag objects (the default).
+# - "normalized": items reference tags by id, and each tag is sent once.
+ListShape = Literal["full", "normalized"]
+
+# Sort orders and tag matching modes of `GET /content/`.
+ContentSort = Literal["newest", "oldest"]
+TagMatch = Literal["any", "all"]
+
+# What `POST /content/` does when the user has already saved the URL.
+DuplicateMode = Literal["allow", "update", "reject"]
+
+class ContentRef(LinkPreview, ContentBase):
+    id: int
+    owner_id: int
+    created_at: datetime
+    tag_ids: List[int] = []
+
+class NormalizedContentList(BaseModel):
+    items: List[ContentRef]
+    tags: List[Tag]
+
+    @classmethod
+    def from_content(cls, items) -> "NormalizedContentList":
+        """Builds the normalized shape from a list of Content objects."""
+        tags = {}
+        refs = []
+        for item in items:
+            for tag in item.tags:
+                tags.setdefault(tag.id, tag)
+            refs.append(ContentRef(
+                id=item.id,
+                title=item.title,
+                url=item.url,
+                description=item.description,
+                owner_id=item.owner_id,
+                created_at=item.created_at,
+                preview_title=item.preview_title,
+                preview_description=item.preview_description,
+                preview_image_url=item.preview_image_url,
+                preview_site_name=item.preview_site_name,
+                enriched_at=item.enriched_at,
+                tag_ids=[tag.id for tag in item.tags],
+            ))
+        return cls(items=refs, tags=[Tag.model_validate(tag) for tag in tags.values()])
+
 class User(BaseModel):
     id: int
     email: str
@@ -45,9 +101,82 @@ class User(BaseModel):
  
     model_config = ConfigDict(from_attributes=True)
 
+# Time windows of `GET /tags/trending`.
+TrendingWindow = Literal["1h", "24h", "7d"]
+
+class TrendingTag(Tag):
+    # Number of items tagged in the window (older buckets that only partly
+    # overlap the window are counted pro rata, so this may be fractional).
+    score: float
+
+class ContentBatch(BaseModel):
+    items: List[Content]
+    # Requested IDs that don't exist.
+    missing: List[int] = []
+
+class UserBatch(BaseModel):
+    items: List[User]
+    missing: List[int] = []
+
+class ContentBulkDelete(BaseModel):
+    deleted: List[int]
+    # Requested IDs that don't exist.
+    missing: List[int] = []
+    # Requested IDs owned by someone else, which were not deleted.
+    forbidden: List[int] = []
+
+class PurgeResult(BaseModel):
+    # How many items (live and archived) were deleted.
+    deleted: int
+
+class DailyCount(BaseModel):
+    day: date
+    count: int
+
+class TagCount(Tag):
+    # How many content items in the date range have the tag.
+    count: int
+
+class BackfillStatus(BaseModel):
+    name: str
+    status: str
+    last_id: int
+    rows_done: int
+    started_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+    # Average speed since the backfill (re)started, pauses included.
+    rows_per_second: float
+
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 class TokenData(BaseModel):
-    email: str | None = None
\ No newline at end of file
+    email: str | None = None
+
+# Sub-requests of `POST /batch`.
+BatchMethod = Literal["GET", "POST", "PUT", "DELETE"]
+
+class BatchSubRequest(BaseModel):
+    # Echoed back in the matching response, to tell responses apart.
+    id: Optional[str] = None
+    method: BatchMethod = "GET"
+    # Path and query string, e.g. "/content/3" or "/feed?limit=20".
+    path: str
+    # JSON request body, if any.
+    body: Optional[Any] = None
+    headers: Dict[str, str] = {}
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+
+class BatchSubResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = {}
+    # The decoded JSON body (or the text of a non-JSON body).
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]
@@ -1,16 +1,27 @@
+import threading
+import time
+from collections import OrderedDict
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
-from typing import Optional
-from jose import jwt , JWTError
+from typing import Dict, List, Optional, Tuple
+from jose import jwk , jwt , JWTError
 from .config import settings
-from fastapi import Depends , HTTPException , status
+from fastapi import Depends , HTTPException , Request , status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from . import crud , database , schemas , models
+from .batching import BATCH_USER_EMAIL, batch_state
 
 # Create a CryptContext instance for password hashing
 # "bcrypt" is a secure and common choice
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# New hashes use `BCRYPT_ROUNDS`; `min_rounds` makes hashes with a lower cost
+# count as outdated, so `needs_rehash` flags them for an upgrade.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def get_password_hash(password: str) -> str:
     """
@@ -30,6 +41,150 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     return pwd_context.verify(plain_password, hashed_password)
 
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    Returns True if a stored hash was made with outdated settings (e.g. a
+    lower bcrypt cost than `BCRYPT_ROUNDS`) and should be replaced the next
+    time the plain password is known, i.e. at login.
+    """
+    return pwd_context.needs_update(hashed_password)
+
+class KeyRing:
+    """
+    The keys used to sign and verify access tokens.
+
+    Every token carries the id of the key that signed it in its `kid` header,
+    so keys can be rotated without logging everyone out: a new key becomes the
+    signing key, and the previous one stays in `verify_keys` until the tokens
+    it signed have expired.
+
+    With an asymmetric algorithm (RS256, ES256, ...) only the public halves are
+    needed for verification, so edge services can check tokens using the
+    public keys served at `/.well-known/jwks.json`, without the signing secret.
+    """
+
+    def __init__(self, algorithm: str, signing_kid: str, signing_key: str, verify_keys: Dict[str, str]):
+        self.algorithm = algorithm
+        self.signing_kid = signing_kid
+        self.signing_key = signing_key
+        # kid -> key used to verify tokens signed with that kid.
+        self.verify_keys = dict(verify_keys)
+        if signing_kid not in self.verify_keys:
+            self.verify_keys[signing_kid] = self._public_key(signing_key)
+
+    @property
+    def is_symmetric(self) -> bool:
+        return self.algorithm.startswith("HS")
+
+    def _public_key(self, key: str) -> str:
+        if self.is_symmetric:
+            return key
+        return jwk.construct(key, self.algorithm).public_key().to_pem().decode()
+
+    def sign(self, claims: dict) -> str:
+        return jwt.encode(
+            claims=claims,
+            key=self.signing_key,
+            algorithm=self.algorithm,
+            headers={"kid": self.signing_kid},
+        )
+
+    def verify(self, token: str) -> dict:
+        """
+        Verifies a token's signature and claims and returns its payload.
+
+        Raises:
+            JWTError: If the token is malformed, expired, or signed by an unknown key.
+        """
+        # Tokens issued before key ids were introduced have no `kid`;
+        # they were signed by the primary key.
+        kid = jwt.get_unverified_header(token).get("kid", self.signing_kid)
+        key = self.verify_keys.get(kid)
+        if key is None:
+            raise JWTError(f"Unknown key id {kid!r}")
+        return jwt.decode(token, key, algorithms=[self.algorithm])
+
+    def jwks(self) -> List[dict]:
+        """The public verification keys in JWK format (empty for HMAC keys)."""
+        if self.is_symmetric:
+            return []
+        keys = []
+        for kid, key in self.verify_keys.items():
+            public = jwk.construct(key, self.algorithm).to_dict()
+            keys.append({**public, "kid": kid, "use": "sig"})
+        return keys
+
+
+def _read_file(path: str) -> str:
+    with open(path, encoding="utf-8") as key_file:
+        return key_file.read()
+
+
+def load_key_ring() -> KeyRing:
+    """Builds the key ring from the settings."""
+    if settings.ALGORITHM.startswith("HS"):
+        return KeyRing(
+            algorithm=settings.ALGORITHM,
+            signing_kid=settings.JWT_KEY_ID,
+            signing_key=settings.SECRET_KEY,
+            verify_keys=settings.JWT_RETIRED_SECRET_KEYS,
+        )
+    if not settings.JWT_PRIVATE_KEY_FILE:
+        raise ValueError(f"JWT_PRIVATE_KEY_FILE is required for the {settings.ALGORITHM} algorithm")
+    return KeyRing(
+        algorithm=settings.ALGORITHM,
+        signing_kid=settings.JWT_KEY_ID,
+        signing_key=_read_file(settings.JWT_PRIVATE_KEY_FILE),
+        verify_keys={kid: _read_file(path) for kid, path in settings.JWT_PUBLIC_KEY_FILES.items()},
+    )
+
+
+key_ring = load_key_ring()
+
+
+class VerifiedTokenCache:
+    """
+    A small LRU of tokens whose signatures have already been checked.
+
+    Entries are keyed by the full token string (never by the signature alone,
+    which would let someone attach a valid signature to a different payload)
+    and are only trusted until the token's own `exp`.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return payload
+
+    def put(self, token: str, payload: dict) -> None:
+        if self.max_size <= 0 or "exp" not in payload:
+            return
+        with self._lock:
+            self._entries[token] = (payload, float(payload["exp"]))
+            self._entries.move_to_end(token)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(settings.TOKEN_VERIFY_CACHE_SIZE)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Creates a new JWT access token.
@@ -61,21 +216,39 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
 
     # Use the jose library to encode the payload into a JWT string.
-    # It takes the payload, our secret key, and the signing algorithm.
-    encoded_jwt = jwt.encode(
-        claims=to_encode, 
-        key=settings.SECRET_KEY, 
-        algorithm=settings.ALGORITHM
-    )
+    # The key ring signs it with the current signing key and stamps that
+    # key's id into the token header.
+    encoded_jwt = key_ring.sign(to_encode)
     
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> Optional[str]:
+    """
+    Verifies a JWT and returns its subject (the user's email).
+
+    Returns None if the token is invalid, expired, or has no 'sub' claim.
+    This does not touch the database, so it is cheap enough to call from
+    middleware (e.g. the rate limiter) as well as from `get_current_user`.
+    Tokens that were already verified are served from `verified_tokens`
+    until they expire, skipping the signature check.
+    """
+    payload = verified_tokens.get(token)
+    if payload is None:
+        try:
+            payload = key_ring.verify(token)
+        except JWTError:
+            return None
+        verified_tokens.put(token, payload)
+    return payload.get("sub")
+
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(database.get_db)
+    db: Session = Depends(database.get_db, scope="function")
 ) -> models.User:
     """
     Decodes a JWT token, validates it, and fetches the user from the database.
@@ -83,9 +256,12 @@ def get_current_user(
     This is a dependency function that will be injected into protected endpoints.
 
     Args:
+        request (Request): The current request. Sub-requests of a `POST /batch`
+                           carry the email the batch already verified the
+                           token for, so the token isn't verified again.
         token (str): The JWT from the 'Authorization: Bearer <token>' header.
                      This is injected automatically by `Depends(oauth2_scheme)`.
-        db (Session): The database session, injected by `Depends(database.get_db)`.
+        db (Session): The database session, injected by `Depends(database.get_db, scope="function")`.
 
     Returns:
         models.User: The authenticated SQLAlchemy user model.
@@ -99,18 +275,10 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-    except JWTError:
+    email = batch_state(request.scope).get(BATCH_USER_EMAIL) or decode_access_token(token)
+    if email is None:
         raise credentials_exception
+    token_data = schemas.TokenData(email=email)
 
     user = crud.get_user_by_email(db, email=token_data.email)
     if user is None:
@@ -125,4 +293,19 @@ def get_current_active_user(
     A dependency wrapper that gets the current user and can be extended
     to check if the user is active.
     """
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+def get_current_admin_user(
+    current_user: models.User = Depends(get_current_active_user)
+) -> models.User:
+    """
+    A dependency for admin-only endpoints: the current user's email must be
+    listed in `settings.ADMIN_EMAILS`.
+
+    Raises:
+        HTTPException 403: If the user is not an admin.
+    """
+    if current_user.email not in settings.ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
@@ -0,0 +1,80 @@
+# app/urls.py
+
+import hashlib
+from fnmatch import fnmatchcase
+from typing import Iterable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .config import settings
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking_param(name: str, patterns: Iterable[str]) -> bool:
+    name = name.lower()
+    return any(fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonicalizes a URL so that links to the same page compare equal.
+
+    - The scheme and host are lowercased, and the default port is dropped
+      (`HTTPS://Example.COM:443/` -> `https://example.com/`).
+    - The fragment is dropped (`#section` never reaches the server).
+    - Tracking parameters (`settings.URL_TRACKING_PARAMS`, e.g. `utm_*`) are
+      removed, and the remaining query parameters are sorted by name.
+    - An empty path becomes `/`, and other paths lose their trailing slash
+      (`/post/` -> `/post`).
+
+    The path and the values are otherwise kept as they are; they are
+    case-sensitive on most servers.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    host = (parts.hostname or "").rstrip(".")
+    if ":" in host:
+        # An IPv6 address; `hostname` strips its brackets.
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    params = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name, settings.URL_TRACKING_PARAMS)
+    ]
+    # A stable sort keeps the order of repeated parameters (`?a=2&a=1`).
+    params.sort(key=lambda param: param[0])
+
+    return urlunsplit((scheme, netloc, path, urlencode(params), ""))
+
+
+def url_fingerprint(url: str) -> str:
+    """
+    A fixed-width (32 hex characters) fingerprint of the normalized URL.
+
+    This is what `content.url_hash` stores and is indexed on. It is 128 bits
+    of SHA-256, so two different normalized URLs practically never collide.
+
+    A URL that can't be parsed (e.g. `http://[oops`) is fingerprinted as
+    written, without the surrounding whitespace: it only matches itself.
+    """
+    try:
+        normalized = normalize_url(url)
+    except ValueError:
+        normalized = url.strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
@@ -0,0 +1,265 @@
+# benchmarks/bench_memory_soak.py
+"""
+Memory soak test: drives a realistic request mix through the app for a long
+time and checks that memory use levels off.
+
+Requests run in-process (TestClient) against a seeded in-memory database.
+Every `--interval` seconds of the measured run, the harness records the
+process RSS and the memory traced by `tracemalloc`. After the run it reports:
+
+- memory over time, and the steady-state growth rate (a least-squares fit
+  of traced memory against requests served);
+- per endpoint, the memory still allocated after its requests returned
+  (objects that outlive a request, such as cache entries; a negative total
+  means the endpoint mostly frees what others left behind);
+- the call sites whose allocations grew the most during the run.
+
+Before measuring, `--warmup-requests` requests fill the bounded caches
+(the default is enough to fill the event history), so that they don't count
+as growth.
+
+It exits with status 1 if the steady-state growth is over `--max-growth-kb`
+per 1000 requests, so it can run in CI. Run from the project root:
+
+    SECRET_KEY=bench python -m benchmarks.bench_memory_soak --seconds 600
+    SECRET_KEY=bench python -m benchmarks.bench_memory_soak --seconds 60 --max-growth-kb 32
+
+RSS is read from /proc (Linux); elsewhere only the peak RSS is available.
+tracemalloc slows requests down several times and its own bookkeeping shows
+up in RSS, so compare RSS numbers between runs of this harness only.
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+# The soak measures memory, not password hashing, and sends far more
+# requests per client than any real rate limit allows.
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import database
+from app.main import app
+
+# Allocations made by the interpreter's import machinery and by tracemalloc
+# itself are noise for this report.
+IGNORED_FILES = ["<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", tracemalloc.__file__]
+
+
+def rss_bytes() -> int:
+    """The current resident set size of this process (the peak, where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS.
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def slope(points) -> float:
+    """The least-squares slope of y against x for a list of (x, y) points."""
+    count = len(points)
+    mean_x = sum(x for x, _ in points) / count
+    mean_y = sum(y for _, y in points) / count
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+class Workload:
+    """
+    The seeded data, and a weighted mix of requests against it.
+
+    The mix keeps the amount of data roughly constant (every item created is
+    deleted a little later), so any lasting growth comes from the process,
+    not from a growing database.
+    """
+
+    def __init__(self, client: TestClient, users: int, tags: int, items: int, seed: int):
+        self.client = client
+        self.rng = random.Random(seed)
+        self.headers = []
+        for number in range(users):
+            user = {"email": f"soak{number}@example.com", "password": "password123"}
+            client.post("/users/", json=user)
+            token = client.post("/token", data={"username": user["email"], "password": user["password"]}).json()
+            self.headers.append({"Authorization": f"Bearer {token['access_token']}"})
+        self.user_ids = [client.get("/users/me", headers=headers).json()["id"] for headers in self.headers]
+        self.tag_ids = [client.post("/tags/", json={"name": f"tag{number}"}).json()["id"] for number in range(tags)]
+        for headers in self.headers:
+            for tag_id in self.rng.sample(self.tag_ids, min(5, len(self.tag_ids))):
+                client.post(f"/tags/{tag_id}/follow", headers=headers)
+        # (content id, owner's headers) of every live item, oldest first.
+        self.items = []
+        for _ in range(items):
+            self.create_content()
+
+        self.mix = [
+            ("GET /users/me", 10, lambda: self.client.get("/users/me", headers=self.any_user())),
+            ("GET /users?ids=", 5, self.read_users),
+            ("GET /feed", 15, lambda: self.client.get("/feed?limit=50", headers=self.any_user())),
+            ("GET /content/", 10, lambda: self.client.get(f"/content/?limit=50&tag={self.rng.choice(self.tag_ids)}")),
+            ("GET /content/{id}", 20, lambda: self.client.get(f"/content/{self.any_item()}")),
+            ("GET /content?ids=", 5, self.read_content_batch),
+            ("GET /content/{id}/related", 5, lambda: self.client.get(f"/content/{self.any_item()}/related")),
+            ("GET /tags/trending", 5, lambda: self.client.get("/tags/trending?window=24h")),
+            ("POST /batch", 5, self.batch),
+            ("POST /content/ + 3 tags", 10, self.create_content),
+            ("DELETE /content/{id}", 10, self.delete_oldest),
+        ]
+        self.weights = [weight for _, weight, _ in self.mix]
+
+    def any_user(self) -> dict:
+        return self.rng.choice(self.headers)
+
+    def any_item(self) -> int:
+        return self.rng.choice(self.items)[0]
+
+    def read_users(self):
+        ids = ",".join(str(user_id) for user_id in self.rng.sample(self.user_ids, min(10, len(self.user_ids))))
+        return self.client.get(f"/users?ids={ids}")
+
+    def read_content_batch(self):
+        ids = ",".join(str(self.any_item()) for _ in range(20))
+        return self.client.get(f"/content?ids={ids}")
+
+    def batch(self):
+        requests = [{"path": "/users/me"}, {"path": "/feed?limit=20"}]
+        requests += [{"path": f"/content/{self.any_item()}"} for _ in range(3)]
+        return self.client.post("/batch", json={"requests": requests}, headers=self.any_user())
+
+    def create_content(self):
+        headers = self.any_user()
+        number = self.rng.randrange(10 ** 9)
+        response = self.client.post(
+            "/content/", json={"title": f"item {number}", "url": f"https://example.com/{number}"}, headers=headers
+        )
+        content_id = response.json()["id"]
+        for tag_id in self.rng.sample(self.tag_ids, min(3, len(self.tag_ids))):
+            self.client.post(f"/content/{content_id}/tags/{tag_id}", headers=headers)
+        self.items.append((content_id, headers))
+        return response
+
+    def delete_oldest(self):
+        content_id, headers = self.items.pop(0)
+        return self.client.delete(f"/content/{content_id}", headers=headers)
+
+    def step(self):
+        """Sends one request from the mix; returns (endpoint name, response)."""
+        name, _, send = self.rng.choices(self.mix, weights=self.weights)[0]
+        return name, send()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory soak test with allocation tracking per endpoint.")
+    parser.add_argument("--seconds", type=float, default=120.0, help="how long to measure, after the warm-up (default: 120)")
+    parser.add_argument("--warmup-requests", type=int, default=5000,
+                        help="requests sent before measuring, while caches fill up (default: 5000)")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between memory samples (default: 5)")
+    parser.add_argument("--max-growth-kb", type=float, default=64.0,
+                        help="fail above this steady-state growth, in KB per 1000 requests (default: 64)")
+    parser.add_argument("--frames", type=int, default=1, help="stack frames kept per allocation; more is slower (default: 1)")
+    parser.add_argument("--top", type=int, default=15, help="call sites to report (default: 15)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tags", type=int, default=30)
+    parser.add_argument("--items", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database.Base.metadata.create_all(bind=engine)
+    database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with TestClient(app) as client:
+        print(f"Seeding {args.users} users, {args.tags} tags, {args.items} items...")
+        workload = Workload(client, args.users, args.tags, args.items, args.seed)
+
+        # Bounded caches and histories (entity cache, event history, SQL
+        # compilation cache) grow until they are full; that isn't a leak.
+        # Tracing starts before they fill: tracemalloc never sees objects
+        # allocated earlier being freed, so a full ring buffer whose old
+        # entries are replaced during the run would look like growth.
+        tracemalloc.start(args.frames)
+        print(f"Warming up with {args.warmup_requests} requests...")
+        warmup_started = time.perf_counter()
+        for _ in range(args.warmup_requests):
+            name, response = workload.step()
+            if response.status_code >= 400:
+                raise SystemExit(f"{name} failed with {response.status_code}: {response.text}")
+        gc.collect()
+        print(f"Warm-up took {time.perf_counter() - warmup_started:.0f}s, RSS {rss_bytes() / 2**20:.1f} MB")
+
+        baseline = tracemalloc.take_snapshot()
+        samples = [(0, 0.0, rss_bytes(), tracemalloc.get_traced_memory()[0])]
+        # Net bytes still allocated after each endpoint's requests returned.
+        retained = defaultdict(int)
+        calls = defaultdict(int)
+        requests = 0
+        started = time.perf_counter()
+        next_sample = started + args.interval
+        print(f"Measuring for {args.seconds:.0f}s, sampling every {args.interval:.0f}s...")
+        print(f"{'seconds':>8}{'requests':>10}{'RSS MB':>10}{'traced MB':>11}")
+
+        while True:
+            now = time.perf_counter()
+            if now >= next_sample:
+                gc.collect()
+                sample = (requests, now - started, rss_bytes(), tracemalloc.get_traced_memory()[0])
+                samples.append(sample)
+                print(f"{sample[1]:>8.0f}{requests:>10}{sample[2] / 2**20:>10.1f}{sample[3] / 2**20:>11.2f}")
+                if now - started >= args.seconds:
+                    break
+                next_sample = now + args.interval
+
+            before = tracemalloc.get_traced_memory()[0]
+            name, response = workload.step()
+            if response.status_code >= 400:
+                raise SystemExit(f"{name} failed with {response.status_code}: {response.text}")
+            del response
+            retained[name] += tracemalloc.get_traced_memory()[0] - before
+            calls[name] += 1
+            requests += 1
+
+        gc.collect()
+        final = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    traced_growth = slope([(count, traced) for count, _, _, traced in samples]) * 1000 / 1024
+    rss_growth = slope([(count, rss) for count, _, rss, _ in samples]) * 1000 / 1024
+
+    print(f"\nSteady-state growth per 1000 requests: traced {traced_growth:.1f} KB, RSS {rss_growth:.1f} KB")
+
+    print(f"\n{'endpoint':<28}{'requests':>10}{'retained KB':>13}{'per request B':>15}")
+    for name, total in sorted(retained.items(), key=lambda item: -item[1]):
+        count = calls[name]
+        print(f"{name:<28}{count:>10}{total / 1024:>13.1f}{total / count:>15.0f}")
+
+    filters = [tracemalloc.Filter(False, filename) for filename in IGNORED_FILES]
+    stats = final.filter_traces(filters).compare_to(baseline.filter_traces(filters), "lineno")
+    print(f"\nTop {args.top} call sites by growth while measuring:")
+    for stat in stats[:args.top]:
+        frame = stat.traceback[0]
+        print(f"{stat.size_diff / 1024:>10.1f} KB {stat.count_diff:>+8} blocks  {frame.filename}:{frame.lineno}")
+
+    if traced_growth > args.max_growth_kb:
+        print(f"\nFAIL: memory grows {traced_growth:.1f} KB per 1000 requests (limit {args.max_growth_kb:.0f} KB)")
+        sys.exit(1)
+    print(f"\nOK: memory growth is within {args.max_growth_kb:.0f} KB per 1000 requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_query_count.py
+"""
+Counts the SQL statements and commits issued by each write endpoint.
+
+Every statement is a round trip to the database, so this is a quick way to
+check that a change does not add queries to the hot write paths.
+
+Run from the project root:
+
+    SECRET_KEY=bench python -m benchmarks.bench_query_count
+"""
+
+import os
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import database
+from app.main import app
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_statement)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_statement(self, *args):
+        self.statements += 1
+
+    def _on_commit(self, *args):
+        self.commits += 1
+
+    def measure(self, call):
+        self.statements = self.commits = 0
+        response = call()
+        assert response.status_code < 400, response.text
+        return response, self.statements, self.commits
+
+
+def main():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    database.Base.metadata.create_all(bind=engine)
+    database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    counter = QueryCounter(engine)
+    client = TestClient(app)
+
+    rows = []
+    user = {"email": "bench@example.com", "password": "password123"}
+    _, queries, commits = counter.measure(lambda: client.post("/users/", json=user))
+    rows.append(("POST /users/", queries, commits))
+
+    token = client.post("/token", data={"username": user["email"], "password": user["password"]}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+    content, queries, commits = counter.measure(
+        lambda: client.post("/content/", json={"title": "A", "url": "https://example.com"}, headers=headers)
+    )
+    rows.append(("POST /content/", queries, commits))
+    content_id = content.json()["id"]
+
+    tag, queries, commits = counter.measure(lambda: client.post("/tags/", json={"name": "python"}))
+    rows.append(("POST /tags/", queries, commits))
+    tag_id = tag.json()["id"]
+
+    _, queries, commits = counter.measure(
+        lambda: client.post(f"/content/{content_id}/tags/{tag_id}", headers=headers)
+    )
+    rows.append(("POST /content/{id}/tags/{id}", queries, commits))
+
+    _, queries, commits = counter.measure(
+        lambda: client.put(f"/content/{content_id}", json={"title": "B", "url": "https://example.com"}, headers=headers)
+    )
+    rows.append(("PUT /content/{id}", queries, commits))
+
+    _, queries, commits = counter.measure(lambda: client.post(f"/tags/{tag_id}/follow", headers=headers))
+    rows.append(("POST /tags/{id}/follow", queries, commits))
+
+    _, queries, commits = counter.measure(lambda: client.delete(f"/content/{content_id}", headers=headers))
+    rows.append(("DELETE /content/{id}", queries, commits))
+
+    print(f"{'endpoint':<32}{'statements':>12}{'commits':>10}")
+    for name, queries, commits in rows:
+        print(f"{name:<32}{queries:>12}{commits:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# benchmarks/bench_read_allocations.py
+"""
+Compares the memory allocated to serve one page of `/content/` and `/feed`
+through the ORM read path and through the row-object read path
+(`as_rows=True`, see `app/rows.py`), which the endpoints use.
+
+Each page is loaded with its crud function and serialized the way FastAPI
+serializes a response (the response model validates the items from their
+attributes, then dumps JSON). For each path it reports, per page:
+
+- live blocks / live KB: the allocations still held while the page and its
+  session are alive (ORM objects, their instance state and identity map
+  entries, row objects, the Pydantic models and the JSON body);
+- peak KB: the most memory in use at any moment while serving the page;
+- ms: the time per page, measured separately without tracing.
+
+Run from the project root:
+
+    SECRET_KEY=bench python -m benchmarks.bench_read_allocations
+    SECRET_KEY=bench python -m benchmarks.bench_read_allocations --items 20000 --limit 500
+"""
+
+import argparse
+import gc
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, database, models, schemas
+
+# How FastAPI turns a `response_model=List[schemas.Content]` return value into a body.
+RESPONSE = TypeAdapter(List[schemas.Content])
+
+
+def seed(engine, users: int, tags: int, items: int, seed: int) -> None:
+    """Fills the database with users, tagged content, and followed tags."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(models.User), [
+            {"id": number + 1, "email": f"bench{number}@example.com", "hashed_password": "x"} for number in range(users)
+        ])
+        connection.execute(insert(models.Tag), [{"id": number + 1, "name": f"tag{number}"} for number in range(tags)])
+        connection.execute(insert(models.Content), [
+            {
+                "id": number + 1,
+                "title": f"Item {number}",
+                "url": f"https://example.com/articles/{number}",
+                "description": "A short description of the item. " * 3,
+                "owner_id": number % users + 1,
+                "created_at": start + timedelta(minutes=number),
+            }
+            for number in range(items)
+        ])
+        connection.execute(insert(models.content_tags_association), [
+            {"content_id": number + 1, "tag_id": tag_id}
+            for number in range(items)
+            for tag_id in rng.sample(range(1, tags + 1), 3)
+        ])
+        connection.execute(insert(models.user_followed_tags_association), [
+            {"user_id": user_id, "tag_id": tag_id}
+            for user_id in range(1, users + 1)
+            for tag_id in rng.sample(range(1, tags + 1), 5)
+        ])
+
+
+def serve_page(db, endpoint: str, limit: int, as_rows: bool):
+    """Loads and serializes one page; returns everything the response holds on to."""
+    if endpoint == "/feed":
+        items = crud.get_user_feed(db, db.get(models.User, 1), limit=limit, as_rows=as_rows)
+    else:
+        items, _ = crud.search_content(db, limit=limit, as_rows=as_rows)
+    assert len(items) == limit, f"only {len(items)} items for {endpoint}; seed more data"
+    validated = RESPONSE.validate_python(items, from_attributes=True)
+    return items, validated, RESPONSE.dump_json(validated)
+
+
+def measure(Session, endpoint: str, limit: int, as_rows: bool, repeat: int) -> dict:
+    """Medians over `repeat` pages of the live and peak allocations, and of the time per page."""
+    # Warm up: compile and cache the SQL, build the validators.
+    db = Session()
+    serve_page(db, endpoint, limit, as_rows)
+    db.close()
+
+    live_blocks, live_bytes, peaks = [], [], []
+    tracemalloc.start()
+    for _ in range(repeat):
+        db = Session()
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        start_size = tracemalloc.get_traced_memory()[0]
+        page = serve_page(db, endpoint, limit, as_rows)
+        peaks.append(tracemalloc.get_traced_memory()[1] - start_size)
+        gc.collect()
+        stats = tracemalloc.take_snapshot().compare_to(before, "filename")
+        live_blocks.append(sum(stat.count_diff for stat in stats))
+        live_bytes.append(sum(stat.size_diff for stat in stats))
+        del page
+        db.close()
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat * 5):
+        db = Session()
+        started = time.perf_counter()
+        serve_page(db, endpoint, limit, as_rows)
+        times.append(time.perf_counter() - started)
+        db.close()
+
+    return {
+        "blocks": statistics.median(live_blocks),
+        "live_kb": statistics.median(live_bytes) / 1024,
+        "peak_kb": statistics.median(peaks) / 1024,
+        "ms": statistics.median(times) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocations per page: ORM objects vs. row objects.")
+    parser.add_argument("--limit", type=int, default=100, help="items per page (default: 100)")
+    parser.add_argument("--repeat", type=int, default=10, help="pages measured per path (default: 10)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tags", type=int, default=30)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database.Base.metadata.create_all(bind=engine)
+    seed(engine, args.users, args.tags, args.items, args.seed)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    print(f"Pages of {args.limit} items, median of {args.repeat} pages per path\n")
+    print(f"{'page':<22}{'live blocks':>12}{'live KB':>10}{'peak KB':>10}{'ms':>8}")
+    for endpoint in ["/content/", "/feed"]:
+        results = {}
+        for path, as_rows in [("ORM", False), ("rows", True)]:
+            result = results[path] = measure(Session, endpoint, args.limit, as_rows, args.repeat)
+            name = f"{endpoint} {path}"
+            print(
+                f"{name:<22}{result['blocks']:>12.0f}{result['live_kb']:>10.1f}"
+                f"{result['peak_kb']:>10.1f}{result['ms']:>8.2f}"
+            )
+        orm, rows = results["ORM"], results["rows"]
+        print(
+            f"{'  rows / ORM':<22}{rows['blocks'] / orm['blocks']:>12.2f}{rows['live_kb'] / orm['live_kb']:>10.2f}"
+            f"{rows['peak_kb'] / orm['peak_kb']:>10.2f}{rows['ms'] / orm['ms']:>8.2f}\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
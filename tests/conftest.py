@@ -0,0 +1,144 @@
+# tests/conftest.py
+
+import os
+
+# The settings object requires a SECRET_KEY; provide one for the test run
+# before any application module is imported.
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.main import app
+from app.batching import BATCH_SESSION, batch_state
+from app.database import Base, get_db
+from app import cache, idempotency, profiling, ratelimit, security
+from app.enrichment import enricher
+from app.events import bus
+from app.graph import feed_graph
+from app.related import related_index
+
+# --- Test Database Setup ---
+# An in-memory SQLite database, one per pytest-xdist worker (`pytest -n auto`),
+# so workers never share state. Every session uses the same single connection
+# (StaticPool); the schema is created on it once, when this module is imported.
+WORKER = os.environ.get("PYTEST_XDIST_WORKER", "main")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///file:test_{WORKER}?mode=memory&cache=shared&uri=true"
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+
+
+# pysqlite starts transactions on its own, which breaks SAVEPOINTs. Let
+# SQLAlchemy emit BEGIN itself instead.
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _emit_begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
+Base.metadata.create_all(bind=engine)
+
+# bcrypt is deliberately slow; at its default cost, hashing passwords would
+# take most of the suite's time. The minimum cost is plenty for tests.
+security.pwd_context.update(bcrypt__rounds=4, bcrypt__min_rounds=4)
+
+# Bound to the current test's connection by the `test_db` fixture.
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# --- Dependency Override ---
+def override_get_db(request: Request):
+    # Mirrors `database.get_db`: one commit per request, rollback on errors,
+    # and batch sub-requests reuse the batch's session.
+    shared = batch_state(request.scope).get(BATCH_SESSION)
+    db = shared or TestingSessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if shared is None:
+            db.close()
+app.dependency_overrides[get_db] = override_get_db
+
+
+def reset_in_memory_state():
+    """Clears process-wide caches so state never leaks between tests."""
+    idempotency.store.clear()
+    ratelimit.limiter.store.clear()
+    feed_graph.clear()
+    related_index.clear()
+    bus.backend.clear()
+    security.verified_tokens.clear()
+    profiling.profiles.clear()
+    cache.entity_cache.clear()
+    enricher.cache.clear()
+    enricher.stats.clear()
+
+
+@pytest.fixture(scope="function")
+def test_db():
+    """
+    Runs the test inside a database transaction that is rolled back afterwards.
+
+    Sessions made during the test join that transaction through a SAVEPOINT,
+    so their commits (one per request) are real as far as the test can tell,
+    but nothing outlives the test. This is much faster than creating and
+    dropping the tables around every test.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    TestingSessionLocal.configure(bind=connection, join_transaction_mode="create_savepoint")
+    reset_in_memory_state()
+    try:
+        # Yield control to the test function.
+        yield
+    finally:
+        transaction.rollback()
+        connection.close()
+        TestingSessionLocal.configure(bind=engine, join_transaction_mode="conservative_savepoint")
+        reset_in_memory_state()
+
+
+@pytest.fixture
+def client():
+    """A TestClient bound to the application."""
+    return TestClient(app)
+
+
+def create_user_and_login(client, email="curator@example.com", password="password123"):
+    """Registers a user, logs in, and returns the Authorization header for them."""
+    response = client.post("/users/", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    response = client.post("/token", data={"username": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def create_tagged_content(client, headers, title, tag_ids=(), url=None, description=None):
+    """Creates a content item (at `https://example.com/<title>` by default), tags it, and returns its id."""
+    item = {"title": title, "url": url or f"https://example.com/{title}", "description": description}
+    response = client.post("/content/", json=item, headers=headers)
+    assert response.status_code == 201, response.text
+    content_id = response.json()["id"]
+    for tag_id in tag_ids:
+        client.post(f"/content/{content_id}/tags/{tag_id}", headers=headers)
+    return content_id
+
+
+@pytest.fixture
+def auth_headers(client, test_db):
+    """Authorization headers for a freshly registered user."""
+    return create_user_and_login(client)
@@ -0,0 +1,112 @@
+# tests/factories.py
+#
+# Helpers that create many rows quickly, for tests that need realistic data
+# volumes (pagination, feeds, performance checks).
+#
+# Each helper writes its rows with one executemany INSERT instead of one ORM
+# object at a time, and all users share a single pre-computed password hash,
+# so tens of thousands of rows take well under a second. The rows are only
+# flushed: inside the `test_db` fixture they disappear with the test.
+#
+# The helpers bypass `crud`, so in-memory structures (feed graph, related
+# index) don't see these rows until they are (re)built from the database.
+
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app import models, security
+from app.urls import url_fingerprint
+
+DEFAULT_PASSWORD = "password123"
+_password_hash: Optional[str] = None
+
+
+def password_hash() -> str:
+    """The hash of DEFAULT_PASSWORD, computed once per test run."""
+    global _password_hash
+    if _password_hash is None:
+        _password_hash = security.get_password_hash(DEFAULT_PASSWORD)
+    return _password_hash
+
+
+def _insert(db: Session, table, rows: List[dict]) -> List[int]:
+    """Inserts `rows` into `table` and returns the new ids, in the same order."""
+    if not rows:
+        return []
+    statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    return list(db.execute(statement, rows).scalars())
+
+
+def make_users(db: Session, count: int, prefix: str = "user") -> List[int]:
+    """Creates `count` users (`<prefix><n>@example.com`, password DEFAULT_PASSWORD)."""
+    rows = [
+        {"email": f"{prefix}{number}@example.com", "hashed_password": password_hash()}
+        for number in range(count)
+    ]
+    return _insert(db, models.User.__table__, rows)
+
+
+def make_tags(db: Session, count: int, prefix: str = "tag") -> List[int]:
+    """Creates `count` tags named `<prefix><n>`."""
+    return _insert(db, models.Tag.__table__, [{"name": f"{prefix}{number}"} for number in range(count)])
+
+
+def make_content(
+    db: Session,
+    owner_ids: List[int],
+    count: int,
+    start: Optional[datetime] = None,
+    step: timedelta = timedelta(seconds=1),
+    urls: Optional[List[str]] = None,
+) -> List[int]:
+    """
+    Creates `count` content items, owned by `owner_ids` in turn.
+
+    Item n is created at `start + n * step`, so newer items have larger ids
+    and every ordering by creation time is unambiguous. It links to
+    `urls[n]` if given, and to `https://example.com/<n>` otherwise.
+    """
+    start = start or datetime(2024, 1, 1)
+    urls = urls or [f"https://example.com/{number}" for number in range(count)]
+    rows = [
+        {
+            "title": f"item-{number}",
+            "url": urls[number],
+            "url_hash": url_fingerprint(urls[number]),
+            "owner_id": owner_ids[number % len(owner_ids)],
+            "created_at": start + number * step,
+        }
+        for number in range(count)
+    ]
+    return _insert(db, models.Content.__table__, rows)
+
+
+def tag_content(db: Session, content_ids: List[int], tag_ids: List[int], per_item: int = 3, seed: int = 0) -> None:
+    """Gives every content item `per_item` distinct random tags (reproducible via `seed`)."""
+    rng = random.Random(seed)
+    rows = [
+        {"content_id": content_id, "tag_id": tag_id}
+        for content_id in content_ids
+        for tag_id in rng.sample(tag_ids, min(per_item, len(tag_ids)))
+    ]
+    db.execute(insert(models.content_tags_association), rows)
+
+
+def follow_tags(db: Session, user_ids: List[int], tag_ids: List[int], per_user: int = 5, seed: int = 0) -> None:
+    """
+    Makes every user follow `per_user` distinct random tags.
+
+    Only the follow links are written; run `crud.rebuild_tag_co_follows`
+    afterwards if a test needs tag suggestions.
+    """
+    rng = random.Random(seed)
+    rows = [
+        {"user_id": user_id, "tag_id": tag_id}
+        for user_id in user_ids
+        for tag_id in rng.sample(tag_ids, min(per_user, len(tag_ids)))
+    ]
+    db.execute(insert(models.user_followed_tags_association), rows)
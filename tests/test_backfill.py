@@ -0,0 +1,123 @@
+# tests/test_backfill.py
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.backfill import BACKFILLS, Backfill, BackfillConflict, BackfillRunner, checkpoints
+from app.config import settings
+from app.database import Base, make_engine
+from app.urls import url_fingerprint
+from tests import factories
+from tests.conftest import TestingSessionLocal
+
+content = models.Content.__table__
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A separate database (the runner commits every batch) holding 250 items without url_hash."""
+    engine = make_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        owners = factories.make_users(db, 2)
+        factories.make_content(db, owners, 250)
+        db.execute(update(content).values(url_hash=None))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+def missing_hashes(engine):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(content).where(content.c.url_hash.is_(None))).scalar_one()
+
+
+def checkpoint(engine, name="content_url_hash"):
+    with engine.connect() as connection:
+        return connection.execute(select(checkpoints).where(checkpoints.c.name == name)).one()
+
+
+def test_runs_in_batches_and_resumes(engine):
+    reports = []
+    runner = BackfillRunner(engine, batch_size=100, report=reports.append)
+
+    progress = runner.run(BACKFILLS["content_url_hash"], max_batches=2)
+    assert (progress.rows_done, progress.rows_total, progress.finished) == (200, 250, False)
+    assert missing_hashes(engine) == 50
+    assert checkpoint(engine).last_id == 200
+
+    # A new run picks up after the checkpoint.
+    progress = runner.run(BACKFILLS["content_url_hash"])
+    assert (progress.rows_done, progress.rows_total, progress.finished) == (50, 50, True)
+    assert missing_hashes(engine) == 0
+    row = checkpoint(engine)
+    assert (row.status, row.rows_done, row.last_id) == ("done", 250, 250)
+    assert "done, 50/50 rows" in str(reports[-1])
+
+    with engine.connect() as connection:
+        url, url_hash = connection.execute(select(content.c.url, content.c.url_hash).limit(1)).one()
+    assert url_hash == url_fingerprint(url)
+
+
+def test_a_failed_batch_is_rolled_back_with_its_checkpoint(engine):
+    seen = []
+    crashed = []
+
+    def process(connection, rows):
+        seen.extend(row.id for row in rows)
+        connection.execute(update(content).where(content.c.id.in_([row.id for row in rows])).values(url_hash="x"))
+        if len(seen) == 150 and not crashed:
+            crashed.append(True)
+            raise RuntimeError("worker crashed")
+
+    backfill = Backfill("mark", content, ["url"], process)
+    runner = BackfillRunner(engine, batch_size=75, report=lambda progress: None)
+    with pytest.raises(RuntimeError):
+        runner.run(backfill)
+    assert checkpoint(engine, "mark").last_id == 75
+    assert missing_hashes(engine) == 175
+
+    seen.clear()
+    runner.run(backfill)
+    assert seen[0] == 76 and missing_hashes(engine) == 0
+
+
+def test_throttling(engine):
+    pauses = []
+    runner = BackfillRunner(
+        engine, batch_size=100, max_rows_per_second=1000, report=lambda progress: None, sleep=pauses.append
+    )
+    runner.run(BACKFILLS["content_url_hash"])
+    # Three batches of at most 100 rows, each spaced out to ~0.1s.
+    assert len(pauses) == 3 and all(0 < pause <= 0.1 for pause in pauses)
+
+
+def test_concurrent_runner_is_detected(engine):
+    def process(connection, rows):
+        # Someone else moves the checkpoint while this batch runs.
+        with engine.begin() as other:
+            other.execute(update(checkpoints).values(last_id=999))
+
+    runner = BackfillRunner(engine, batch_size=100, report=lambda progress: None)
+    with pytest.raises(BackfillConflict):
+        runner.run(Backfill("contended", content, ["url"], process))
+
+
+def test_admin_endpoint_reports_progress(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", ["curator@example.com"])
+    db = TestingSessionLocal()
+    try:
+        db.add(models.BackfillCheckpoint(
+            name="content_url_hash", last_id=500, rows_done=500, status="running",
+            started_at=datetime(2024, 1, 1, 0, 0, 0), updated_at=datetime(2024, 1, 1, 0, 0, 10),
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    [status] = client.get("/admin/backfills", headers=auth_headers).json()
+    assert (status["name"], status["rows_done"], status["rows_per_second"]) == ("content_url_hash", 500, 50.0)
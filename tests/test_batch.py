@@ -0,0 +1,37 @@
+# tests/test_batch.py
+
+from app.config import settings
+
+
+def test_content_batch_preserves_order_and_reports_missing(client, auth_headers):
+    ids = [
+        client.post("/content/", json={"title": title, "url": f"https://example.com/{title}"}, headers=auth_headers).json()["id"]
+        for title in ["one", "two", "three"]
+    ]
+    tag = client.post("/tags/", json={"name": "python"}).json()["id"]
+    client.post(f"/content/{ids[1]}/tags/{tag}", headers=auth_headers)
+
+    response = client.get(f"/content?ids={ids[2]},999,{ids[1]},{ids[2]},{ids[0]}")
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["title"] for item in body["items"]] == ["three", "two", "one"]
+    assert body["items"][1]["tags"] == [{"id": tag, "name": "python"}]
+    assert body["missing"] == [999]
+
+
+def test_user_batch(client, auth_headers):
+    other = client.post("/users/", json={"email": "other@example.com", "password": "secret"}).json()["id"]
+
+    body = client.get(f"/users?ids={other},1,42").json()
+
+    assert [user["email"] for user in body["items"]] == ["other@example.com", "curator@example.com"]
+    assert body["missing"] == [42]
+
+
+def test_batch_rejects_bad_and_oversized_requests(client, test_db, monkeypatch):
+    assert client.get("/content?ids=1,abc").status_code == 422
+    assert client.get("/content?ids=").status_code == 422
+
+    monkeypatch.setattr(settings, "MAX_BATCH_IDS", 2)
+    assert client.get("/users?ids=1,2,3").status_code == 422
+    assert client.get("/users?ids=1,2,2,1").status_code == 200
@@ -0,0 +1,128 @@
+# tests/test_batch_requests.py
+
+import threading
+import time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.config import settings
+from app.database import Base, get_db, make_engine
+from app.main import app
+from tests.conftest import create_user_and_login, override_get_db
+
+
+@pytest.fixture(autouse=True)
+def one_at_a_time(monkeypatch):
+    # The test database is one shared connection, with a SAVEPOINT per session;
+    # sessions interleaving on it would release each other's savepoints.
+    monkeypatch.setattr(settings, "BATCH_CONCURRENCY", 1)
+
+
+def test_batch_runs_calls_in_order_as_the_user(client, auth_headers):
+    other_headers = create_user_and_login(client, "other@example.com")
+    theirs = client.post("/content/", json={"title": "theirs", "url": "https://example.com/t"}, headers=other_headers).json()
+
+    response = client.post("/batch", headers=auth_headers, json={"requests": [
+        {"id": "me", "path": "/users/me"},
+        {"id": "new", "method": "POST", "path": "/content/", "body": {"title": "mine", "url": "https://example.com/m"}},
+        {"id": "forbidden", "method": "DELETE", "path": f"/content/{theirs['id']}"},
+        {"id": "list", "path": "/content/?sort=oldest"},
+        {"id": "missing", "path": "/content/999999"},
+    ]})
+    assert response.status_code == 200
+    responses = {sub["id"]: sub for sub in response.json()["responses"]}
+    assert [sub["id"] for sub in response.json()["responses"]] == ["me", "new", "forbidden", "list", "missing"]
+
+    assert responses["me"]["status"] == 200 and responses["me"]["body"]["email"] == "curator@example.com"
+    assert responses["new"]["status"] == 201
+    assert responses["forbidden"]["status"] == 403
+    # Reads after a write see it, and one failing call doesn't undo the others.
+    assert [item["title"] for item in responses["list"]["body"]] == ["theirs", "mine"]
+    assert responses["missing"]["status"] == 404 and responses["missing"]["body"] == {"detail": "Content not found"}
+    # Each call counts towards its own route's rate limit.
+    assert "x-ratelimit-remaining" in responses["missing"]["headers"]
+    assert client.get(f"/content/{responses['new']['body']['id']}").status_code == 200
+
+
+def test_an_unhandled_error_fails_only_its_sub_request(client, auth_headers, monkeypatch):
+    def broken_get_content_by_id(db, content_id):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(crud, "get_content_by_id", broken_get_content_by_id)
+    response = client.post("/batch", headers=auth_headers, json={"requests": [
+        {"path": "/"},
+        {"method": "POST", "path": "/content/", "body": {"title": "kept", "url": "https://example.com/k"}},
+        {"path": "/content/1"},
+        {"path": "/content/?sort=oldest"},
+    ]})
+
+    assert response.status_code == 200
+    responses = response.json()["responses"]
+    assert [sub["status"] for sub in responses] == [200, 201, 500, 200]
+    assert responses[2]["body"] == {"detail": "Internal Server Error"}
+    assert [item["title"] for item in responses[3]["body"]] == ["kept"]
+
+
+def test_batch_authentication(client, auth_headers):
+    anonymous = client.post("/batch", json={"requests": [{"path": "/users/me"}, {"path": "/content/"}]}).json()
+    assert [sub["status"] for sub in anonymous["responses"]] == [401, 200]
+
+    bad_token = client.post("/batch", headers={"Authorization": "Bearer nope"}, json={"requests": [{"path": "/content/"}]})
+    assert bad_token.status_code == 401
+
+
+def test_batch_limits(client, auth_headers, monkeypatch):
+    nested = client.post("/batch", json={"requests": [{"method": "POST", "path": "/batch", "body": {"requests": []}}]}).json()
+    assert nested["responses"][0]["status"] == 400
+
+    monkeypatch.setattr(settings, "MAX_BATCH_REQUESTS", 2)
+    too_many = client.post("/batch", json={"requests": [{"path": "/"}] * 3})
+    assert too_many.status_code == 422
+    assert client.post("/batch", json={"requests": [{"path": "users/me"}]}).status_code == 422
+
+
+def test_consecutive_reads_run_concurrently(client, tmp_path, monkeypatch):
+    engine = make_engine(f"sqlite:///{tmp_path / 'batch.db'}")
+    Base.metadata.create_all(bind=engine)
+    FileSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_file_get_db():
+        db = FileSessionLocal()
+        try:
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    in_flight = peak = 0
+    lock = threading.Lock()
+    get_content_by_id = crud.get_content_by_id
+
+    def slow_get_content_by_id(db, content_id):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        return get_content_by_id(db, content_id)
+
+    monkeypatch.setattr(settings, "BATCH_CONCURRENCY", 4)
+    monkeypatch.setattr(crud, "get_content_by_id", slow_get_content_by_id)
+    app.dependency_overrides[get_db] = override_file_get_db
+    try:
+        headers = create_user_and_login(client, "reader@example.com")
+        ids = [
+            client.post("/content/", json={"title": f"item-{n}", "url": f"https://example.com/{n}"}, headers=headers).json()["id"]
+            for n in range(8)
+        ]
+        response = client.post("/batch", headers=headers, json={"requests": [{"path": f"/content/{i}"} for i in ids]})
+    finally:
+        app.dependency_overrides[get_db] = override_get_db
+        engine.dispose()
+
+    assert [sub["body"]["id"] for sub in response.json()["responses"]] == ids
+    assert 1 < peak <= 4
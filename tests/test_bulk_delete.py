@@ -0,0 +1,92 @@
+# tests/test_bulk_delete.py
+
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app import crud, models
+from app.config import settings
+from app.database import run_in_batches
+from tests.conftest import TestingSessionLocal, create_tagged_content, create_user_and_login
+from tests.factories import make_content, make_tags, make_users, tag_content
+
+
+def _count(db, table, *where):
+    return db.scalar(select(func.count()).select_from(table).where(*where))
+
+
+def test_batch_delete_only_deletes_own_items(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "DELETE_BATCH_SIZE", 2)
+    other_headers = create_user_and_login(client, "other@example.com")
+    tag_id = client.post("/tags/", json={"name": "python"}, headers=auth_headers).json()["id"]
+    mine = [create_tagged_content(client, auth_headers, f"mine-{n}", [tag_id]) for n in range(3)]
+    theirs = create_tagged_content(client, other_headers, "theirs", [tag_id])
+
+    ids = ",".join(str(content_id) for content_id in [*mine, theirs, 999999])
+    response = client.delete("/content", params={"ids": ids}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {"deleted": mine, "missing": [999999], "forbidden": [theirs]}
+
+    db = TestingSessionLocal()
+    links = models.content_tags_association
+    assert _count(db, models.Content.__table__) == 1
+    assert _count(db, links) == 1
+    # Deleted items no longer count towards trending tags.
+    assert db.scalar(select(func.sum(models.TagActivity.count))) == 1
+    db.close()
+    assert client.get(f"/content/{theirs}").status_code == 200
+
+
+def test_batch_delete_requires_authentication(client, test_db):
+    assert client.delete("/content", params={"ids": "1"}).status_code == 401
+
+
+def test_purge_deletes_live_and_archived_items(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "DELETE_BATCH_SIZE", 4)
+    me = client.get("/users/me", headers=auth_headers).json()["id"]
+    db = TestingSessionLocal()
+    (other,) = make_users(db, 1, prefix="other")
+    tags = make_tags(db, 5)
+    old = make_content(db, [me, other], 10, start=datetime(2020, 1, 1))
+    tag_content(db, old, tags, per_item=2)
+    db.commit()
+    assert run_in_batches(db, crud.archive_content_batch, datetime(2021, 1, 1), 3) == 10
+    make_content(db, [me, other], 10, start=datetime.now() - timedelta(hours=1))
+    db.commit()
+    db.close()
+
+    response = client.delete("/users/me/content", headers=auth_headers)
+    assert response.json() == {"deleted": 10}
+
+    db = TestingSessionLocal()
+    assert _count(db, models.Content.__table__, models.Content.owner_id == me) == 0
+    assert _count(db, models.ArchivedContent.__table__, models.ArchivedContent.owner_id == me) == 0
+    assert _count(db, models.Content.__table__) == 5
+    assert _count(db, models.ArchivedContent.__table__) == 5
+    db.close()
+    assert client.delete("/users/me/content", headers=auth_headers).json() == {"deleted": 0}
+
+
+def test_archive_moves_old_items_with_their_tags(test_db):
+    db = TestingSessionLocal()
+    users = make_users(db, 2)
+    tags = make_tags(db, 4)
+    content_ids = make_content(db, users, 25, start=datetime(2020, 1, 1), step=timedelta(days=1))
+    tag_content(db, content_ids, tags, per_item=2)
+    links = models.content_tags_association
+    expected_tags = {
+        content_id: sorted(db.scalars(select(links.c.tag_id).where(links.c.content_id == content_id)))
+        for content_id in content_ids[:20]
+    }
+
+    archived = run_in_batches(db, crud.archive_content_batch, datetime(2020, 1, 21), 7)
+
+    assert archived == 20
+    assert list(db.scalars(select(models.Content.id).order_by(models.Content.id))) == content_ids[20:]
+    assert _count(db, links) == 10
+    rows = db.execute(select(models.ArchivedContent).order_by(models.ArchivedContent.id)).scalars().all()
+    assert [row.id for row in rows] == content_ids[:20]
+    assert {row.id: json.loads(row.tag_ids) for row in rows} == expected_tags
+    assert rows[0].title == "item-0" and rows[0].owner_id == users[0] and rows[0].archived_at is not None
+    db.close()
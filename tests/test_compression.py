@@ -0,0 +1,74 @@
+# tests/test_compression.py
+
+import asyncio
+
+from app.compression import CompressionMiddleware, choose_encoding, level_for
+from tests.conftest import create_tagged_content
+
+
+def create_tagged_items(client, headers, count):
+    tag = client.post("/tags/", json={"name": "python"}).json()
+    for i in range(count):
+        create_tagged_content(
+            client, headers, f"Item {i}", [tag["id"]], url=f"https://example.com/{i}", description="x" * 40
+        )
+    return tag
+
+
+def test_large_json_responses_are_gzipped(client, auth_headers):
+    create_tagged_items(client, auth_headers, 10)
+
+    response = client.get("/content/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert len(response.json()) == 10
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+
+
+def test_normalized_shape_sends_each_tag_once(client, auth_headers):
+    tag = create_tagged_items(client, auth_headers, 3)
+
+    data = client.get("/content/?shape=normalized").json()
+
+    assert data["tags"] == [tag]
+    assert [item["tag_ids"] for item in data["items"]] == [[tag["id"]]] * 3
+    assert "tags" not in data["items"][0]
+
+
+def test_encoding_negotiation():
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("deflate, gzip")[0] == "gzip"
+    assert choose_encoding("identity") is None
+
+
+def test_level_for_uses_longest_prefix():
+    levels = {"text/": 3, "text/html": 7}
+
+    assert level_for("text/html; charset=utf-8", levels) == 7
+    assert level_for("text/csv", levels) == 3
+    assert level_for("image/png", levels) is None
+    assert level_for("text/event-stream", levels) is None
+
+
+def test_uncompressed_responses_send_their_headers_right_away():
+    events = []
+
+    async def stream_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        # An event stream's first event can be a heartbeat interval away.
+        events.append("waiting for the first event")
+        await send({"type": "http.response.body", "body": b"data: x\n\n", "more_body": True})
+
+    async def send(message):
+        events.append(message["type"])
+
+    middleware = CompressionMiddleware(stream_app, minimum_size=0, levels={"text/": 6})
+    asyncio.run(middleware({"type": "http", "headers": [(b"accept-encoding", b"gzip")]}, None, send))
+
+    assert events == ["http.response.start", "waiting for the first event", "http.response.body"]
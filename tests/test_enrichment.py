@@ -0,0 +1,270 @@
+# tests/test_enrichment.py
+
+import asyncio
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, models
+from app.config import settings
+from app.enrichment import EnrichmentPipeline, enricher, parse_metadata
+from app.main import app
+from tests import factories
+from tests.conftest import TestingSessionLocal
+
+ARTICLE = b"""<!doctype html>
+<html><head>
+<title>Plain title</title>
+<meta property="og:title" content="An &amp; article">
+<meta property="og:description" content="  What it is   about. ">
+<meta property="og:image" content="/cover.png">
+<meta property="og:site_name" content="Stub News">
+</head><body><meta property="og:title" content="Not in the head"></body></html>
+"""
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves a few fixed pages, and counts requests and concurrent requests."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] += 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            path = self.path.partition("?")[0]
+            if path.startswith("/slow"):
+                time.sleep(0.1)
+            if path == "/hang":
+                time.sleep(1)
+            if path == "/missing":
+                self.send_response(404)
+                self.end_headers()
+                return
+            if path == "/data.json":
+                body, content_type = b'{"title": "no"}', "application/json"
+            elif path == "/redirect":
+                self.send_response(302)
+                self.send_header("Location", "/article")
+                self.end_headers()
+                return
+            elif path == "/bogus-charset":
+                body, content_type = b"<title>Caf\xc3\xa9</title>", "text/html; charset=bogus"
+            elif path == "/article":
+                body, content_type = ARTICLE, "text/html; charset=utf-8"
+            else:
+                body, content_type = f"<title>Page {path}</title>".encode(), "text/html"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """A local HTTP server, with its address in `base_url` (e.g. `http://127.0.0.1:41234`)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.hits = Counter()
+    server.active = server.max_active = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def allow_local_hosts(monkeypatch):
+    # The stub server is on the loopback interface.
+    monkeypatch.setattr(settings, "ENRICHMENT_ALLOW_PRIVATE_HOSTS", True)
+
+
+def make_items(urls):
+    """Creates a user with one content item per URL; returns (user id, item ids)."""
+    db = TestingSessionLocal()
+    try:
+        [owner_id] = factories.make_users(db, 1)
+        ids = factories.make_content(db, [owner_id], len(urls), urls=urls)
+        db.commit()
+        return owner_id, ids
+    finally:
+        db.close()
+
+
+def load_items(ids):
+    db = TestingSessionLocal()
+    try:
+        items = db.query(models.Content).filter(models.Content.id.in_(ids)).all()
+        return sorted(items, key=lambda item: ids.index(item.id))
+    finally:
+        db.close()
+
+
+def enrich(items, owner_id):
+    """Runs a pipeline until the given (content id, url) items are written; returns it."""
+    pipeline = EnrichmentPipeline(session_factory=TestingSessionLocal)
+
+    async def run():
+        await pipeline.start()
+        try:
+            for content_id, url in items:
+                pipeline.submit(content_id, owner_id, url)
+            await asyncio.sleep(0)
+            # Fail rather than hang if the workers stop.
+            await asyncio.wait_for(pipeline.join(), timeout=10)
+        finally:
+            await pipeline.stop()
+
+    asyncio.run(run())
+    return pipeline
+
+
+def test_parse_metadata_prefers_open_graph_and_resolves_images():
+    preview = parse_metadata(ARTICLE.decode(), "https://news.example/a/b")
+    assert preview.title == "An & article"
+    assert preview.description == "What it is about."
+    assert preview.image_url == "https://news.example/cover.png"
+    assert preview.site_name == "Stub News"
+
+    plain = parse_metadata("<html><head><title>\n Just  a title </title></head></html>", "https://x.example/")
+    assert (plain.title, plain.description, plain.image_url) == ("Just a title", None, None)
+
+
+def test_created_content_gets_a_link_preview(test_db, auth_headers, stub_server, allow_local_hosts, monkeypatch):
+    monkeypatch.setattr(settings, "ENRICHMENT_ENABLED", True)
+    monkeypatch.setattr(enricher, "session_factory", TestingSessionLocal)
+    monkeypatch.setattr(main, "SessionLocal", TestingSessionLocal)  # for the lifespan's other tasks
+
+    with TestClient(app) as client:  # runs the lifespan, which starts the pipeline
+        response = client.post(
+            "/content/", json={"title": "Article", "url": f"{stub_server.base_url}/redirect"}, headers=auth_headers
+        )
+        assert response.status_code == 201, response.text
+        assert response.json()["enriched_at"] is None
+        client.portal.call(enricher.join)
+
+        item = client.get(f"/content/{response.json()['id']}").json()
+    assert not enricher.running
+    assert item["preview_title"] == "An & article"
+    assert item["preview_image_url"] == f"{stub_server.base_url}/cover.png"
+    assert item["preview_site_name"] == "Stub News"
+    assert item["enriched_at"] is not None
+
+
+def test_fetches_are_limited_per_host_and_cached_by_normalized_url(
+    test_db, stub_server, allow_local_hosts, monkeypatch
+):
+    monkeypatch.setattr(settings, "ENRICHMENT_PER_HOST_CONCURRENCY", 2)
+    monkeypatch.setattr(settings, "ENRICHMENT_BATCH_SIZE", 3)
+    base = stub_server.base_url
+    # Six distinct slow pages, and the first one again under tracking parameters.
+    urls = [f"{base}/slow{number}" for number in range(6)]
+    urls += [f"{base}/slow0?utm_source=feed", f"{base}/slow0/#top"]
+    owner_id, ids = make_items(urls)
+
+    pipeline = enrich(list(zip(ids, urls)), owner_id)
+
+    assert stub_server.max_active == 2
+    assert stub_server.hits["/slow0"] == 1
+    assert sum(stub_server.hits.values()) == 6
+    assert pipeline.stats["fetched"] == 6 and pipeline.stats["cached"] == 2
+    assert pipeline.stats["written"] == len(urls)
+    titles = [item.preview_title for item in load_items(ids)]
+    assert titles == [f"Page /slow{number}" for number in range(6)] + ["Page /slow0", "Page /slow0"]
+
+
+def test_failed_fetches_leave_an_empty_preview(test_db, stub_server, allow_local_hosts, monkeypatch):
+    monkeypatch.setattr(settings, "ENRICHMENT_TIMEOUT_SECONDS", 0.3)
+    base = stub_server.base_url
+    urls = [f"{base}/hang", f"{base}/missing", f"{base}/data.json", "ftp://files.example/a", f"{base}/ok"]
+    owner_id, ids = make_items(urls)
+
+    pipeline = enrich(list(zip(ids, urls)), owner_id)
+
+    items = load_items(ids)
+    assert all(item.enriched_at is not None for item in items)
+    assert [item.preview_title for item in items] == [None, None, None, None, "Page /ok"]
+    assert pipeline.stats["failed"] == 2  # the timeout and the unsupported scheme
+
+
+def test_private_hosts_are_not_fetched_by_default(test_db, stub_server):
+    url = f"{stub_server.base_url}/article"
+    owner_id, ids = make_items([url])
+
+    pipeline = enrich([(ids[0], url)], owner_id)
+
+    assert sum(stub_server.hits.values()) == 0
+    assert pipeline.stats["failed"] == 1
+    [item] = load_items(ids)
+    assert item.preview_title is None and item.enriched_at is not None
+
+
+def test_changing_the_url_drops_the_old_preview(test_db, auth_headers, client, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(enricher, "running", True)
+    monkeypatch.setattr(enricher, "submit", lambda *item: submitted.append(item))
+
+    created = client.post("/content/", json={"title": "A", "url": "https://a.example/"}, headers=auth_headers).json()
+    db = TestingSessionLocal()
+    db.query(models.Content).filter_by(id=created["id"]).update({"preview_title": "Old page"})
+    db.commit()
+    db.close()
+
+    updated = client.put(
+        f"/content/{created['id']}", json={"title": "A", "url": "https://b.example/"}, headers=auth_headers
+    ).json()
+    assert updated["preview_title"] is None
+    assert submitted == [
+        (created["id"], created["owner_id"], "https://a.example/"),
+        (created["id"], created["owner_id"], "https://b.example/"),
+    ]
+
+
+def test_the_same_url_written_differently_keeps_the_preview(test_db, auth_headers, client, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(enricher, "running", True)
+    monkeypatch.setattr(enricher, "submit", lambda *item: submitted.append(item))
+
+    created = client.post("/content/", json={"title": "A", "url": "https://a.example/post"}, headers=auth_headers).json()
+    db = TestingSessionLocal()
+    db.query(models.Content).filter_by(id=created["id"]).update({"preview_title": "The page"})
+    db.commit()
+    db.close()
+
+    updated = client.put(
+        f"/content/{created['id']}",
+        json={"title": "A", "url": "https://A.example/post/?utm_source=feed"},
+        headers=auth_headers,
+    ).json()
+    assert updated["preview_title"] == "The page"
+    assert submitted == [(created["id"], created["owner_id"], "https://a.example/post")]
+
+
+def test_pages_with_an_unknown_charset_are_read_as_utf8(test_db, stub_server, allow_local_hosts, monkeypatch):
+    # More such pages than workers: none of them may stop a worker.
+    monkeypatch.setattr(settings, "ENRICHMENT_CONCURRENCY", 2)
+    urls = [f"{stub_server.base_url}/bogus-charset?page={number}" for number in range(4)]
+    urls.append(f"{stub_server.base_url}/ok")
+    owner_id, ids = make_items(urls)
+
+    pipeline = enrich(list(zip(ids, urls)), owner_id)
+
+    assert [item.preview_title for item in load_items(ids)] == ["Café"] * 4 + ["Page /ok"]
+    assert pipeline.stats["errors"] == 0
@@ -0,0 +1,140 @@
+# tests/test_entity_cache.py
+
+import pytest
+from sqlalchemy import event
+
+from app import crud, schemas
+from app.cache import EntityCache, InProcessVersions, entity_cache
+from tests.conftest import TestingSessionLocal, engine
+
+
+class StatementCounter:
+    """Counts the queries (not transaction control, e.g. SAVEPOINT) sent to the database."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._count)
+
+    def _count(self, connection, cursor, statement, *args):
+        if not statement.startswith(("SAVEPOINT", "RELEASE", "ROLLBACK", "BEGIN")):
+            self.count += 1
+
+
+@pytest.fixture(autouse=True)
+def enabled_cache(monkeypatch):
+    # The cache is off by default (see ENTITY_CACHE_SIZE).
+    monkeypatch.setattr(entity_cache, "max_size", 100)
+    monkeypatch.setattr(entity_cache, "versions", InProcessVersions(max_keys=1000))
+
+
+def lookup(function, **kwargs):
+    db = TestingSessionLocal()
+    try:
+        with StatementCounter() as statements:
+            found = function(db, **kwargs)
+            result = (found.id, found.name) if found is not None else None
+        db.commit()
+    finally:
+        db.close()
+    return result, statements.count
+
+
+def test_tag_lookups_are_cached_including_misses(client, test_db):
+    assert lookup(crud.get_tag_by_name, name="python") == (None, 1)
+    assert lookup(crud.get_tag_by_name, name="python") == (None, 0)
+
+    # Creating the tag invalidates the cached miss (for the name and the id).
+    tag_id = client.post("/tags/", json={"name": "python"}).json()["id"]
+    assert lookup(crud.get_tag_by_name, name="python") == ((tag_id, "python"), 1)
+    assert lookup(crud.get_tag_by_name, name="python") == ((tag_id, "python"), 0)
+    assert lookup(crud.get_tag_by_id, tag_id=tag_id) == ((tag_id, "python"), 1)
+    assert lookup(crud.get_tag_by_id, tag_id=tag_id) == ((tag_id, "python"), 0)
+
+    # Duplicates are rejected straight from the cache.
+    with StatementCounter() as statements:
+        assert client.post("/tags/", json={"name": "python"}).status_code == 400
+    assert statements.count == 0
+
+
+def test_without_the_cache_creating_a_tag_is_one_query(client, test_db, monkeypatch):
+    monkeypatch.setattr(entity_cache, "max_size", 0)
+    for expected_status in [201, 400]:
+        with StatementCounter() as statements:
+            assert client.post("/tags/", json={"name": "python"}).status_code == expected_status
+        assert statements.count == 1
+
+
+def test_cached_tag_is_attached_to_the_session(client, auth_headers, test_db):
+    tag_id = client.post("/tags/", json={"name": "python"}).json()["id"]
+    assert client.post(f"/tags/{tag_id}/follow", headers=auth_headers).status_code == 200
+    assert lookup(crud.get_tag_by_id, tag_id=tag_id)[1] == 0
+
+    db = TestingSessionLocal()
+    try:
+        tag = crud.get_tag_by_id(db, tag_id=tag_id)
+        assert tag in db
+        # Relationships are not cached; they load from the database as usual.
+        assert [user.email for user in tag.followers] == ["curator@example.com"]
+        assert crud.get_tag_by_name(db, name="python") is tag
+    finally:
+        db.close()
+
+
+def test_users_are_always_read_from_the_database(client, auth_headers, test_db):
+    # They carry what authorization checks, e.g. the email for admin access.
+    db = TestingSessionLocal()
+    try:
+        with StatementCounter() as statements:
+            crud.get_user_by_email(db, email="curator@example.com")
+            db.commit()
+            crud.get_user_by_email(db, email="curator@example.com")
+        assert statements.count == 2
+    finally:
+        db.close()
+    assert len(entity_cache) == 0
+
+
+def test_rolled_back_reads_are_not_cached(test_db):
+    db = TestingSessionLocal()
+    try:
+        crud.create_tag(db, schemas.TagCreate(name="draft"))
+        assert crud.get_tag_by_name(db, name="draft") is not None
+        db.rollback()
+    finally:
+        db.close()
+    assert len(entity_cache) == 0
+    assert lookup(crud.get_tag_by_name, name="draft") == (None, 1)
+
+
+def test_entries_read_before_a_change_are_never_served():
+    cache = EntityCache(max_size=2, versions=InProcessVersions(max_keys=10))
+    version = cache.version("key")
+    cache.invalidate("key")
+    cache.put("key", version, "stale")
+    assert cache.get("key") == (False, None)
+
+    cache.put("key", cache.version("key"), "fresh")
+    assert cache.get("key") == (True, "fresh")
+    cache.invalidate("key")
+    assert cache.get("key") == (False, None)
+
+    for key in ["a", "b", "c"]:
+        cache.put(key, cache.version(key), key)
+    assert len(cache) == 2 and cache.get("a") == (False, None)
+
+
+def test_entries_expire_after_the_ttl():
+    # Another worker's change is not seen before then.
+    now = [0.0]
+    cache = EntityCache(max_size=2, versions=InProcessVersions(max_keys=10), ttl=60, clock=lambda: now[0])
+    cache.put("key", cache.version("key"), "row")
+    now[0] = 59
+    assert cache.get("key") == (True, "row")
+    now[0] = 60
+    assert cache.get("key") == (False, None)
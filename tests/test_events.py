@@ -0,0 +1,114 @@
+# tests/test_events.py
+
+import asyncio
+import threading
+
+from app.events import InProcessBackend, bus, tag_topic
+
+
+def test_events_published_from_other_threads_reach_subscribers():
+    async def scenario():
+        backend = InProcessBackend(history_size=10, max_queue=10)
+        subscription, missed = backend.subscribe([tag_topic(1)])
+        publisher = threading.Thread(target=backend.publish, args=(tag_topic(1), {"content_id": 5}))
+        publisher.start()
+        publisher.join()
+        backend.publish(tag_topic(2), {"content_id": 6})
+        event = await asyncio.wait_for(subscription.queue.get(), timeout=1)
+        return missed, event, subscription.queue.empty()
+
+    missed, event, nothing_else = asyncio.run(scenario())
+
+    assert missed == []
+    assert event.data == {"content_id": 5}
+    assert nothing_else
+
+
+def test_resume_returns_only_missed_events_for_subscribed_topics():
+    async def scenario():
+        backend = InProcessBackend(history_size=10, max_queue=10)
+        first = backend.publish(tag_topic(1), {"content_id": 1})
+        backend.publish(tag_topic(1), {"content_id": 2})
+        backend.publish(tag_topic(2), {"content_id": 3})
+        _, missed = backend.subscribe([tag_topic(1)], last_event_id=first.id)
+        return [event.data["content_id"] for event in missed]
+
+    assert asyncio.run(scenario()) == [2]
+
+
+def test_slow_subscriber_is_disconnected_instead_of_buffering():
+    async def scenario():
+        backend = InProcessBackend(history_size=10, max_queue=2)
+        subscription, _ = backend.subscribe([tag_topic(1)])
+        for content_id in range(5):
+            backend.publish(tag_topic(1), {"content_id": content_id})
+        await asyncio.sleep(0)
+        return subscription.closed, await subscription.queue.get()
+
+    closed, last = asyncio.run(scenario())
+
+    assert closed
+    assert last is None
+
+
+def test_tagging_content_publishes_after_commit(client, auth_headers):
+    tag = client.post("/tags/", json={"name": "python"}).json()
+    item = client.post("/content/", json={"title": "A", "url": "https://example.com"}, headers=auth_headers).json()
+
+    client.post(f"/content/{item['id']}/tags/{tag['id']}", headers=auth_headers)
+
+    [event] = list(bus.backend._history)
+    assert event.topic == tag_topic(tag["id"])
+    assert event.data["content_id"] == item["id"]
+    assert "data: " in event.to_sse()
+
+
+async def read_stream_until(app, path, headers, marker: bytes) -> bytes:
+    """
+    Calls the ASGI app directly and disconnects once `marker` has been received.
+
+    TestClient buffers whole responses, so it can't read from an endless event stream.
+    """
+    disconnected = asyncio.Event()
+    received = b""
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += message.get("body", b"")
+            if marker in received:
+                disconnected.set()
+
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+    return received
+
+
+def test_stream_replays_missed_events_on_reconnect(client, auth_headers):
+    tag = client.post("/tags/", json={"name": "python"}).json()
+    client.post(f"/tags/{tag['id']}/follow", headers=auth_headers)
+    item = client.post("/content/", json={"title": "A", "url": "https://example.com"}, headers=auth_headers).json()
+    client.post(f"/content/{item['id']}/tags/{tag['id']}", headers=auth_headers)
+
+    body = asyncio.run(read_stream_until(
+        client.app, "/feed/stream", {**auth_headers, "Last-Event-ID": "0"}, marker=b"\n\n"
+    ))
+
+    assert body.startswith(b"id: ")
+    assert b"\nevent: tag\ndata: " in body
+    assert f'"content_id": {item["id"]}'.encode() in body
+    assert bus.backend.subscriber_count() == 0
@@ -0,0 +1,58 @@
+# tests/test_feed.py
+
+from app.graph import FeedGraph, feed_graph
+from tests.conftest import TestingSessionLocal, create_tagged_content
+
+
+def load_graph():
+    db = TestingSessionLocal()
+    try:
+        feed_graph.load(db)
+    finally:
+        db.close()
+
+
+def test_feed_from_graph_matches_sql(client, auth_headers):
+    python = client.post("/tags/", json={"name": "python"}).json()["id"]
+    rust = client.post("/tags/", json={"name": "rust"}).json()["id"]
+    go = client.post("/tags/", json={"name": "go"}).json()["id"]
+    create_tagged_content(client, auth_headers, "one", [python])
+    create_tagged_content(client, auth_headers, "two", [python, rust])
+    create_tagged_content(client, auth_headers, "three", [go])
+    create_tagged_content(client, auth_headers, "four", [rust])
+    client.post(f"/tags/{python}/follow", headers=auth_headers)
+    client.post(f"/tags/{rust}/follow", headers=auth_headers)
+
+    sql_feed = client.get("/feed", headers=auth_headers).json()
+    load_graph()
+    graph_feed = client.get("/feed", headers=auth_headers).json()
+
+    assert [item["title"] for item in graph_feed] == ["four", "two", "one"]
+    assert graph_feed == sql_feed
+
+
+def test_graph_follows_writes_after_load(client, auth_headers):
+    load_graph()
+    python = client.post("/tags/", json={"name": "python"}).json()["id"]
+    client.post(f"/tags/{python}/follow", headers=auth_headers)
+    first = create_tagged_content(client, auth_headers, "one", [python])
+    second = create_tagged_content(client, auth_headers, "two", [python])
+
+    assert [item["id"] for item in client.get("/feed", headers=auth_headers).json()] == [second, first]
+
+    client.delete(f"/content/{second}", headers=auth_headers)
+    client.delete(f"/tags/{python}/follow", headers=auth_headers)
+
+    assert feed_graph.feed_ids(1) == []
+
+
+def test_feed_ids_paginates_distinct_ids():
+    graph = FeedGraph()
+    graph.loaded = True
+    for content_id, tag_id in [(1, 1), (2, 1), (2, 2), (3, 2), (4, 1)]:
+        graph.add_content_tag(content_id, tag_id)
+    graph.follow(7, 1)
+    graph.follow(7, 2)
+
+    assert graph.feed_ids(7) == [4, 3, 2, 1]
+    assert graph.feed_ids(7, skip=1, limit=2) == [3, 2]
@@ -0,0 +1,74 @@
+# tests/test_idempotency.py
+
+from app import crud, schemas
+from app.config import settings
+from app.idempotency import IdempotencyStore
+from tests.conftest import TestingSessionLocal
+
+
+CONTENT = {"title": "An article", "url": "https://example.com/a"}
+
+
+def test_retry_with_same_key_replays_response(client, auth_headers):
+    headers = {**auth_headers, "Idempotency-Key": "create-1"}
+
+    first = client.post("/content/", json=CONTENT, headers=headers)
+    second = client.post("/content/", json=CONTENT, headers=headers)
+
+    assert first.status_code == 201, first.text
+    assert second.status_code == 201
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+    # Only one row was written.
+    assert len(client.get("/content/").json()) == 1
+
+
+def test_new_key_creates_new_item(client, auth_headers):
+    client.post("/content/", json=CONTENT, headers={**auth_headers, "Idempotency-Key": "a"})
+    client.post("/content/", json=CONTENT, headers={**auth_headers, "Idempotency-Key": "b"})
+
+    assert len(client.get("/content/").json()) == 2
+
+
+def test_key_reused_with_different_body_is_rejected(client, auth_headers):
+    headers = {**auth_headers, "Idempotency-Key": "create-1"}
+    client.post("/content/", json=CONTENT, headers=headers)
+
+    response = client.post("/content/", json={**CONTENT, "title": "Other"}, headers=headers)
+
+    assert response.status_code == 422
+
+
+def test_store_evicts_oldest_keys_when_full():
+    store = IdempotencyStore(ttl_seconds=60, max_keys=2)
+    for key in ("a", "b", "c"):
+        store.reserve(key, "hash")
+
+    assert len(store) == 2
+    assert store.reserve("a", "hash") == (True, None)
+
+
+def test_duplicate_tag_is_rejected_without_error(client, test_db):
+    assert client.post("/tags/", json={"name": "Python"}).status_code == 201
+
+    response = client.post("/tags/", json={"name": "python"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Tag with this name already exists"
+
+
+def test_upsert_by_url_updates_existing_item(test_db, monkeypatch):
+    monkeypatch.setattr(settings, "CONTENT_UPSERT_BY_URL", True)
+    db = TestingSessionLocal()
+    try:
+        user = crud.create_user(db, schemas.UserCreate(email="u@example.com", password="pw"))
+        first = crud.create_user_content(db, schemas.ContentCreate(**CONTENT), user_id=user.id)
+        second = crud.create_user_content(
+            db, schemas.ContentCreate(**{**CONTENT, "title": "Updated"}), user_id=user.id
+        )
+
+        assert second.id == first.id
+        assert second.title == "Updated"
+        assert len(crud.get_content(db)) == 1
+    finally:
+        db.close()
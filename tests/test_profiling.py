@@ -0,0 +1,96 @@
+# tests/test_profiling.py
+
+import threading
+import time
+from types import SimpleNamespace
+
+from fastapi import Request
+
+from app.config import settings
+from app.database import get_db
+from app.main import app
+from app.profiling import SamplingProfiler
+from app.routers import admin
+from tests.conftest import override_get_db
+
+
+def busy_loop_for_profiler(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def run_busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop_for_profiler, args=(stop,))
+    thread.start()
+    return stop, thread
+
+
+def test_sampler_finds_busy_code_and_bounds_its_overhead():
+    stop, thread = run_busy_thread()
+    profiler = SamplingProfiler(interval=0.0001, max_overhead=0.05)
+    try:
+        profiler.start()
+        time.sleep(0.3)
+        profiler.stop()
+    finally:
+        stop.set()
+        thread.join()
+
+    assert profiler.samples > 0
+    assert "test_profiling.py:busy_loop_for_profiler" in profiler.collapsed()
+    # Every line is "<stack> <count>", as flamegraph tools expect.
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in profiler.collapsed().splitlines())
+    assert profiler.overhead < 0.05 * 1.5
+
+
+def test_profile_endpoint_is_admin_only(client, auth_headers, monkeypatch):
+    assert client.post("/admin/profile?seconds=0.1", headers=auth_headers).status_code == 403
+
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", ["curator@example.com"])
+    stop, thread = run_busy_thread()
+    try:
+        response = client.post("/admin/profile?seconds=0.2", headers=auth_headers)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert response.status_code == 200
+    assert "busy_loop_for_profiler" in response.text
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    assert client.post(f"/admin/profile?seconds={settings.PROFILE_MAX_SECONDS + 1}", headers=auth_headers).status_code == 422
+
+
+def test_profile_run_holds_no_database_connection(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", ["curator@example.com"])
+    sessions = []
+
+    def recording_get_db(request: Request):
+        for db in override_get_db(request):
+            sessions.append(db)
+            yield db
+
+    in_transaction = []
+
+    async def sleep(seconds):
+        in_transaction.extend(db.in_transaction() for db in sessions)
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, recording_get_db)
+    monkeypatch.setattr(admin, "asyncio", SimpleNamespace(sleep=sleep))
+    assert client.post("/admin/profile?seconds=0.1", headers=auth_headers).status_code == 200
+
+    # The session of the admin check is the endpoint's, and it is done before sampling.
+    assert len(sessions) == 1 and in_transaction == [False]
+
+
+def test_per_request_profile(client, auth_headers, monkeypatch):
+    response = client.get("/content/", headers={**auth_headers, "X-Profile": "1"})
+    assert "X-Profile-Id" not in response.headers
+
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", ["curator@example.com"])
+    response = client.get("/content/", headers={**auth_headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    profile = client.get(f"/admin/profiles/{response.headers['X-Profile-Id']}", headers=auth_headers)
+
+    assert profile.status_code == 200
+    assert client.get("/admin/profiles/unknown", headers=auth_headers).status_code == 404
@@ -0,0 +1,86 @@
+# tests/test_related.py
+
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.main import app
+from app.related import RelatedContentIndex, related_index
+from tests.conftest import TestingSessionLocal, create_tagged_content
+
+
+def build_index():
+    """Builds the index the way the application does when it starts."""
+    db = TestingSessionLocal()
+    try:
+        related_index.build(db)
+    finally:
+        db.close()
+
+
+def test_related_endpoint_ranks_by_shared_tags(client, auth_headers):
+    tags = [client.post("/tags/", json={"name": name}).json()["id"] for name in ("python", "web", "rust")]
+    python, web, rust = tags
+
+    def create(title, tag_ids):
+        return create_tagged_content(client, auth_headers, title, tag_ids)
+
+    source = create("source", [python, web])
+    both = create("both", [python, web])
+    one = create("one", [python])
+    create("unrelated", [rust])
+    build_index()
+
+    related = client.get(f"/content/{source}/related").json()
+    assert [item["id"] for item in related] == [both, one]
+
+    # Tagging after the index is built is reflected incrementally.
+    newer = create("newer", [python, web])
+    related = client.get(f"/content/{source}/related").json()
+    assert [item["id"] for item in related] == [newer, both, one]
+
+    client.delete(f"/content/{both}", headers=auth_headers)
+    related = client.get(f"/content/{source}/related?limit=1").json()
+    assert [item["id"] for item in related] == [newer]
+
+
+def test_related_for_missing_content_is_404(client, test_db):
+    assert client.get("/content/999/related").status_code == 404
+
+
+def test_related_is_empty_until_the_index_is_built(client, auth_headers):
+    tag = client.post("/tags/", json={"name": "python"}).json()["id"]
+    source = create_tagged_content(client, auth_headers, "source", [tag])
+    other = create_tagged_content(client, auth_headers, "other", [tag])
+
+    # Requests never build the index themselves.
+    assert client.get(f"/content/{source}/related").json() == []
+    assert not related_index.loaded
+
+    build_index()
+    assert [item["id"] for item in client.get(f"/content/{source}/related").json()] == [other]
+
+
+def test_the_application_builds_the_index_in_the_background(auth_headers, monkeypatch):
+    monkeypatch.setattr(main, "SessionLocal", TestingSessionLocal)
+    with TestClient(app) as client:  # runs the lifespan
+        tag = client.post("/tags/", json={"name": "python"}).json()["id"]
+        source = create_tagged_content(client, auth_headers, "source", [tag])
+        other = create_tagged_content(client, auth_headers, "other", [tag])
+        deadline = time.monotonic() + 5
+        while not related_index.loaded and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert related_index.loaded
+        assert [item["id"] for item in client.get(f"/content/{source}/related").json()] == [other]
+
+
+def test_rare_tags_weigh_more():
+    index = RelatedContentIndex()
+    index.loaded = True
+    # Tag 1 is on most items; tag 2 is shared only by items 1 and 3.
+    for content_id, tag_id in [(1, 1), (1, 2), (2, 1), (3, 1), (3, 2), (4, 1), (5, 3)]:
+        index.add_tag(content_id, tag_id)
+
+    # Ties (items 2 and 4) go to the newest item; item 5 shares nothing.
+    assert index.related_ids(1) == [3, 4, 2]
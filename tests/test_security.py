@@ -0,0 +1,124 @@
+# tests/test_security.py
+
+from datetime import datetime, timedelta, timezone
+
+import ecdsa
+import pytest
+from jose import JWTError
+from sqlalchemy import select
+
+from app import calibrate, crud, models, security
+from app.security import KeyRing, VerifiedTokenCache
+from tests.conftest import TestingSessionLocal
+
+
+def es256_private_key() -> str:
+    return ecdsa.SigningKey.generate(curve=ecdsa.NIST256p).to_pem().decode()
+
+
+def claims(minutes=5):
+    return {"sub": "user@example.com", "exp": datetime.now(timezone.utc) + timedelta(minutes=minutes)}
+
+
+def test_rotated_hmac_keys_still_verify():
+    old = KeyRing("HS256", "old", "old-secret", {})
+    new = KeyRing("HS256", "new", "new-secret", {"old": "old-secret"})
+
+    token = old.sign(claims())
+
+    assert new.verify(token)["sub"] == "user@example.com"
+    with pytest.raises(JWTError):
+        KeyRing("HS256", "new", "new-secret", {}).verify(token)
+
+
+def test_asymmetric_tokens_verify_with_public_key_only():
+    signer = KeyRing("ES256", "k1", es256_private_key(), {})
+    verifier_key = signer.verify_keys["k1"]
+    edge = KeyRing("ES256", "k1", verifier_key, {"k1": verifier_key})
+
+    token = signer.sign(claims())
+
+    assert edge.verify(token)["sub"] == "user@example.com"
+    assert "PRIVATE" not in verifier_key
+    [jwk] = signer.jwks()
+    assert jwk["kid"] == "k1" and jwk["kty"] == "EC"
+
+
+def test_verified_token_cache_respects_expiry_and_size():
+    cache = VerifiedTokenCache(max_size=1)
+    cache.put("a", {"sub": "x", "exp": 4102444800})
+    cache.put("b", {"sub": "y", "exp": 4102444800})
+    cache.put("expired", {"sub": "z", "exp": 1})
+
+    assert cache.get("a") is None
+    assert cache.get("expired") is None
+
+
+def test_decode_uses_cache_after_first_verification(monkeypatch):
+    token = security.create_access_token({"sub": "user@example.com"})
+    assert security.decode_access_token(token) == "user@example.com"
+
+    def fail(_token):
+        raise AssertionError("signature should not be checked again")
+
+    monkeypatch.setattr(security.key_ring, "verify", fail)
+
+    assert security.decode_access_token(token) == "user@example.com"
+
+
+def test_jwks_endpoint_is_empty_for_hmac(client):
+    assert client.get("/.well-known/jwks.json").json() == {"keys": []}
+
+
+@pytest.fixture
+def raised_bcrypt_cost():
+    """Raises the bcrypt cost by one for the test, making existing hashes outdated."""
+    security.pwd_context.update(bcrypt__rounds=5, bcrypt__min_rounds=5)
+    try:
+        yield
+    finally:
+        security.pwd_context.update(bcrypt__rounds=4, bcrypt__min_rounds=4)
+
+
+def stored_hash(email="curator@example.com"):
+    db = TestingSessionLocal()
+    try:
+        return db.scalars(select(models.User.hashed_password).where(models.User.email == email)).one()
+    finally:
+        db.close()
+
+
+def test_login_upgrades_outdated_password_hash(client, auth_headers, raised_bcrypt_cost):
+    old_hash = stored_hash()
+    assert security.needs_rehash(old_hash)
+
+    form = {"username": "curator@example.com", "password": "password123"}
+    assert client.post("/token", data=form).status_code == 200
+    new_hash = stored_hash()
+    assert new_hash != old_hash and new_hash.startswith("$2b$05$")
+    assert not security.needs_rehash(new_hash)
+
+    # The cached user was invalidated, so logins check against the new hash.
+    assert client.post("/token", data=form).status_code == 200
+    assert stored_hash() == new_hash
+    assert client.post("/token", data={**form, "password": "wrong"}).status_code == 401
+
+
+def test_rehash_does_not_overwrite_a_changed_password(client, auth_headers):
+    current = stored_hash()
+    db = TestingSessionLocal()
+    try:
+        user = crud.get_user_by_email(db, email="curator@example.com")
+        assert not crud.rehash_user_password(db, user.id, "an-older-hash", "password123")
+        db.commit()
+    finally:
+        db.close()
+    assert stored_hash() == current
+
+
+def test_calibration_picks_highest_cost_within_budget():
+    rounds, timings = calibrate.calibrate(target_seconds=10, samples=1, max_rounds=6)
+    assert rounds == 6 and [cost for cost, _ in timings] == [4, 5, 6]
+
+    rounds, timings = calibrate.calibrate(target_seconds=0, samples=1)
+    assert rounds == calibrate.MIN_ROUNDS and len(timings) == 1
@@ -0,0 +1,152 @@
+# tests/test_sharding.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app import crud, models
+from app.database import Base, get_db, make_engine, run_in_batches, sharded_sessionmaker, shard_for_user
+from app.main import app
+from tests.conftest import create_user_and_login, override_get_db, reset_in_memory_state
+
+
+@pytest.fixture
+def shards(tmp_path):
+    """Runs the app against a global database and two data shards (SQLite files)."""
+    global_engine = make_engine(f"sqlite:///{tmp_path / 'global.db'}")
+    shard_engines = {
+        name: make_engine(f"sqlite:///{tmp_path / name}.db") for name in ["shard0", "shard1"]
+    }
+    for engine in [global_engine, *shard_engines.values()]:
+        Base.metadata.create_all(bind=engine)
+    ShardedSessionLocal = sharded_sessionmaker(global_engine, shard_engines)
+
+    def override_sharded_get_db():
+        db = ShardedSessionLocal()
+        try:
+            yield db
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    reset_in_memory_state()
+    app.dependency_overrides[get_db] = override_sharded_get_db
+    try:
+        yield ShardedSessionLocal, global_engine, shard_engines
+    finally:
+        app.dependency_overrides[get_db] = override_get_db
+        reset_in_memory_state()
+        for engine in [global_engine, *shard_engines.values()]:
+            engine.dispose()
+
+
+def count_rows(engine, model):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(model)).scalar_one()
+
+
+def test_users_and_content_are_spread_across_shards(client, shards):
+    _, global_engine, shard_engines = shards
+    headers = [create_user_and_login(client, f"user{number}@example.com") for number in range(6)]
+    content_ids = []
+    for number, user_headers in enumerate(headers):
+        response = client.post("/content/", json={"title": f"item-{number}", "url": "https://example.com"}, headers=user_headers)
+        assert response.status_code == 201, response.text
+        content_ids.append(response.json()["id"])
+
+    # Ids are allocated globally, so they are unique across shards.
+    assert content_ids == sorted(set(content_ids))
+    data_shards = list(shard_engines)
+    for user_id in range(1, 7):
+        owner_shard = shard_engines[shard_for_user(user_id, data_shards)]
+        with owner_shard.connect() as connection:
+            assert connection.execute(select(models.User.id).where(models.User.id == user_id)).scalar_one() == user_id
+    assert all(count_rows(engine, models.User) > 0 for engine in shard_engines.values())
+    assert count_rows(global_engine, models.User) == 0
+
+    # Reads by id and by email find rows wherever they live.
+    for content_id in content_ids:
+        assert client.get(f"/content/{content_id}").json()["id"] == content_id
+    assert client.get("/users/me", headers=headers[3]).json()["email"] == "user3@example.com"
+
+
+def test_duplicate_aware_creates_insert_on_the_owners_shard(client, shards):
+    _, global_engine, shard_engines = shards
+    headers = [create_user_and_login(client, f"user{number}@example.com") for number in range(2)]
+    created = []
+    for user_headers in headers:
+        for title in ["first", "second"]:
+            response = client.post(
+                "/content/?on_duplicate=update", json={"title": title, "url": "https://example.com"}, headers=user_headers
+            )
+            assert response.status_code == 201, response.text
+            created.append(response.json())
+
+    # The second create of each user updated the first one.
+    assert [item["id"] for item in created] == [created[0]["id"]] * 2 + [created[2]["id"]] * 2
+    assert created[0]["id"] != created[2]["id"]
+    data_shards = list(shard_engines)
+    for user_id, item in [(1, created[0]), (2, created[2])]:
+        with shard_engines[shard_for_user(user_id, data_shards)].connect() as connection:
+            assert connection.execute(select(models.Content.owner_id).where(models.Content.id == item["id"])).scalar_one() == user_id
+    assert sum(count_rows(engine, models.Content) for engine in shard_engines.values()) == 2
+    assert count_rows(global_engine, models.Content) == 0
+    assert client.get(f"/content/{created[2]['id']}").json()["title"] == "second"
+
+
+def test_tags_are_replicated_and_feed_merges_shards(client, shards):
+    ShardedSessionLocal, global_engine, shard_engines = shards
+    headers = [create_user_and_login(client, f"user{number}@example.com") for number in range(4)]
+    python = client.post("/tags/", json={"name": "python"}).json()["id"]
+    for engine in [global_engine, *shard_engines.values()]:
+        assert count_rows(engine, models.Tag) == 1
+
+    for number, user_headers in enumerate(headers):
+        content_id = client.post("/content/", json={"title": f"item-{number}", "url": "https://example.com"}, headers=user_headers).json()["id"]
+        assert client.post(f"/content/{content_id}/tags/{python}", headers=user_headers).status_code == 200
+    client.post(f"/tags/{python}/follow", headers=headers[0])
+
+    feed = client.get("/feed?limit=3", headers=headers[0]).json()
+    assert [item["title"] for item in feed] == ["item-3", "item-2", "item-1"]
+    assert feed[0]["tags"] == [{"id": python, "name": "python"}]
+
+    # Keyset pagination walks the merged listing without gaps or repeats.
+    first = client.get(f"/content/?tag={python}&limit=3")
+    second = client.get(f"/content/?tag={python}&limit=3&cursor={first.headers['X-Next-Cursor']}")
+    assert [item["title"] for item in first.json() + second.json()] == ["item-3", "item-2", "item-1", "item-0"]
+
+    # Co-follow counts live in the global shard, and a rebuild from the
+    # sharded follows gives the same numbers.
+    rust = client.post("/tags/", json={"name": "rust"}).json()["id"]
+    for user_headers in headers[:2]:
+        client.post(f"/tags/{rust}/follow", headers=user_headers)
+    db = ShardedSessionLocal()
+    try:
+        before = sorted(db.execute(select(models.TagCoFollow.tag_id, models.TagCoFollow.other_tag_id, models.TagCoFollow.count)).all())
+        crud.rebuild_tag_co_follows(db)
+        after = sorted(db.execute(select(models.TagCoFollow.tag_id, models.TagCoFollow.other_tag_id, models.TagCoFollow.count)).all())
+    finally:
+        db.close()
+    assert before == after == [(python, python, 1), (python, rust, 1), (rust, python, 1), (rust, rust, 2)]
+
+
+def test_archived_content_stays_on_its_owners_shard(client, shards):
+    ShardedSessionLocal, _, shard_engines = shards
+    headers = [create_user_and_login(client, f"user{number}@example.com") for number in range(4)]
+    for number, user_headers in enumerate(headers):
+        client.post("/content/", json={"title": f"item-{number}", "url": "https://example.com"}, headers=user_headers)
+
+    db = ShardedSessionLocal()
+    assert run_in_batches(db, crud.archive_content_batch, datetime.now(timezone.utc) + timedelta(days=1), 3) == 4
+    db.close()
+
+    data_shards = list(shard_engines)
+    for name, engine in shard_engines.items():
+        assert count_rows(engine, models.Content) == 0
+        with engine.connect() as connection:
+            owners = connection.execute(select(models.ArchivedContent.owner_id)).scalars().all()
+        assert owners and all(shard_for_user(owner, data_shards) == name for owner in owners)
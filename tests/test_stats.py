@@ -0,0 +1,94 @@
+# tests/test_stats.py
+
+import json
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app import crud, models
+from app.database import run_in_batches
+from tests.conftest import TestingSessionLocal, create_tagged_content, create_user_and_login
+from tests.factories import make_content, make_tags, make_users, tag_content
+
+
+def test_stats_follow_the_write_paths(client, auth_headers):
+    other_headers = create_user_and_login(client, "other@example.com")
+    python = client.post("/tags/", json={"name": "python"}).json()["id"]
+    rust = client.post("/tags/", json={"name": "rust"}).json()["id"]
+    first = create_tagged_content(client, auth_headers, "a", [python, rust])
+    create_tagged_content(client, auth_headers, "b", [python])
+    create_tagged_content(client, other_headers, "c", [python])
+    today = datetime.now(timezone.utc).date()
+
+    per_day = client.get("/stats/content-per-day").json()
+    assert len(per_day) == 30
+    assert per_day[-1] == {"day": today.isoformat(), "count": 3}
+    assert all(entry["count"] == 0 for entry in per_day[:-1])
+    assert client.get("/stats/active-curators", params={"start": today.isoformat()}).json() == [
+        {"day": today.isoformat(), "count": 2}
+    ]
+    assert client.get("/stats/content-per-tag").json() == [
+        {"id": python, "name": "python", "count": 3},
+        {"id": rust, "name": "rust", "count": 1},
+    ]
+
+    client.delete(f"/content/{first}", headers=auth_headers)
+    client.delete("/users/me/content", headers=other_headers)
+    assert client.get("/stats/content-per-day", params={"start": today.isoformat()}).json()[0]["count"] == 1
+    assert client.get("/stats/active-curators", params={"start": today.isoformat()}).json()[0]["count"] == 1
+    assert client.get("/stats/content-per-tag").json() == [{"id": python, "name": "python", "count": 1}]
+
+
+def test_stats_date_range_validation(client, test_db):
+    assert client.get("/stats/content-per-day", params={"start": "2024-02-01", "end": "2024-01-01"}).status_code == 422
+    assert client.get("/stats/content-per-day", params={"start": "2020-01-01", "end": "2024-01-01"}).status_code == 422
+    response = client.get("/stats/content-per-day", params={"start": "2024-02-27", "end": "2024-03-01"})
+    assert [entry["day"] for entry in response.json()] == ["2024-02-27", "2024-02-28", "2024-02-29", "2024-03-01"]
+
+
+def _expected_stats(db):
+    """The rollups computed straight from the raw tables, live and archived."""
+    items = db.execute(select(models.Content.id, models.Content.created_at, models.Content.owner_id)).all()
+    links = models.content_tags_association
+    created = {row.id: row.created_at.date() for row in items}
+    per_tag = Counter((created[content_id], tag_id) for content_id, tag_id in db.execute(select(links.c.content_id, links.c.tag_id)))
+    per_day = Counter(row.created_at.date() for row in items)
+    curators = {(row.created_at.date(), row.owner_id) for row in items}
+    for row in db.execute(select(models.ArchivedContent)).scalars():
+        per_day[row.created_at.date()] += 1
+        curators.add((row.created_at.date(), row.owner_id))
+        for tag_id in json.loads(row.tag_ids):
+            per_tag[(row.created_at.date(), tag_id)] += 1
+    return per_day, per_tag, Counter(day for day, _ in curators)
+
+
+def _rollups(db):
+    per_day = Counter({row.day: row.count for row in db.scalars(select(models.DailyContentStats)) if row.count})
+    per_tag = Counter({(row.day, row.tag_id): row.count for row in db.scalars(select(models.DailyTagStats)) if row.count})
+    curators = Counter(row.day for row in db.scalars(select(models.DailyCuratorStats)) if row.count > 0)
+    return per_day, per_tag, curators
+
+
+def test_rebuild_archive_and_purge_keep_rollups_consistent(test_db):
+    db = TestingSessionLocal()
+    users = make_users(db, 5)
+    tags = make_tags(db, 8)
+    content_ids = make_content(db, users, 400, start=datetime(2024, 1, 1), step=timedelta(hours=3))
+    tag_content(db, content_ids, tags, per_item=3)
+
+    crud.rebuild_daily_stats(db, chunk_size=64)
+    assert _rollups(db) == _expected_stats(db)
+    assert sum(_rollups(db)[0].values()) == 400
+
+    # Archived items still count; purged ones (every 5th item) don't.
+    run_in_batches(db, crud.archive_content_batch, datetime(2024, 1, 20), 50)
+    assert _rollups(db) == _expected_stats(db)
+    run_in_batches(db, crud.purge_user_content_batch, users[0], 30)
+    assert _rollups(db) == _expected_stats(db)
+    assert sum(_rollups(db)[0].values()) == 320
+
+    crud.rebuild_daily_stats(db)
+    assert _rollups(db) == _expected_stats(db)
+    assert [count for _, count in crud.get_daily_content_counts(db, date(2024, 1, 1), date(2024, 1, 2))] == [6, 6]
+    db.close()
@@ -0,0 +1,60 @@
+# tests/test_suggestions.py
+
+from sqlalchemy import select
+
+from app import crud, models
+from tests.conftest import TestingSessionLocal, create_user_and_login
+
+
+def co_follow_counts():
+    db = TestingSessionLocal()
+    try:
+        rows = db.execute(select(models.TagCoFollow.tag_id, models.TagCoFollow.other_tag_id, models.TagCoFollow.count))
+        return {(tag_id, other): count for tag_id, other, count in rows if count}
+    finally:
+        db.close()
+
+
+def test_suggested_tags_come_from_co_follows(client, test_db):
+    python, django, flask, rust = [
+        client.post("/tags/", json={"name": name}).json()["id"] for name in ("python", "django", "flask", "rust")
+    ]
+    for email, follows in [
+        ("a@example.com", [python, django]),
+        ("b@example.com", [python, django, flask]),
+        ("c@example.com", [rust]),
+    ]:
+        headers = create_user_and_login(client, email=email)
+        for tag_id in follows:
+            client.post(f"/tags/{tag_id}/follow", headers=headers)
+
+    me = create_user_and_login(client, email="me@example.com")
+    client.post(f"/tags/{python}/follow", headers=me)
+
+    response = client.get("/users/me/suggested-tags", headers=me)
+
+    assert response.status_code == 200, response.text
+    assert [tag["name"] for tag in response.json()] == ["django", "flask"]
+
+
+def test_unfollow_reverses_counts_and_rebuild_matches(client, auth_headers):
+    python, django = [client.post("/tags/", json={"name": name}).json()["id"] for name in ("python", "django")]
+    client.post(f"/tags/{python}/follow", headers=auth_headers)
+    client.post(f"/tags/{django}/follow", headers=auth_headers)
+    assert co_follow_counts() == {(python, python): 1, (django, django): 1, (python, django): 1, (django, python): 1}
+
+    client.delete(f"/tags/{python}/follow", headers=auth_headers)
+    incremental = co_follow_counts()
+    assert incremental == {(django, django): 1}
+
+    db = TestingSessionLocal()
+    try:
+        crud.rebuild_tag_co_follows(db)
+        db.commit()
+    finally:
+        db.close()
+    assert co_follow_counts() == incremental
+
+
+def test_no_follows_means_no_suggestions(client, auth_headers):
+    assert client.get("/users/me/suggested-tags", headers=auth_headers).json() == []
@@ -0,0 +1,84 @@
+# tests/test_trending.py
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app import crud, models
+from tests import factories
+from tests.conftest import TestingSessionLocal
+
+
+def activity_rows(db):
+    return sorted(db.execute(select(
+        models.TagActivity.tag_id, models.TagActivity.span_hours,
+        models.TagActivity.bucket_start, models.TagActivity.count,
+    )).all())
+
+
+def test_trending_endpoint_counts_new_tagging(client, auth_headers):
+    python = client.post("/tags/", json={"name": "python"}).json()["id"]
+    rust = client.post("/tags/", json={"name": "rust"}).json()["id"]
+    for number, tag_ids in enumerate([[python], [python, rust], [python]]):
+        content_id = client.post("/content/", json={"title": f"t{number}", "url": "https://example.com"}, headers=auth_headers).json()["id"]
+        for tag_id in tag_ids:
+            client.post(f"/content/{content_id}/tags/{tag_id}", headers=auth_headers)
+
+    trending = client.get("/tags/trending?window=1h").json()
+    assert [(tag["name"], tag["score"]) for tag in trending] == [("python", 3.0), ("rust", 1.0)]
+
+    client.delete(f"/content/{content_id}", headers=auth_headers)
+    assert [tag["score"] for tag in client.get("/tags/trending?window=24h").json()] == [2.0, 1.0]
+    assert client.get("/tags/trending?window=2h").status_code == 422
+
+
+def test_windows_match_a_full_scan_after_rebuild(test_db):
+    now = datetime(2024, 3, 10)
+    db = TestingSessionLocal()
+    try:
+        owners = factories.make_users(db, 3)
+        tags = factories.make_tags(db, 8)
+        content_ids = factories.make_content(
+            db, owners, 600, start=now - 600 * timedelta(minutes=25), step=timedelta(minutes=25)
+        )
+        factories.tag_content(db, content_ids, tags, per_item=2)
+
+        crud.rebuild_tag_activity(db, chunk_size=100, now=now)
+
+        links = models.content_tags_association.c
+        for window, hours in crud.TRENDING_WINDOWS.items():
+            expected = dict(db.execute(
+                select(links.tag_id, func.count())
+                .join(models.Content, models.Content.id == links.content_id)
+                .where(models.Content.created_at >= now - timedelta(hours=hours), models.Content.created_at < now)
+                .group_by(links.tag_id)
+            ).all())
+            trending = crud.get_trending_tags(db, hours, limit=100, now=now)
+            assert {tag.id: score for tag, score in trending} == expected, window
+
+        # Older hours were folded into daily buckets; nothing is past retention.
+        spans = {row.span_hours for row in activity_rows(db)}
+        assert spans == {1, 24}
+    finally:
+        db.close()
+
+
+def test_compaction_keeps_totals_and_evicts_old_buckets(test_db):
+    start = datetime(2024, 3, 1)
+    db = TestingSessionLocal()
+    try:
+        owners = factories.make_users(db, 1)
+        tags = factories.make_tags(db, 2)
+        content_ids = factories.make_content(db, owners, 96, start=start, step=timedelta(hours=1))
+        factories.tag_content(db, content_ids, tags, per_item=1)
+        crud.rebuild_tag_activity(db, now=start + timedelta(days=4))
+        total = sum(row.count for row in activity_rows(db))
+
+        crud.compact_tag_activity(db, now=start + timedelta(days=6))
+        assert sum(row.count for row in activity_rows(db)) == total == 96
+        assert {row.span_hours for row in activity_rows(db)} == {24}
+
+        crud.compact_tag_activity(db, now=start + timedelta(days=20))
+        assert activity_rows(db) == []
+    finally:
+        db.close()
@@ -0,0 +1,145 @@
+# tests/test_url_lookup.py
+
+import pytest
+from sqlalchemy import text
+
+from app import crud
+from app.urls import normalize_url, url_fingerprint
+from tests.conftest import TestingSessionLocal, create_user_and_login
+
+
+@pytest.mark.parametrize("url, normalized", [
+    ("HTTPS://Example.COM:443", "https://example.com/"),
+    ("http://example.com:8080/a/", "http://example.com:8080/a"),
+    ("https://example.com/Post/?b=2&utm_source=x&a=1&fbclid=y#comments", "https://example.com/Post?a=1&b=2"),
+    ("https://example.com/?q=x&q=a", "https://example.com/?q=x&q=a"),
+    ("  https://user@[::1]:8000//  ", "https://user@[::1]:8000/"),
+])
+def test_normalize_url(url, normalized):
+    assert normalize_url(url) == normalized
+
+
+def test_fingerprint_is_fixed_width():
+    assert url_fingerprint("https://example.com/a/?utm_medium=rss") == url_fingerprint("https://EXAMPLE.com/a")
+    assert len(url_fingerprint("https://example.com/" + "x" * 5000)) == 32
+
+
+def test_unparseable_urls_are_stored_and_found_as_written(client, auth_headers):
+    assert url_fingerprint(" http://[oops ") == url_fingerprint("http://[oops")
+
+    response = client.post("/content/", json={"title": "a", "url": "http://[oops"}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    item = response.json()
+    assert [found["id"] for found in client.get("/content/lookup", params={"url": "http://[oops"}).json()] == [item["id"]]
+
+    response = client.put(f"/content/{item['id']}", json={"title": "a", "url": "http://[still-oops"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+
+
+def test_lookup_finds_equivalent_urls_of_all_users(client, auth_headers):
+    other_headers = create_user_and_login(client, "other@example.com")
+    first = client.post("/content/", json={"title": "a", "url": "https://example.com/post/"}, headers=auth_headers).json()
+    second = client.post("/content/", json={"title": "b", "url": "https://Example.com/post?utm_source=x"}, headers=other_headers).json()
+    client.post("/content/", json={"title": "c", "url": "https://example.com/other"}, headers=auth_headers)
+
+    found = client.get("/content/lookup", params={"url": "HTTPS://example.com/post#top"}).json()
+    assert [item["id"] for item in found] == [first["id"], second["id"]]
+    assert client.get("/content/lookup", params={"url": "https://example.com/nothing"}).json() == []
+
+
+def test_duplicate_modes(client, auth_headers):
+    original = client.post("/content/", json={"title": "a", "url": "https://example.com/post"}, headers=auth_headers).json()
+    duplicate = {"title": "b", "url": "https://example.com/post/?utm_campaign=x"}
+
+    response = client.post("/content/?on_duplicate=reject", json=duplicate, headers=auth_headers)
+    assert response.status_code == 409
+
+    updated = client.post("/content/?on_duplicate=update", json=duplicate, headers=auth_headers).json()
+    assert updated["id"] == original["id"] and updated["title"] == "b"
+
+    allowed = client.post("/content/", json=duplicate, headers=auth_headers).json()
+    assert allowed["id"] != original["id"]
+    assert len(client.get("/content/lookup", params={"url": duplicate["url"]}).json()) == 2
+
+
+def test_duplicate_modes_hold_when_the_lookup_misses_a_concurrent_insert(client, auth_headers, monkeypatch):
+    original = client.post(
+        "/content/?on_duplicate=update", json={"title": "a", "url": "https://example.com/post"}, headers=auth_headers
+    ).json()
+    # Each request's first lookup runs before the other request committed.
+    lookup = crud.get_content_by_url
+    misses = []
+
+    def racing_lookup(db, url, **kwargs):
+        if len(misses) < 2:
+            misses.append(url)
+            return []
+        return lookup(db, url, **kwargs)
+
+    monkeypatch.setattr(crud, "get_content_by_url", racing_lookup)
+    duplicate = {"title": "b", "url": "https://example.com/post?utm_source=x"}
+
+    response = client.post("/content/?on_duplicate=reject", json=duplicate, headers=auth_headers)
+    assert response.status_code == 409
+    updated = client.post("/content/?on_duplicate=update", json=duplicate, headers=auth_headers).json()
+    assert updated["id"] == original["id"] and updated["title"] == "b"
+    assert len(misses) == 2
+    assert len(client.get("/content/lookup", params={"url": duplicate["url"]}).json()) == 1
+
+
+def test_an_equivalent_url_keeps_the_item_unique(client, auth_headers, monkeypatch):
+    original = client.post(
+        "/content/?on_duplicate=update", json={"title": "a", "url": "https://example.com/post"}, headers=auth_headers
+    ).json()
+    retried = client.post(
+        "/content/?on_duplicate=update",
+        json={"title": "b", "url": "https://Example.com/post?utm_source=x"},
+        headers=auth_headers,
+    ).json()
+    assert retried["id"] == original["id"]
+
+    # A concurrent retry whose lookup misses still finds the item through the unique index.
+    monkeypatch.setattr(crud, "get_content_by_url", lambda db, url, **kwargs: [])
+    response = client.post(
+        "/content/?on_duplicate=reject", json={"title": "c", "url": "https://example.com/post"}, headers=auth_headers
+    )
+    assert response.status_code == 409
+    monkeypatch.undo()
+    assert len(client.get("/content/lookup", params={"url": "https://example.com/post"}).json()) == 1
+
+
+def test_updating_the_url_updates_the_fingerprint(client, auth_headers):
+    item = client.post("/content/", json={"title": "a", "url": "https://example.com/old"}, headers=auth_headers).json()
+    client.put(f"/content/{item['id']}", json={"title": "a", "url": "https://example.com/new"}, headers=auth_headers)
+    assert client.get("/content/lookup", params={"url": "https://example.com/old"}).json() == []
+    assert [found["id"] for found in client.get("/content/lookup", params={"url": "https://example.com/new"}).json()] == [item["id"]]
+
+
+def test_a_repointed_item_is_no_longer_the_unique_item_for_its_url(client, auth_headers):
+    first = client.post(
+        "/content/?on_duplicate=update", json={"title": "a", "url": "https://example.com/a"}, headers=auth_headers
+    ).json()
+    second = client.post(
+        "/content/?on_duplicate=update", json={"title": "b", "url": "https://example.com/b"}, headers=auth_headers
+    ).json()
+    # Both items now have the same URL; only one of them may keep `unique_url`.
+    response = client.put(
+        f"/content/{second['id']}", json={"title": "b", "url": "https://example.com/a"}, headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    updated = client.post(
+        "/content/?on_duplicate=update", json={"title": "c", "url": "https://example.com/a"}, headers=auth_headers
+    ).json()
+    assert updated["id"] == first["id"]
+
+
+def test_lookup_uses_the_fingerprint_index(test_db):
+    db = TestingSessionLocal()
+    try:
+        plan = db.execute(
+            text("EXPLAIN QUERY PLAN SELECT id FROM content WHERE url_hash = :hash ORDER BY id"),
+            {"hash": url_fingerprint("https://example.com")},
+        ).all()
+    finally:
+        db.close()
+    assert "ix_content_url_hash_owner_id" in " ".join(row[-1] for row in plan)
@@ -1,47 +1,13 @@
 # tests/test_users.py
 
-import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 from app.main import app
-from app.database import Base, get_db
-
-# --- Test Database Setup ---
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# --- Dependency Override ---
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-app.dependency_overrides[get_db] = override_get_db
 
 # --- Test Client Setup ---
+# The test database and the `test_db` fixture live in tests/conftest.py.
 client = TestClient(app)
 
-@pytest.fixture(scope="function")
-def test_db():
-    """
-    A pytest fixture that creates and tears down the database tables for each test.
-    This ensures that each test function runs with a clean, isolated database.
-    """
-    # Setup: Create all tables before the test runs.
-    Base.metadata.create_all(bind=engine)
-    try:
-        # Yield control to the test function.
-        yield
-    finally:
-        # Teardown: Drop all tables after the test finishes.
-        Base.metadata.drop_all(bind=engine)
-
 
 def test_read_root():
     """